@@ -0,0 +1,215 @@
+import json
+import pathlib
+import platform
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from src.config.logging import configure_logging
+from src.metrics.metrics import TcpMetrics
+from src.tcp.agents.reno import TcpReno
+from src.tcp.agents.rfc_793 import TcpRfc793Agent
+from src.tcp.congestion_window.slow_start import SlowStart
+from src.tcp.kernel import simulate_packets
+from src.tcp.tcp import Tcp
+from src.trace.columnar import ColumnarTraceFile
+from src.trace.congestion_window_file import CongestionWindowTraceFile
+from src.trace.synthetic import SyntheticTrace
+from src.trace.timeout_file import TimeoutTraceFile
+from src.trace.trace_file import TraceFile, Node, PacketEvent
+
+DEFAULT_LINES = 10 ** 5
+DEFAULT_TOLERANCE = 0.2
+RESULTS = pathlib.Path(__file__).parent / 'results.json'
+BASELINE = pathlib.Path(__file__).parent / 'baseline.json'
+
+
+@dataclass
+class Workspace:
+    """
+    Inputs of the benchmarks, built once: a synthetic trace, the packets of its sender and reference metrics
+    """
+    folder: str
+    trace: str
+    timeout_file: str
+    congestion_file: str
+    packets: List[PacketEvent]
+    metrics: TcpMetrics
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    seconds: float
+    items: int
+
+    @property
+    def items_per_second(self) -> float:
+        return self.items / self.seconds if self.seconds else 0.0
+
+
+def rfc793() -> TcpRfc793Agent:
+    return TcpRfc793Agent(cw_algorithm=SlowStart())
+
+
+def generate(workspace: Workspace, lines: int) -> int:
+    SyntheticTrace().write(f'{workspace.folder}/generated.res', lines=lines)
+    return lines
+
+
+def parse(workspace: Workspace, lines: int) -> int:
+    return sum(1 for _ in TraceFile(workspace.trace))
+
+
+def parse_columnar(workspace: Workspace, lines: int) -> int:
+    return sum(len(batch) for batch in ColumnarTraceFile(workspace.trace))
+
+
+def filter_sender(workspace: Workspace, lines: int) -> int:
+    Tcp(agent=rfc793(), node=Node(1)).get_packages(TraceFile(workspace.trace))
+    return lines
+
+
+def simulate_rfc793(workspace: Workspace, lines: int) -> int:
+    Tcp(agent=rfc793(), node=Node(1)).simulate(workspace.packets)
+    return len(workspace.packets)
+
+
+def simulate_reno(workspace: Workspace, lines: int) -> int:
+    Tcp(agent=TcpReno(), node=Node(1)).simulate(workspace.packets)
+    return len(workspace.packets)
+
+
+def simulate_rfc793_kernel(workspace: Workspace, lines: int) -> int:
+    simulate_packets(rfc793(), workspace.packets)
+    return len(workspace.packets)
+
+
+def simulate_reno_kernel(workspace: Workspace, lines: int) -> int:
+    simulate_packets(TcpReno(), workspace.packets)
+    return len(workspace.packets)
+
+
+def load_metrics(workspace: Workspace, lines: int) -> int:
+    timeout = TimeoutTraceFile(workspace.timeout_file).get_metrics()
+    congestion = CongestionWindowTraceFile(workspace.congestion_file).get_metrics()
+    return len(timeout) + len(congestion)
+
+
+def plot(workspace: Workspace, lines: int) -> int:
+    from src.metrics.matplotlib_metrics import print_metrics
+    print_metrics(original=workspace.metrics, program=workspace.metrics, folder=workspace.folder)
+    return 4 * (len(workspace.metrics.timeout_metrics) + len(workspace.metrics.congestion_window_metrics))
+
+
+BENCHMARKS: Dict[str, Callable[[Workspace, int], int]] = {
+    'generate': generate,
+    'parse': parse,
+    'parse columnar': parse_columnar,
+    'filter': filter_sender,
+    'simulate rfc793': simulate_rfc793,
+    'simulate reno': simulate_reno,
+    'simulate rfc793 (kernel)': simulate_rfc793_kernel,
+    'simulate reno (kernel)': simulate_reno_kernel,
+    'load metrics': load_metrics,
+    'plot': plot,
+}
+
+
+def prepare(folder: str, lines: int, seed: int) -> Workspace:
+    trace = f'{folder}/trace.res'
+    SyntheticTrace(seed=seed).write(trace, lines=lines)
+    packets = Tcp(agent=rfc793(), node=Node(1)).get_packages(TraceFile(trace))
+    metrics = Tcp(agent=rfc793(), node=Node(1)).simulate(packets)
+    timeout_file, congestion_file = f'{folder}/timeout.res', f'{folder}/congestion_window.res'
+    # Same formats as the reference traces ns-2 writes (the congestion window one with the threshold too)
+    np.savetxt(timeout_file, metrics.timeout_metrics.metrics.tolist(), fmt='%.6f')
+    congestion = metrics.congestion_window_metrics
+    np.savetxt(congestion_file, np.column_stack((congestion.time, congestion.value, np.full(len(congestion), 20))),
+               fmt=('%.6f', '%.6f', '%d'))
+    return Workspace(folder=folder, trace=trace, timeout_file=timeout_file, congestion_file=congestion_file,
+                     packets=packets, metrics=metrics)
+
+
+def run(names: List[str], lines: int, repeat: int, seed: int = 0) -> List[BenchmarkResult]:
+    """
+    Runs each benchmark repeat times over a synthetic trace of lines events, keeping the fastest run
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        workspace = prepare(folder, lines=lines, seed=seed)
+        for name in names:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                items = BENCHMARKS[name](workspace, lines)
+                timings.append(time.perf_counter() - start)
+            results.append(BenchmarkResult(name=name, seconds=min(timings), items=items))
+            print(f'{name:<28}{min(timings):>10.3f} s{results[-1].items_per_second:>14.0f} items/s', flush=True)
+    return results
+
+
+def save(results: List[BenchmarkResult], file_name: pathlib.Path | str, lines: int) -> None:
+    with open(file_name, 'w') as file:
+        json.dump({'lines': lines, 'python': sys.version.split()[0], 'machine': platform.platform(),
+                   'results': {result.name: {**asdict(result), 'items_per_second': result.items_per_second}
+                               for result in results}}, file, indent=2)
+
+
+def compare(results: List[BenchmarkResult], baseline_file: pathlib.Path | str, lines: int,
+            tolerance: float) -> List[str]:
+    """
+    Prints how long each benchmark took compared to the baseline, and returns the ones more than tolerance
+    (a fraction) slower
+    """
+    with open(baseline_file) as file:
+        baseline = json.load(file)
+    if baseline['lines'] != lines:
+        print(f'The baseline was run over {baseline["lines"]} lines, not {lines}')
+    baseline = baseline['results']
+    regressions = []
+    for result in results:
+        if result.name not in baseline:
+            continue
+        ratio = result.seconds / baseline[result.name]['seconds']
+        slower = ratio > 1 + tolerance
+        print(f'{result.name:<28}{ratio:>8.2f}x the baseline time' + ('  REGRESSION' if slower else ''))
+        if slower:
+            regressions.append(result.name)
+    return regressions
+
+
+def main():
+    parser = ArgumentParser(description='Benchmarks the trace analysis over a synthetic ns-2 trace')
+    parser.add_argument('names', nargs='*', metavar='BENCHMARK',
+                        help=f'Benchmarks to run: {", ".join(BENCHMARKS)}. Default is all of them.')
+    parser.add_argument('-n', '--lines', default=DEFAULT_LINES, type=lambda value: int(float(value)),
+                        help=f'Events of the synthetic trace, e.g. 1e6. Default is {DEFAULT_LINES}.')
+    parser.add_argument('-r', '--repeat', default=3, type=int, help='Runs of each benchmark. Default is 3.')
+    parser.add_argument('-o', '--output', default=RESULTS, help=f'Results file. Default is {RESULTS}.')
+    parser.add_argument('-b', '--baseline', default=BASELINE, help=f'Baseline file. Default is {BASELINE}.')
+    parser.add_argument('--save-baseline', action='store_true', help='Save the results as the new baseline.')
+    parser.add_argument('--tolerance', default=DEFAULT_TOLERANCE, type=float,
+                        help='Fraction of slowdown over the baseline reported as a regression. Default is 0.2.')
+    args = parser.parse_args()
+    if unknown := set(args.names) - set(BENCHMARKS):
+        parser.error(f'Unknown benchmarks: {", ".join(sorted(unknown))}')
+    configure_logging('WARNING')
+    results = run(args.names or list(BENCHMARKS), lines=args.lines, repeat=args.repeat)
+    save(results, args.output, lines=args.lines)
+    if args.save_baseline:
+        save(results, args.baseline, lines=args.lines)
+    elif pathlib.Path(args.baseline).is_file():
+        regressions = compare(results, args.baseline, lines=args.lines, tolerance=args.tolerance)
+        if regressions:
+            print(f'Slower than the baseline: {", ".join(regressions)}')
+            exit(1)
+
+
+if __name__ == '__main__':
+    main()
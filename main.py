@@ -1,21 +1,84 @@
 import logging
 
-from src.config.args import parse_args
-from src.metrics.matplotlib_metrics import print_metrics, print_metric
+from src.config.args import parse_args, Config
+from src.config.profiler import stage
+from src.metrics.comparison import compare_metrics, save_comparison
+from src.metrics.export import export_metrics
+from src.metrics.live_output import MetricsAppender
+from src.metrics.metrics import TcpMetrics
+from src.tcp.batch import format_summary, save_summary
+from src.tcp.checkpoint import Checkpoint
+from src.tcp.sweep import format_table, save_csv
+
+
+def save_metric(config: Config, metrics: TcpMetrics, type: str, jobs: int | None = None) -> None:
+    if config.export:
+        export_metrics(metrics=metrics, folder=config.folder, type=type, format=config.export)
+    else:
+        from src.metrics.matplotlib_metrics import print_metric
+        print_metric(metrics=metrics, folder=config.folder, type=type, decimate=config.decimate, jobs=jobs)
+
+
+def save_metrics(config: Config, original: TcpMetrics, program: TcpMetrics) -> None:
+    if config.compare_tolerance is not None:
+        with stage('compare'):
+            comparison = compare_metrics(original=original, program=program, tolerance=config.compare_tolerance)
+        print(comparison.text())
+        save_comparison(comparison, folder=config.folder)
+    if config.export:
+        save_metric(config, metrics=original, type="original")
+        save_metric(config, metrics=program, type="program")
+    else:
+        from src.metrics.matplotlib_metrics import print_metrics
+        print_metrics(original=original, program=program, folder=config.folder, decimate=config.decimate)
+
 
 if __name__ == '__main__':
     try:
         config = parse_args()
-        if config.original_metrics and config.trace:
+        if config.batch:
+            results = config.batch.run()
+            print(format_summary(results))
+            save_summary(results, file=f'{config.folder}/batch_summary.csv')
+        elif config.sweep and config.trace:
+            results = config.sweep.run(tcp=config.tcp, trace=config.trace)
+            print(format_table(results))
+            save_csv(results, file=f'{config.folder}/sweep.csv')
+        elif config.checkpoint and config.trace:
+            program_metrics, checkpoint = config.tcp.resume_metrics(trace=config.trace,
+                                                                    checkpoint=Checkpoint.load(config.checkpoint))
+            checkpoint.save(config.checkpoint)
+            if config.original_metrics:
+                save_metrics(config, original=config.original_metrics, program=program_metrics)
+            else:
+                save_metric(config, metrics=program_metrics, type="program")
+        elif config.live and config.trace:
+            if config.live.output:
+                flush = MetricsAppender(config.live.output)
+            else:
+                # Flushes are frequent and only draw two plots, not worth starting a process pool each time
+                flush = lambda metrics: save_metric(config, metrics=metrics, type="program", jobs=1)
+            program_metrics = config.tcp.follow_metrics(trace=config.trace, flush_interval=config.live.flush_interval,
+                                                        flush=flush)
+            if config.original_metrics:
+                save_metrics(config, original=config.original_metrics, program=program_metrics)
+        elif config.multi_flow and config.trace:
+            for flow, program_metrics in config.multi_flow.get_metrics(trace=config.trace).items():
+                save_metric(config, metrics=program_metrics, type=f"program_{flow}")
+        elif config.original_metrics and config.trace:
             program_metrics = config.tcp.get_metrics(trace=config.trace)
-            print_metrics(original=config.original_metrics, program=program_metrics, folder=config.folder)
+            save_metrics(config, original=config.original_metrics, program=program_metrics)
         elif config.trace:
             program_metrics = config.tcp.get_metrics(trace=config.trace)
-            print_metric(metrics=program_metrics, folder=config.folder, type="program")
+            save_metric(config, metrics=program_metrics, type="program")
         elif config.original_metrics:
-            print_metric(metrics=config.original_metrics, folder=config.folder, type="original")
+            save_metric(config, metrics=config.original_metrics, type="original")
         else:
             logging.error("Nothing specified....")
+        if config.profiler:
+            print(config.profiler.text())
+            with open(f'{config.folder}/profile.json', 'w') as file:
+                file.write(config.profiler.json())
     except Exception as e:
         logging.error(f"Something very bad happened.\nError: {e}")
         exit(1)
@@ -1,19 +1,37 @@
 import logging
 import os
-from argparse import ArgumentParser, RawTextHelpFormatter
+from argparse import ArgumentParser, ArgumentTypeError, RawTextHelpFormatter
 from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
 
 from src.config.logging import configure_logging
+from src.config.profiler import Profiler, enable_profiling, stage
+from src.config.traces import trace_from
+from src.metrics.comparison import DEFAULT_TOLERANCE
+from src.metrics.export import EXPORTERS
 from src.metrics.metrics import TcpMetrics
 from src.tcp.agents.reno import TcpReno
 from src.tcp.agents.rfc_793 import TcpRfc793Agent
 from src.tcp.congestion_window.original_algorithm import Rfc793CongestionControl
 from src.tcp.congestion_window.slow_start import SlowStart
+from src.tcp.batch import Batch, scenarios_from
+from src.tcp.multi_flow import MultiFlowTcp
+from src.tcp.sweep import Sweep, SWEEP_PARAMETERS, parse_grid
 from src.tcp.tcp import Tcp
+from src.tcp.timeout.scheduler import EventQueue
 from src.tcp.agents.tcp_agent import TcpAgent
+from src.trace.cache import DEFAULT_CACHE_BYTES
+from src.trace.columnar import ColumnarTraceFile
+from src.trace.live import LiveTraceFile, TraceTail, STDIN
 from src.trace.congestion_window_file import CongestionWindowTraceFile
 from src.trace.timeout_file import TimeoutTraceFile
-from src.trace.trace_file import TraceFile, Node
+from src.trace.trace_file import TraceFile, Node, Time, time_type
+
+
+@dataclass(frozen=True)
+class LiveConfig:
+    flush_interval: Time
+    output: str | None
 
 
 @dataclass(frozen=True)
@@ -21,7 +39,16 @@ class Config:
     tcp: Tcp
     folder: str
     original_metrics: TcpMetrics | None
-    trace: TraceFile | None
+    trace: TraceFile | ColumnarTraceFile | LiveTraceFile | TraceTail | None
+    multi_flow: MultiFlowTcp | None = None
+    live: LiveConfig | None = None
+    decimate: bool = False
+    export: str | None = None
+    sweep: Sweep | None = None
+    checkpoint: str | None = None
+    profiler: Profiler | None = None
+    compare_tolerance: float | None = None
+    batch: Batch | None = None
 
     def __post_init__(self):
         assert isinstance(self.tcp, Tcp)
@@ -30,7 +57,18 @@ class Config:
         assert os.path.exists(self.folder), "Folder does not exist."
 
 
+def positive_decimal(value: str) -> Decimal:
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        raise ArgumentTypeError(f'{value} is not a number')
+    if not number.is_finite() or number <= 0:
+        raise ArgumentTypeError(f'{value} should be a positive number')
+    return number
+
+
 def get_agent_from(args) -> TcpAgent:
+    times = time_type(args.fixed_point_time)
     match args.implementation:
         case 'rfc793':
             use_karn_rtt = args.karn_rtt
@@ -49,7 +87,8 @@ def get_agent_from(args) -> TcpAgent:
                          f"\t - using original cw algorithm: {args.original_cw_algorithm}\n"
                          f"\t - using slow start: {not args.original_cw_algorithm}\n"
                          )
-            return TcpRfc793Agent(cw_algorithm=algorithm_cw, initial_timeout=initial_timeout, karn_rtt=use_karn_rtt)
+            agent = TcpRfc793Agent(cw_algorithm=algorithm_cw, initial_timeout=initial_timeout, karn_rtt=use_karn_rtt,
+                                   time_type=times)
         case 'reno':
             initial_timeout = args.initial_timeout
             initial_cw = args.initial_cw
@@ -63,11 +102,15 @@ def get_agent_from(args) -> TcpAgent:
                          f"\t - slow start threshold: {slow_start_threshold}\n"
                          f"\t - fast retransmit threshold: {fast_retransmit_threshold}"
                          )
-            return TcpReno(initial_timeout=initial_timeout, fast_retransmit_threshold=fast_retransmit_threshold,
-                           initial_value=initial_cw,
-                           slow_start_threshold=slow_start_threshold, mss=mss)
+            agent = TcpReno(initial_timeout=initial_timeout, fast_retransmit_threshold=fast_retransmit_threshold,
+                            initial_value=initial_cw,
+                            slow_start_threshold=slow_start_threshold, mss=mss, time_type=times)
         case _:
             raise ValueError(f"Invalid implementation: {args.implementation}")
+    agent.record_change_points(args.change_points)
+    if args.catch_up_timeouts:
+        agent.use_event_queue(EventQueue(catch_up=True))
+    return agent
 
 
 def parse_args() -> Config:
@@ -75,7 +118,114 @@ def parse_args() -> Config:
                             description="Program that reads a trace from ns (network simulator version 2) and "
                                         "simulates the timeouts and congestion window of a TCP agent.",
                             formatter_class=RawTextHelpFormatter)
-    parser.add_argument('-f', '--file', type=str, help='File name of the trace.')
+    parser.add_argument('-f', '--file', type=str, help='File name of the trace, - to read it from stdin.')
+    parser.add_argument('--follow',
+                        action='store_true',
+                        help='Keep reading the trace as ns-2 appends to it, like tail -f.')
+    parser.add_argument('--idle-timeout',
+                        type=float,
+                        help='Stop following the trace after these seconds without new lines. Default is never.')
+    parser.add_argument('--flush-interval',
+                        default="10",
+                        type=str,
+                        help='When reading stdin or following, seconds of simulated time between metric flushes.\n'
+                             'Default is 10.')
+    parser.add_argument('--live-output',
+                        type=str,
+                        help='When reading stdin or following, append the new metric points to this CSV file\n'
+                             'on every flush instead of rewriting the plots.')
+    parser.add_argument('--columnar',
+                        action='store_true',
+                        help='Parse the trace with the vectorized columnar loader (needs numpy).')
+    parser.add_argument('-j',
+                        '--jobs',
+                        default=1,
+                        type=int,
+                        help='Worker processes used to parse the trace (more than 1 implies --columnar), or to run\n'
+                             'the --sweep configurations or --batch scenarios. Default is 1.')
+    parser.add_argument('--cache-dir',
+                        type=str,
+                        help='Folder where parsed traces are cached, so later runs skip parsing. Implies --columnar.')
+    cache_megabytes = DEFAULT_CACHE_BYTES // (1024 * 1024)
+    parser.add_argument('--cache-size',
+                        default=cache_megabytes,
+                        type=int,
+                        help=f'Maximum size of the trace cache (in MB). Default is {cache_megabytes}.')
+    parser.add_argument('--lazy',
+                        action='store_true',
+                        help='Decode each field of the trace lines only when it is used. The lines of other nodes are '
+                             'skipped without being parsed, so they are not validated.')
+    parser.add_argument('--streaming',
+                        action='store_true',
+                        help='Check the trace and feed the agent in a single pass, with constant memory.')
+    parser.add_argument('--kernel',
+                        action='store_true',
+                        help='Simulate the agent with the fast simulation kernel (same metrics, several times faster).')
+    parser.add_argument('--all-flows',
+                        action='store_true',
+                        help='Simulate every TCP sender of the trace in a single pass (ignores --node).')
+    parser.add_argument('--fixed-point-time',
+                        action='store_true',
+                        help='Use integer picoseconds instead of decimals for every time of the simulation.')
+    parser.add_argument('--change-points',
+                        action='store_true',
+                        help='Record the metrics only where they change instead of on every packet.')
+    parser.add_argument('--decimate',
+                        action='store_true',
+                        help='Draw at most 4 points (first, last, min and max) per pixel column of the plots.')
+    parser.add_argument('--export',
+                        choices=sorted(EXPORTERS),
+                        help='Write the metrics to {save folder}/{original|program}_metrics.{format}\n'
+                             'instead of plotting them (matplotlib is not even imported).')
+    parser.add_argument('--sweep',
+                        nargs='+',
+                        metavar='PARAMETER=VALUES',
+                        help='Simulate every combination of the given agent parameters over the trace, parsed once,\n'
+                             'and save a table of summary metrics to {save folder}/sweep.csv.\n'
+                             f'Example: --sweep implementation=reno,rfc793 ssthreshold=10,20,40\n'
+                             f'Parameters: {", ".join(SWEEP_PARAMETERS)}. Runs on --jobs processes.')
+    parser.add_argument('--batch',
+                        metavar='GLOB|MANIFEST',
+                        help='Analyse many scenarios on --jobs processes, each saved to {save folder}/{scenario},\n'
+                             'and write a summary of all of them to {save folder}/batch_summary.csv.\n'
+                             'Either a glob of traces and of folders of result sets (trace_file_{agent}.res,\n'
+                             'timeout_{agent}.res and congestion_window_{agent}.res, as in ./data), or a JSON\n'
+                             'manifest: [{"name": ..., "trace": ..., "timeout_file": ..., "congestion_file": ...,\n'
+                             '"implementation": ..., other --sweep parameters...}, ...].\n'
+                             'A scenario that fails is reported on the summary without stopping the others.')
+    parser.add_argument('--checkpoint',
+                        type=str,
+                        help='Resume the simulation from this checkpoint file (if it exists) and save it again at\n'
+                             'the end, so a trace that grew is only simulated from where the last run stopped.\n'
+                             'Only use checkpoints written by this program: they are pickles of the simulation state.')
+    parser.add_argument('--catch-up-timeouts',
+                        action='store_true',
+                        help='Fire every timeout due before a packet (e.g. repeated backoffs during a long idle\n'
+                             'period), instead of at most one per packet.')
+    parser.add_argument('--compare',
+                        action='store_true',
+                        help='Align the original and program metrics and report their errors (max and mean absolute\n'
+                             'error, fraction of time they disagree, first divergence), also saved to\n'
+                             '{save folder}/comparison.json.')
+    parser.add_argument('--compare-tolerance',
+                        default=DEFAULT_TOLERANCE,
+                        type=float,
+                        help=f'Absolute error over which the metrics disagree. Default is {DEFAULT_TOLERANCE}.')
+    parser.add_argument('--profile',
+                        action='store_true',
+                        help='Print the wall and CPU time, events per second, net live memory blocks (the ones still\n'
+                             'allocated at the end minus at the start) and peak RSS of each stage of the run, and\n'
+                             'save them to {save folder}/profile.json.')
+    parser.add_argument('--since',
+                        type=str,
+                        help='Only analyse the trace from this simulated time (in seconds).')
+    parser.add_argument('--until',
+                        type=str,
+                        help='Only analyse the trace up to this simulated time (in seconds).')
+    parser.add_argument('--index-interval',
+                        default="1.0",
+                        type=positive_decimal,
+                        help='Seconds of simulated time between the entries of the trace seek index. Default is 1.0.')
     parser.add_argument('-t', '--timeout-file', type=str, help='File name of the timeout trace')
     parser.add_argument('-c', '--congestion-file', type=str, help='File name of the congestion window trace')
     parser.add_argument('-node',
@@ -132,20 +282,48 @@ def parse_args() -> Config:
                         help='Folder to save the images. Default is ./images.')
     args = parser.parse_args()
     configure_logging(args.loglevel.upper())
+    profiler = enable_profiling() if args.profile else None
+    times = time_type(args.fixed_point_time)
     node = Node(identifier=args.node)
     tcp_agent = get_agent_from(args)
-    tcp_ = Tcp(agent=tcp_agent, node=node)
-    if args.file:
-        trace = TraceFile(file_name=args.file)
+    tcp_ = Tcp(agent=tcp_agent, node=node, streaming=args.streaming, kernel=args.kernel)
+    live = args.file == STDIN or args.follow
+    if live and (args.since or args.until or args.all_flows):
+        raise ValueError("--since, --until and --all-flows can't be used on a trace read from stdin or followed")
+    if args.checkpoint and (live or args.since or args.until or args.jobs > 1 or args.columnar or args.cache_dir or
+                            args.all_flows or args.kernel):
+        raise ValueError("--since, --until, --jobs, --columnar, --cache-dir, --all-flows, --kernel, --follow and "
+                         "stdin can't be used with --checkpoint, which always reads the trace whole and in order")
+    if args.file and args.checkpoint:
+        trace = TraceTail(file_name=args.file, lazy=args.lazy, time_type=times)
+    elif args.file and live:
+        trace = LiveTraceFile(file_name=args.file, follow=args.follow, idle_timeout=args.idle_timeout,
+                              lazy=args.lazy, time_type=times)
+    elif args.file:
+        trace = trace_from(args, args.file, jobs=args.jobs)
     else:
         trace = None
     if args.timeout_file and args.congestion_file:
         type_of_value_seconds = "ms" if isinstance(tcp_agent, TcpRfc793Agent) else "s"
-        timeout = TimeoutTraceFile(file_name=args.timeout_file).get_metrics()
-        timeout.timeout_value_type = type_of_value_seconds
-        congestion = CongestionWindowTraceFile(file_name=args.congestion_file).get_metrics()
+        with stage('load reference metrics') as loading:
+            timeout = TimeoutTraceFile(file_name=args.timeout_file).get_metrics()
+            timeout.timeout_value_type = type_of_value_seconds
+            congestion = CongestionWindowTraceFile(file_name=args.congestion_file).get_metrics()
+            loading.count(len(timeout) + len(congestion))
         tcp_original_metrics = TcpMetrics(timeout_metrics=timeout, congestion_window_metrics=congestion)
     else:
         tcp_original_metrics = None
     folder = args.save_folder
-    return Config(trace=trace, tcp=tcp_, original_metrics=tcp_original_metrics, folder=folder)
+    sweep = Sweep(args=args, grid=parse_grid(args.sweep), agent_factory=get_agent_from,
+                  jobs=args.jobs) if args.sweep else None
+    batch = Batch(args=args, scenarios=scenarios_from(args.batch), agent_factory=get_agent_from, folder=folder,
+                  jobs=args.jobs) if args.batch else None
+    shared_queue = EventQueue(catch_up=True) if args.catch_up_timeouts else None
+    multi_flow = MultiFlowTcp(agent_factory=lambda: get_agent_from(args),
+                              queue=shared_queue) if args.all_flows else None
+    live_config = LiveConfig(flush_interval=times.from_str(args.flush_interval),
+                             output=args.live_output) if args.file and live else None
+    return Config(trace=trace, tcp=tcp_, original_metrics=tcp_original_metrics, folder=folder,
+                  multi_flow=multi_flow, live=live_config, decimate=args.decimate,
+                  export=args.export, sweep=sweep, checkpoint=args.checkpoint, profiler=profiler,
+                  compare_tolerance=args.compare_tolerance if args.compare else None, batch=batch)
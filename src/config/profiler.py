@@ -0,0 +1,146 @@
+import json
+import resource
+import sys
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Iterable, TypeVar
+
+T = TypeVar('T')
+
+
+@dataclass
+class StageReport:
+    name: str
+    depth: int
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    events: int = 0
+    # Memory blocks still allocated at the end of the stage minus at its start: what the stage kept, not what it
+    # allocated (zero or negative for a stage that allocated a lot and freed it)
+    net_live_blocks: int = 0
+    peak_rss_bytes: int = 0
+    counters: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def events_per_second(self) -> float:
+        return self.events / self.wall_seconds if self.wall_seconds else 0.0
+
+
+def _cpu_seconds() -> float:
+    # Worker processes (parallel parsing, plotting...) are counted once they've finished
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+def _peak_rss_bytes() -> int:
+    # ru_maxrss is in kilobytes on Linux, in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Stage:
+    """
+    Measures a stage of a run while it's open (with stage(...) as s:). Stages can be nested, times are inclusive.
+    """
+
+    def __init__(self, profiler: 'Profiler', name: str):
+        self.profiler = profiler
+        self.report = StageReport(name=name, depth=len(profiler.active))
+
+    def count(self, events: int) -> None:
+        self.report.events += events
+
+    def __enter__(self) -> 'Stage':
+        self.profiler.active.append(self)
+        self.profiler.reports.append(self.report)
+        self.blocks, self.cpu, self.wall = sys.getallocatedblocks(), _cpu_seconds(), time.perf_counter()
+        return self
+
+    def __exit__(self, *exception) -> bool:
+        self.report.wall_seconds += time.perf_counter() - self.wall
+        self.report.cpu_seconds += _cpu_seconds() - self.cpu
+        self.report.net_live_blocks += sys.getallocatedblocks() - self.blocks
+        self.report.peak_rss_bytes = _peak_rss_bytes()
+        self.profiler.active.pop()
+        return False
+
+
+class DisabledStage:
+    """
+    What stage(...) returns when profiling is off: does nothing at all
+    """
+
+    def count(self, events: int) -> None:
+        pass
+
+    def __enter__(self) -> 'DisabledStage':
+        return self
+
+    def __exit__(self, *exception) -> bool:
+        return False
+
+
+_DISABLED_STAGE = DisabledStage()
+
+
+class Profiler:
+
+    def __init__(self):
+        self.active: List[Stage] = []
+        self.reports: List[StageReport] = []
+
+    def add(self, counter: str, value: int) -> None:
+        if self.active:
+            counters = self.active[-1].report.counters
+            counters[counter] = counters.get(counter, 0) + value
+
+    def text(self) -> str:
+        lines = [f'{"stage":<32}{"wall (s)":>10}{"cpu (s)":>10}{"events":>10}{"events/s":>12}'
+                 f'{"net live blocks":>17}{"peak RSS (MB)":>15}']
+        for report in self.reports:
+            counters = ', '.join(f'{name}: {value}' for name, value in report.counters.items())
+            lines.append(f'{"  " * report.depth + report.name:<32}{report.wall_seconds:>10.3f}'
+                         f'{report.cpu_seconds:>10.3f}{report.events:>10}{report.events_per_second:>12.0f}'
+                         f'{report.net_live_blocks:>17}{report.peak_rss_bytes / 2 ** 20:>15.1f}'
+                         + (f'  ({counters})' if counters else ''))
+        return '\n'.join(lines)
+
+    def json(self) -> str:
+        return json.dumps([{**asdict(report), 'events_per_second': report.events_per_second}
+                           for report in self.reports], indent=2)
+
+
+_profiler: Profiler | None = None
+
+
+def enable_profiling() -> Profiler:
+    global _profiler
+    _profiler = Profiler()
+    return _profiler
+
+
+def stage(name: str) -> Stage | DisabledStage:
+    """
+    Context manager measuring wall and CPU time, events (see Stage.count), net live memory blocks (see
+    StageReport) and peak RSS of a stage of the run. Costs a function call when profiling is off.
+    """
+    return _DISABLED_STAGE if _profiler is None else Stage(_profiler, name)
+
+
+def counted(items: Iterable[T], counter: str) -> Iterable[T]:
+    """
+    Adds to the counter of the innermost open stage how many items are iterated, items as is if profiling is off
+    """
+    if _profiler is None:
+        return items
+    return _counting(_profiler, items, counter)
+
+
+def _counting(profiler: Profiler, items: Iterable[T], counter: str) -> Iterable[T]:
+    count = 0
+    try:
+        for item in items:
+            count += 1
+            yield item
+    finally:
+        profiler.add(counter, count)
@@ -0,0 +1,25 @@
+from argparse import Namespace
+
+from src.trace.cache import TraceCache
+from src.trace.columnar import ColumnarTraceFile
+from src.trace.parallel import ParallelTraceFile
+from src.trace.trace_file import TraceFile, Time, time_type
+
+
+def trace_from(args: Namespace, file_name: str, jobs: int) -> TraceFile | ColumnarTraceFile:
+    """
+    Trace of a whole file, read the way the command line arguments say: parsed on jobs processes (if more than
+    one), as columns (with --columnar or a --cache-dir) or line by line, inside the --since/--until window
+    """
+    times = time_type(args.fixed_point_time)
+    since = Time.from_str(args.since) if args.since else None
+    until = Time.from_str(args.until) if args.until else None
+    cache = TraceCache(directory=args.cache_dir, max_bytes=args.cache_size * 1024 * 1024) if args.cache_dir else None
+    if jobs > 1:
+        return ParallelTraceFile(file_name=file_name, jobs=jobs, since=since, until=until,
+                                 index_interval=args.index_interval, cache=cache, time_type=times)
+    if args.columnar or cache:
+        return ColumnarTraceFile(file_name=file_name, since=since, until=until, index_interval=args.index_interval,
+                                 cache=cache, time_type=times)
+    return TraceFile(file_name=file_name, since=since, until=until, index_interval=args.index_interval, lazy=args.lazy,
+                     time_type=times)
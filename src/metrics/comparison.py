@@ -0,0 +1,118 @@
+import json
+import logging
+from dataclasses import dataclass, asdict
+from typing import Tuple
+
+import numpy as np
+
+from src.metrics.metrics import MetricSeries, TcpMetrics
+
+DEFAULT_TOLERANCE = 1e-6
+
+
+def sorted_by_time(series: MetricSeries) -> Tuple[np.ndarray, np.ndarray]:
+    time, value = series.time, series.value
+    if np.any(np.diff(time) < 0):
+        by_time = np.argsort(time, kind='stable')
+        return time[by_time], value[by_time]
+    return time, value
+
+
+def as_of(time: np.ndarray, value: np.ndarray, at: np.ndarray) -> np.ndarray:
+    """
+    Value of the step function given by the points (time sorted) at each of the times at: the one of the last
+    point at or before it, NaN before the first point
+    """
+    positions = np.searchsorted(time, at, side='right') - 1
+    return np.where(positions >= 0, value[np.maximum(positions, 0)], np.nan)
+
+
+@dataclass
+class SeriesComparison:
+    """
+    How far the program series is from the original one, both taken as step functions over the time both
+    are defined. Mean absolute error and disagreement (error over tolerance) are weighted by time.
+    """
+    original_points: int
+    program_points: int
+    start: float | None
+    end: float | None
+    max_absolute_error: float
+    mean_absolute_error: float
+    disagreement_fraction: float
+    first_divergence: float | None
+
+    @property
+    def agrees(self) -> bool:
+        return self.first_divergence is None
+
+
+def compare_series(original: MetricSeries, program: MetricSeries,
+                   tolerance: float = DEFAULT_TOLERANCE) -> SeriesComparison:
+    """
+    Aligns both series on the union of their times with an as-of join, in O(n log n)
+    """
+    original_time, original_value = sorted_by_time(original)
+    program_time, program_value = sorted_by_time(program)
+    empty = SeriesComparison(original_points=len(original), program_points=len(program), start=None, end=None,
+                             max_absolute_error=0.0, mean_absolute_error=0.0, disagreement_fraction=0.0,
+                             first_divergence=None)
+    if len(original_time) == 0 or len(program_time) == 0:
+        return empty
+    start = max(original_time[0], program_time[0])
+    end = min(original_time[-1], program_time[-1])
+    times = np.union1d(original_time, program_time)
+    times = times[(times >= start) & (times <= end)]
+    if len(times) == 0:
+        return empty
+    error = np.abs(as_of(original_time, original_value, times) - as_of(program_time, program_value, times))
+    diverged = error > tolerance
+    # Each error lasts until the next time on the grid; the last one has no duration unless it's the only one
+    durations = np.diff(times, append=times[-1])
+    total = durations.sum()
+    if total > 0:
+        mean_absolute_error = float(np.dot(error, durations) / total)
+        disagreement_fraction = float(durations[diverged].sum() / total)
+    else:
+        mean_absolute_error, disagreement_fraction = float(error.mean()), float(diverged.mean())
+    return SeriesComparison(original_points=len(original), program_points=len(program), start=float(start),
+                            end=float(end), max_absolute_error=float(error.max()),
+                            mean_absolute_error=mean_absolute_error, disagreement_fraction=disagreement_fraction,
+                            first_divergence=float(times[np.argmax(diverged)]) if diverged.any() else None)
+
+
+@dataclass
+class MetricsComparison:
+    timeout: SeriesComparison
+    congestion_window: SeriesComparison
+    tolerance: float
+
+    def text(self) -> str:
+        lines = [f'{"series":<20}{"max abs. error":>16}{"mean abs. error":>17}{"disagreement":>14}'
+                 f'{"first divergence (s)":>22}']
+        for name, comparison in (('timeout', self.timeout), ('congestion window', self.congestion_window)):
+            divergence = '-' if comparison.agrees else f'{comparison.first_divergence:.6f}'
+            lines.append(f'{name:<20}{comparison.max_absolute_error:>16.6g}{comparison.mean_absolute_error:>17.6g}'
+                         f'{comparison.disagreement_fraction:>14.2%}{divergence:>22}')
+        return '\n'.join(lines)
+
+    def json(self) -> str:
+        return json.dumps(asdict(self), indent=2)
+
+
+def compare_metrics(original: TcpMetrics, program: TcpMetrics,
+                    tolerance: float = DEFAULT_TOLERANCE) -> MetricsComparison:
+    if original.timeout_metrics.timeout_value_type != program.timeout_metrics.timeout_value_type:
+        logging.warning(f"Comparing timeouts in {original.timeout_metrics.timeout_value_type} with timeouts in "
+                        f"{program.timeout_metrics.timeout_value_type}")
+    return MetricsComparison(timeout=compare_series(original.timeout_metrics, program.timeout_metrics, tolerance),
+                             congestion_window=compare_series(original.congestion_window_metrics,
+                                                              program.congestion_window_metrics, tolerance),
+                             tolerance=tolerance)
+
+
+def save_comparison(comparison: MetricsComparison, folder: str) -> None:
+    file = f'{folder}/comparison.json'
+    with open(file, 'w') as output:
+        output.write(comparison.json())
+    logging.info(f"Saved the comparison of original and program metrics. File path: {file}")
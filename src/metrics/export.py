@@ -0,0 +1,48 @@
+import json
+import logging
+from typing import Callable, Dict
+
+import numpy as np
+
+from src.metrics.metrics import TcpMetrics
+
+
+def export_csv(metrics: TcpMetrics, file: str) -> None:
+    with open(file, 'w') as output:
+        output.write('series,time,value\n')
+        for series, values in (('timeout', metrics.timeout_metrics),
+                               ('congestion_window', metrics.congestion_window_metrics)):
+            output.writelines(f'{series},{time!r},{value!r}\n' for time, value in values.metrics.tolist())
+
+
+def export_json(metrics: TcpMetrics, file: str) -> None:
+    with open(file, 'w') as output:
+        json.dump({'timeout': {'time': metrics.timeout_metrics.time.tolist(),
+                               'value': metrics.timeout_metrics.value.tolist(),
+                               'unit': metrics.timeout_metrics.timeout_value_type},
+                   'congestion_window': {'time': metrics.congestion_window_metrics.time.tolist(),
+                                         'value': metrics.congestion_window_metrics.value.tolist()}}, output)
+
+
+def export_npz(metrics: TcpMetrics, file: str) -> None:
+    np.savez(file,
+             timeout_time=metrics.timeout_metrics.time,
+             timeout_value=metrics.timeout_metrics.value,
+             congestion_window_time=metrics.congestion_window_metrics.time,
+             congestion_window_value=metrics.congestion_window_metrics.value)
+
+
+EXPORTERS: Dict[str, Callable[[TcpMetrics, str], None]] = {
+    'csv': export_csv,
+    'json': export_json,
+    'npz': export_npz,
+}
+
+
+def export_metrics(metrics: TcpMetrics, folder: str, type: str, format: str) -> None:
+    """
+    Writes the metrics to {folder}/{type}_metrics.{format}, without plotting them
+    """
+    file = f'{folder}/{type}_metrics.{format}'
+    EXPORTERS[format](metrics, file)
+    logging.info(f"Exported {type} metrics. File path: {file}")
@@ -0,0 +1,29 @@
+import logging
+
+from src.metrics.metrics import TcpMetrics
+
+
+class MetricsAppender:
+    """
+    Flush function for live runs: appends to a CSV file (series, time, value) the metric points
+    computed since the previous flush
+    """
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self.timeout_points = 0
+        self.congestion_window_points = 0
+        with open(self.file_name, 'w') as file:
+            file.write('series,time,value\n')
+
+    def __call__(self, metrics: TcpMetrics) -> None:
+        timeout_points = metrics.timeout_metrics.metrics[self.timeout_points:]
+        congestion_window_points = metrics.congestion_window_metrics.metrics[self.congestion_window_points:]
+        with open(self.file_name, 'a') as file:
+            file.writelines(f'timeout,{time!r},{value!r}\n' for time, value in timeout_points.tolist())
+            file.writelines(f'congestion_window,{time!r},{value!r}\n'
+                            for time, value in congestion_window_points.tolist())
+        self.timeout_points += len(timeout_points)
+        self.congestion_window_points += len(congestion_window_points)
+        logging.info(f"Appended {len(timeout_points)} timeout and {len(congestion_window_points)} congestion window "
+                     f"points to {self.file_name}")
@@ -1,71 +1,133 @@
 import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Tuple, List, Callable
 
-from src.metrics.metrics import TcpMetrics, CongestionWindowMetrics, TimeoutMetrics
-import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from src.config.profiler import stage
+from src.metrics.metrics import TcpMetrics, CongestionWindowMetrics, TimeoutMetrics, MetricSeries
 
 logging.getLogger('matplotlib').setLevel(logging.CRITICAL)
 
 
-def print_congestion_window_metrics(metrics: CongestionWindowMetrics, file: str) -> None:
-    plt.title('Congestion window x Time')
-    plt.xlabel('Time (s)')
-    plt.ylabel('Congestion window (MSS)')
-    plt.legend(loc='upper right')
-    plt.plot(metrics.time, metrics.value, color='blue')
-    plt.savefig(file, bbox_inches='tight')
-    plt.clf()
+def min_max_decimation(time: np.ndarray, value: np.ndarray, columns: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Splits the time axis in columns buckets (one per pixel column of the plot) and keeps on each bucket
+    the first, last, minimum and maximum points. The drawn line looks the same, with at most 4 points
+    per column however long the series is.
+    """
+    if len(time) <= 4 * columns or time.max() == time.min():
+        return time, value
+    buckets = np.minimum(((time - time.min()) / (time.max() - time.min()) * columns).astype(np.int64), columns - 1)
+    by_time = np.argsort(buckets, kind='stable')
+    by_value = np.lexsort((value, buckets))
+    starts = np.flatnonzero(np.diff(buckets[by_time], prepend=-1))
+    ends = np.append(starts[1:], len(time)) - 1
+    kept = np.unique(np.concatenate((by_time[starts], by_time[ends], by_value[starts], by_value[ends])))
+    return time[kept], value[kept]
+
+
+def new_figure(title: str, y_label: str) -> Tuple[Figure, Axes]:
+    """
+    Standalone figure (not pyplot's global one) drawn with the Agg backend, so several figures can be
+    rendered at the same time without interfering with each other
+    """
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    axes.set_title(title)
+    axes.set_xlabel('Time (s)')
+    axes.set_ylabel(y_label)
+    return figure, axes
+
+
+def plot(axes: Axes, metrics: MetricSeries, color: str, decimate: bool) -> None:
+    time, value = metrics.time, metrics.value
+    if decimate:
+        figure = axes.get_figure()
+        columns = int(figure.get_size_inches()[0] * figure.dpi)
+        time, value = min_max_decimation(time, value, columns)
+        logging.debug(f"Decimated {len(metrics)} points to {len(time)}")
+    axes.plot(time, value, color=color)
+
+
+def print_congestion_window_metrics(metrics: CongestionWindowMetrics, file: str, decimate: bool = False) -> None:
+    figure, axes = new_figure('Congestion window x Time', 'Congestion window (MSS)')
+    plot(axes, metrics, color='blue', decimate=decimate)
+    figure.savefig(file, bbox_inches='tight')
     logging.info(f"Saved congestion window metrics. Image path: {file}")
 
 
-def print_timeout_metrics(metrics: TimeoutMetrics, file: str) -> None:
-    plt.title('Timeout x Time')
-    plt.xlabel('Time (s)')
-    plt.ylabel(f'Timeout ({metrics.timeout_value_type})')
-    plt.legend(loc='upper right')
-    plt.plot(metrics.time, metrics.value, color='blue')
-    plt.savefig(file, bbox_inches='tight')
-    plt.clf()
+def print_timeout_metrics(metrics: TimeoutMetrics, file: str, decimate: bool = False) -> None:
+    figure, axes = new_figure('Timeout x Time', f'Timeout ({metrics.timeout_value_type})')
+    plot(axes, metrics, color='blue', decimate=decimate)
+    figure.savefig(file, bbox_inches='tight')
     logging.info(f"Saved timeout metrics. Image path: {file}")
 
 
-def versus_congestion_windows(original: CongestionWindowMetrics, program: CongestionWindowMetrics, file: str) -> None:
-    plt.title('Congestion window x Time')
-    plt.xlabel('Time (s)')
-    plt.ylabel('Congestion window (MSS)')
-    plt.legend(loc='upper right')
-    plt.plot(original.time, original.value, color='blue')
-    plt.plot(program.time, program.value, color='red')
-    plt.legend(['Original', 'Program'], loc='lower right')
-    plt.savefig(file, bbox_inches='tight')
-    plt.clf()
+def versus_congestion_windows(original: CongestionWindowMetrics, program: CongestionWindowMetrics, file: str,
+                              decimate: bool = False) -> None:
+    figure, axes = new_figure('Congestion window x Time', 'Congestion window (MSS)')
+    plot(axes, original, color='blue', decimate=decimate)
+    plot(axes, program, color='red', decimate=decimate)
+    axes.legend(['Original', 'Program'], loc='lower right')
+    figure.savefig(file, bbox_inches='tight')
     logging.info(f"Saved congestion window diff. Image path: {file}")
 
 
-def versus_timeouts(original: TimeoutMetrics, program: TimeoutMetrics, file: str) -> None:
-    plt.title('Timeout x Time')
-    plt.xlabel('Time (s)')
-    plt.ylabel(f'Timeout ({program.timeout_value_type})')
-    plt.plot(original.time, original.value, color='blue')
-    plt.plot(program.time, program.value, color='red')
-    plt.legend(['Original', 'Program'], loc='lower right')
-    plt.savefig(file, bbox_inches='tight')
-    plt.clf()
+def versus_timeouts(original: TimeoutMetrics, program: TimeoutMetrics, file: str, decimate: bool = False) -> None:
+    figure, axes = new_figure('Timeout x Time', f'Timeout ({program.timeout_value_type})')
+    plot(axes, original, color='blue', decimate=decimate)
+    plot(axes, program, color='red', decimate=decimate)
+    axes.legend(['Original', 'Program'], loc='lower right')
+    figure.savefig(file, bbox_inches='tight')
     logging.info(f"Saved timeout diff. Image path: {file}")
 
 
-def print_metric(metrics: TcpMetrics, folder: str, type: str) -> None:
+def render(figures: List[Callable[[], None]], jobs: int | None = None) -> None:
+    """
+    Renders the figures in parallel, each one on a worker process (at most jobs, as many as CPUs by default).
+    With a single job, or already on a worker process (e.g. of a --batch run), they're rendered one after another.
+    """
+    workers = min(len(figures), jobs or os.cpu_count() or 1)
+    if workers <= 1 or multiprocessing.parent_process() is not None:
+        for figure in figures:
+            figure()
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for future in [executor.submit(figure) for figure in figures]:
+            future.result()
+
+
+def metric_figures(metrics: TcpMetrics, folder: str, type: str, decimate: bool) -> List[Callable[[], None]]:
+    return [partial(print_congestion_window_metrics, metrics.congestion_window_metrics,
+                    file=f'{folder}/congestion_window_{type}_plot.png', decimate=decimate),
+            partial(print_timeout_metrics, metrics.timeout_metrics, file=f'{folder}/timeout_{type}_plot.png',
+                    decimate=decimate)]
+
+
+def print_metric(metrics: TcpMetrics, folder: str, type: str, decimate: bool = False, jobs: int | None = None) -> None:
     logging.info(f"Saving metrics for {type} on folder {folder}")
-    print_congestion_window_metrics(metrics.congestion_window_metrics,
-                                    file=f'{folder}/congestion_window_{type}_plot.png')
-    print_timeout_metrics(metrics.timeout_metrics, file=f'{folder}/timeout_{type}_plot.png')
-
-
-def print_metrics(original: TcpMetrics, program: TcpMetrics, folder: str = "./images"):
-    print_metric(original, folder=f"{folder}", type="original")
-    print_metric(program, folder=f"{folder}", type="program")
-    logging.info(f"Saving diff metrics between original and program on folder {folder}")
-    versus_timeouts(original=original.timeout_metrics, program=program.timeout_metrics,
-                    file=f'{folder}/timeout_plot.png')
-    versus_congestion_windows(original=original.congestion_window_metrics,
-                              program=program.congestion_window_metrics,
-                              file=f'{folder}/congestion_window_plot.png')
+    with stage('plot') as plotting:
+        plotting.count(len(metrics.timeout_metrics) + len(metrics.congestion_window_metrics))
+        render(metric_figures(metrics, folder=folder, type=type, decimate=decimate), jobs=jobs)
+
+
+def print_metrics(original: TcpMetrics, program: TcpMetrics, folder: str = "./images", decimate: bool = False):
+    logging.info(f"Saving metrics for original and program, and the diff between them, on folder {folder}")
+    with stage('plot') as plotting:
+        plotting.count(2 * sum(len(metrics.timeout_metrics) + len(metrics.congestion_window_metrics)
+                               for metrics in (original, program)))
+        render(metric_figures(original, folder=folder, type="original", decimate=decimate)
+               + metric_figures(program, folder=folder, type="program", decimate=decimate)
+               + [partial(versus_timeouts, original=original.timeout_metrics, program=program.timeout_metrics,
+                          file=f'{folder}/timeout_plot.png', decimate=decimate),
+                  partial(versus_congestion_windows, original=original.congestion_window_metrics,
+                          program=program.congestion_window_metrics, file=f'{folder}/congestion_window_plot.png',
+                          decimate=decimate)])
@@ -1,49 +1,98 @@
 from dataclasses import dataclass
-from decimal import Decimal
-from typing import List, Tuple
 
-from src.trace.trace_file import Time
+import numpy as np
+
+from src.trace.trace_file import Time, FixedTime
+
+METRIC_POINT_DTYPE = np.dtype([('time', 'f8'), ('value', 'f8')])
+INITIAL_CAPACITY = 1024
+
+
+class MetricSeries:
+    """
+    Growable array of (time, value) points, both float64 seconds. Appends are amortized O(1) (the
+    capacity doubles when it's full), and metrics, time and value are views of the points added so far,
+    so they're never copied (but a view may stop reflecting new points after the next growth).
+    With change_points, a run of equal values is kept as its first and last points only: the line drawn
+    through the points is the same, but a flat series takes 2 points instead of one per packet.
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY, change_points: bool = False):
+        self.points = np.empty(capacity, dtype=METRIC_POINT_DTYPE)
+        self.size = 0
+        self.change_points = change_points
+        self.last_values = (None, None)
+
+    def append(self, time: float, value: float):
+        if self.change_points and self.last_values == (value, value):
+            self.points['time'][self.size - 1] = time
+            return
+        self.last_values = (self.last_values[1], value)
+        if self.size == len(self.points):
+            grown = np.empty(max(2 * len(self.points), INITIAL_CAPACITY), dtype=METRIC_POINT_DTYPE)
+            grown[:self.size] = self.points
+            self.points = grown
+        self.points[self.size] = (time, value)
+        self.size += 1
+
+    def extend(self, time: np.ndarray, value: np.ndarray):
+        """
+        Appends many points at once (one by one with change_points, which has to look at each of them)
+        """
+        if self.change_points:
+            for point_time, point_value in zip(time.tolist(), value.tolist()):
+                self.append(point_time, point_value)
+            return
+        size = self.size + len(time)
+        if size > len(self.points):
+            grown = np.empty(max(size, 2 * len(self.points), INITIAL_CAPACITY), dtype=METRIC_POINT_DTYPE)
+            grown[:self.size] = self.metrics
+            self.points = grown
+        self.points['time'][self.size:size] = time
+        self.points['value'][self.size:size] = value
+        self.size = size
 
+    def reset(self):
+        self.points = np.empty(INITIAL_CAPACITY, dtype=METRIC_POINT_DTYPE)
+        self.size = 0
+        self.last_values = (None, None)
 
-class TimeoutMetrics:
+    def __len__(self) -> int:
+        return self.size
 
-    def __init__(self):
-        self.metrics: List[Tuple[Time, Decimal]] = []
-        self.timeout_value_type: str = "ms"  # ms (milliseconds) or s (seconds)
+    def __getstate__(self):
+        return {**self.__dict__, 'points': self.metrics.copy()}
 
-    def add_metric(self, time: Time, timeout: Time):
-        self.metrics.append((time, timeout.value))
+    def __setstate__(self, state):
+        self.__dict__.update(state)
 
-    def reset(self):
-        self.metrics = []
+    @property
+    def metrics(self) -> np.ndarray:
+        return self.points[:self.size]
 
     @property
-    def time(self) -> List[Decimal]:
-        return [time.value for time, _ in self.metrics]
+    def time(self) -> np.ndarray:
+        return self.points['time'][:self.size]
 
     @property
-    def value(self) -> List[Decimal]:
-        return [value for _, value in self.metrics]
+    def value(self) -> np.ndarray:
+        return self.points['value'][:self.size]
 
 
-class CongestionWindowMetrics:
+class TimeoutMetrics(MetricSeries):
 
     def __init__(self):
-        self.metrics: List[Tuple[Time, float]] = []
+        super().__init__()
+        self.timeout_value_type: str = "ms"  # ms (milliseconds) or s (seconds)
 
-    def add_metric(self, time: Time, metric: float):
-        self.metrics.append((time, metric))
+    def add_metric(self, time: Time | FixedTime, timeout: Time | FixedTime):
+        self.append(float(time), float(timeout))
 
-    @property
-    def time(self) -> List[Decimal]:
-        return [time.value for time, _ in self.metrics]
 
-    @property
-    def value(self) -> List[float]:
-        return [value for _, value in self.metrics]
+class CongestionWindowMetrics(MetricSeries):
 
-    def reset(self):
-        self.metrics = []
+    def add_metric(self, time: Time | FixedTime, metric: float):
+        self.append(float(time), metric)
 
 
 @dataclass(frozen=True)
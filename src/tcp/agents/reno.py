@@ -6,17 +6,21 @@ from src.tcp.congestion_window.slow_start import SlowStart, CWND_ACTION
 from src.tcp.timeout.jacobson_karels import JacobsonKarelsTimeoutEstimator
 from src.tcp.agents.tcp_agent import TcpAgent, timeout_func
 from src.tcp.timeout.timeout import Timeout
-from src.trace.trace_file import Time, PacketEvent
+from src.trace.trace_file import Time, PacketEvent, TimeType
 
 
 class TcpReno(TcpAgent):
 
     def __init__(self, initial_timeout: str = "3.0", fast_retransmit_threshold: int = 3, initial_value: int = 1,
-                 slow_start_threshold: int = 20, mss: int = 1000):
+                 slow_start_threshold: int = 20, mss: int = 1000, time_type: TimeType = Time):
         super().__init__()
+        self.parameters = dict(initial_timeout=initial_timeout, fast_retransmit_threshold=fast_retransmit_threshold,
+                               initial_value=initial_value, slow_start_threshold=slow_start_threshold, mss=mss,
+                               time_type=time_type.__name__)
         self.timeout_metric.timeout_value_type = "s"
         self.state = TcpState()
-        estimator = JacobsonKarelsTimeoutEstimator(Time.from_str(initial_timeout))
+        self.metrics_offset = time_type.from_str('0.02')
+        estimator = JacobsonKarelsTimeoutEstimator(time_type.from_str(initial_timeout))
         self.timeout_service = Timeout(estimator=estimator, timeout_func=timeout_func(self))
         self.cw = SlowStart(initial_value=initial_value, slow_start_threshold=slow_start_threshold, mss=mss)
         self.fast_retransmit = FastRetransmitState(start_fast_retransmit_threshold=fast_retransmit_threshold)
@@ -64,7 +68,7 @@ class TcpReno(TcpAgent):
 
     def timeout(self, timeout_time: Time):
         logging.debug(f'[TIMEOUT] Timeout on {timeout_time}')
-        self.congestion_window_metric.add_metric(timeout_time + Time.from_str('0.02'), self.cw.cw)
+        self.congestion_window_metric.add_metric(timeout_time + self.metrics_offset, self.cw.cw)
         self.fast_retransmit = self.fast_retransmit.ack()
         self.cw.has_timed_out()
         self.timeout_service.reset_timer(timeout_time)
@@ -72,6 +76,6 @@ class TcpReno(TcpAgent):
         self.add_metrics(timeout_time)
 
     def add_metrics(self, time: Time):
-        self.timeout_metric.add_metric(time + Time.from_str('0.02'),
-                                       (self.timeout_service.timeout + Time.from_str('0.02')))
-        self.congestion_window_metric.add_metric(time + Time.from_str('0.02'), self.cw.cw)
+        self.timeout_metric.add_metric(time + self.metrics_offset,
+                                       (self.timeout_service.timeout + self.metrics_offset))
+        self.congestion_window_metric.add_metric(time + self.metrics_offset, self.cw.cw)
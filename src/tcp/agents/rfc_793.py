@@ -5,15 +5,19 @@ from src.tcp.timeout.jacobson_karels import JacobsonKarelsTimeoutEstimator
 from src.tcp.agents.tcp_agent import TcpAgent, timeout_func
 from src.tcp.common.tcp_state import TcpState
 from src.tcp.timeout.timeout import Timeout
-from src.trace.trace_file import Time, PacketEvent
+from src.trace.trace_file import Time, PacketEvent, TimeType
 
 
 class TcpRfc793Agent(TcpAgent):
 
-    def __init__(self, cw_algorithm: CWAlgorithm, initial_timeout: str = "3.0", karn_rtt: bool = True):
+    def __init__(self, cw_algorithm: CWAlgorithm, initial_timeout: str = "3.0", karn_rtt: bool = True,
+                 time_type: TimeType = Time):
         super().__init__()
+        self.parameters = dict(cw_algorithm=type(cw_algorithm).__name__, **cw_algorithm.parameters,
+                               initial_timeout=initial_timeout, karn_rtt=karn_rtt, time_type=time_type.__name__)
         self.state = TcpState()
-        estimator = JacobsonKarelsTimeoutEstimator(Time.from_str(initial_timeout))
+        self.metrics_offset = time_type.from_str('0.02')
+        estimator = JacobsonKarelsTimeoutEstimator(time_type.from_str(initial_timeout))
         self.timeout_service = Timeout(estimator=estimator, timeout_func=timeout_func(self))
         self.cw = cw_algorithm
         self.karn_rtt = karn_rtt
@@ -54,12 +58,12 @@ class TcpRfc793Agent(TcpAgent):
 
     def timeout(self, timeout_time: Time):
         logging.debug(f'[TIMEOUT] Timeout on {timeout_time}')
-        self.congestion_window_metric.add_metric(timeout_time + Time.from_str('0.02'), self.cw.get_cw())
+        self.congestion_window_metric.add_metric(timeout_time + self.metrics_offset, self.cw.get_cw())
         self.cw.has_timed_out()
         self.timeout_service.reset_timer(timeout_time)
         self.add_metrics(timeout_time)
 
     def add_metrics(self, time: Time):
-        self.timeout_metric.add_metric(time + Time.from_str('0.02'),
-                                       (self.timeout_service.timeout + Time.from_str('0.02')) * 100)
-        self.congestion_window_metric.add_metric(time + Time.from_str('0.02'), self.cw.get_cw())
+        self.timeout_metric.add_metric(time + self.metrics_offset,
+                                       (self.timeout_service.timeout + self.metrics_offset) * 100)
+        self.congestion_window_metric.add_metric(time + self.metrics_offset, self.cw.get_cw())
@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
+from typing import Dict
 
 from src.metrics.metrics import CongestionWindowMetrics, TimeoutMetrics
+from src.tcp.timeout.scheduler import EventQueue
 from src.trace.trace_file import Time
 
 
@@ -12,11 +14,35 @@ class TcpAgent(ABC):
     def __init__(self):
         self.congestion_window_metric = CongestionWindowMetrics()
         self.timeout_metric = TimeoutMetrics()
+        self.parameters: Dict[str, object] = {}
+
+    def configuration(self) -> Dict[str, object]:
+        """
+        Class and parameters the agent was created with, and how its metrics and timers were set up: agents with
+        the same configuration give the same metrics on the same trace
+        """
+        return {'agent': type(self).__name__, **self.parameters,
+                'change_points': self.timeout_metric.change_points,
+                'catch_up_timeouts': self.timeout_service.scheduler.queue.catch_up}
 
     def reset_metrics(self):
         self.congestion_window_metric.reset()
         self.timeout_metric.reset()
 
+    def record_change_points(self, enabled: bool = True):
+        """
+        Keeps only the points where the metrics change (see MetricSeries), instead of one per packet
+        """
+        self.congestion_window_metric.change_points = enabled
+        self.timeout_metric.change_points = enabled
+
+    def use_event_queue(self, queue: EventQueue):
+        """
+        Keeps the expirations of the agent's timer on queue (e.g. one shared by many agents, or one that catches up
+        on missed expirations). Should be called before the agent gets any packet.
+        """
+        self.timeout_service.scheduler.queue = queue
+
     @abstractmethod
     def send_packet(self, packet):
         pass
@@ -31,7 +57,5 @@ class TcpAgent(ABC):
 
 
 def timeout_func(tcp_agent: TcpAgent):
-    def timeout_action(timeout_time: Time):
-        tcp_agent.timeout(timeout_time)
-
-    return timeout_action
+    # A bound method (unlike a closure) can be pickled, so agents can be checkpointed
+    return tcp_agent.timeout
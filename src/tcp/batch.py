@@ -0,0 +1,265 @@
+import csv
+import glob
+import json
+import logging
+import os
+import pathlib
+import time
+from argparse import Namespace
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
+
+from src.config.traces import trace_from
+from src.metrics.comparison import compare_metrics, save_comparison
+from src.metrics.export import export_metrics
+from src.metrics.metrics import TcpMetrics
+from src.tcp.agents.rfc_793 import TcpRfc793Agent
+from src.tcp.agents.tcp_agent import TcpAgent
+from src.tcp.sweep import SWEEP_PARAMETERS, summarize
+from src.tcp.tcp import Tcp
+from src.trace.congestion_window_file import CongestionWindowTraceFile
+from src.trace.index import INDEX_SUFFIX
+from src.trace.timeout_file import TimeoutTraceFile
+from src.trace.trace_file import Node
+
+# File names of a result set, as the Makefile writes them to ./data: one trace (and its references) per agent
+TRACE_PREFIX = 'trace_file_'
+TIMEOUT_PREFIX = 'timeout_'
+CONGESTION_WINDOW_PREFIX = 'congestion_window_'
+
+
+@dataclass
+class Scenario:
+    """
+    A trace to analyse, with the reference metrics ns-2 wrote for it (if any) and the agent arguments that
+    differ from the command line ones (e.g. implementation)
+    """
+    name: str
+    trace: str
+    timeout_file: str | None = None
+    congestion_file: str | None = None
+    parameters: Dict[str, str | int] = field(default_factory=dict)
+
+
+def _is_trace(path: pathlib.Path) -> bool:
+    """
+    False for the references of a result set and the sidecar indexes of the traces, which a glob can match too
+    """
+    return not (path.name.startswith((TIMEOUT_PREFIX, CONGESTION_WINDOW_PREFIX)) or path.name.endswith(INDEX_SUFFIX))
+
+
+def _result_sets(folder: pathlib.Path) -> List[Scenario]:
+    scenarios = []
+    # The name of '.' is empty
+    name = folder.resolve().name
+    for trace in sorted(filter(_is_trace, folder.glob(f'{TRACE_PREFIX}*'))):
+        agent, _, extension = trace.name[len(TRACE_PREFIX):].partition('.')
+        timeout = folder / f'{TIMEOUT_PREFIX}{agent}.{extension}'
+        congestion = folder / f'{CONGESTION_WINDOW_PREFIX}{agent}.{extension}'
+        has_references = timeout.is_file() and congestion.is_file()
+        scenarios.append(Scenario(name=f'{name}_{agent}', trace=str(trace),
+                                  timeout_file=str(timeout) if has_references else None,
+                                  congestion_file=str(congestion) if has_references else None,
+                                  parameters={'implementation': agent}))
+    return scenarios
+
+
+def find_scenarios(pattern: str) -> List[Scenario]:
+    """
+    Scenarios of the files and folders matching the glob pattern. A file is a trace on its own (unless it's a
+    reference or an index, see _is_trace); a folder holds trace_file_{agent}.res traces, each with its
+    timeout_{agent}.res and congestion_window_{agent}.res references, analysed with that agent (rfc793 or reno).
+    """
+    scenarios = []
+    for match in sorted(glob.glob(pattern)):
+        path = pathlib.Path(match)
+        if path.is_dir():
+            scenarios.extend(_result_sets(path))
+        elif path.is_file() and _is_trace(path):
+            scenarios.append(Scenario(name=path.name.partition('.')[0], trace=str(path)))
+    return scenarios
+
+
+def load_manifest(file_name: str) -> List[Scenario]:
+    """
+    Scenarios listed on a JSON file: a list of objects with the trace, optionally a name, the timeout_file and
+    congestion_file references, and agent arguments (the ones --sweep takes). Relative paths are taken from the
+    folder of the manifest.
+    """
+    folder = pathlib.Path(file_name).parent
+    with open(file_name) as file:
+        entries = json.load(file)
+    scenarios = []
+    for entry in entries:
+        entry = dict(entry)
+        if 'trace' not in entry:
+            raise ValueError(f"Invalid batch manifest {file_name}: scenario without trace: {entry}")
+        trace = str(folder / entry.pop('trace'))
+        references = {key: str(folder / entry.pop(key)) for key in ('timeout_file', 'congestion_file')
+                      if key in entry}
+        name = entry.pop('name', pathlib.Path(trace).name.partition('.')[0])
+        parameters = {key.replace('-', '_'): value for key, value in entry.items()}
+        if unknown := set(parameters) - set(SWEEP_PARAMETERS):
+            raise ValueError(f"Invalid batch manifest {file_name}: unknown parameters {', '.join(sorted(unknown))} "
+                             f"(expected {', '.join(SWEEP_PARAMETERS)})")
+        parameters = {key: SWEEP_PARAMETERS[key](value) for key, value in parameters.items()}
+        scenarios.append(Scenario(name=name, trace=trace, parameters=parameters, **references))
+    return scenarios
+
+
+def scenarios_from(source: str) -> List[Scenario]:
+    """
+    Scenarios of a JSON manifest (see load_manifest), or of a glob pattern (see find_scenarios) otherwise.
+    Every scenario is saved to a folder named after it, so their names should be unique.
+    """
+    if source.endswith('.json') and pathlib.Path(source).is_file():
+        scenarios = load_manifest(source)
+    else:
+        scenarios = find_scenarios(source)
+    names = [scenario.name for scenario in scenarios]
+    if duplicated := sorted({name for name in names if names.count(name) > 1}):
+        raise ValueError(f"Invalid batch {source}: more than one scenario named {', '.join(duplicated)} (rename the "
+                         f"traces or give them names on a manifest)")
+    return scenarios
+
+
+@dataclass(frozen=True)
+class BatchResult:
+    name: str
+    status: str
+    seconds: float
+    summary: Dict[str, float | int | str]
+    error: str | None = None
+
+
+def _save(metrics: TcpMetrics, original: TcpMetrics | None, folder: str, args: Namespace) -> None:
+    if args.export:
+        export_metrics(metrics=metrics, folder=folder, type="program", format=args.export)
+        if original:
+            export_metrics(metrics=original, folder=folder, type="original", format=args.export)
+        return
+    from src.metrics.matplotlib_metrics import print_metric, print_metrics
+    if original:
+        print_metrics(original=original, program=metrics, folder=folder, decimate=args.decimate)
+    else:
+        print_metric(metrics=metrics, folder=folder, type="program", decimate=args.decimate)
+
+
+def _analyse(agent_factory: Callable[[Namespace], TcpAgent], args: Namespace, scenario: Scenario,
+             folder: str) -> BatchResult:
+    """
+    Analyses a scenario, saving its metrics (and comparison, if it has references) to {folder}/{name}.
+    Any error is reported on the result instead of raised, so it only fails this scenario.
+    """
+    start = time.perf_counter()
+    try:
+        agent = agent_factory(Namespace(**{**vars(args), **scenario.parameters}))
+        metrics = Tcp(agent=agent, node=Node(identifier=args.node), streaming=args.streaming,
+                      kernel=args.kernel).get_metrics(trace_from(args, scenario.trace, jobs=1))
+        summary = summarize(metrics)
+        output = f'{folder}/{scenario.name}'
+        os.makedirs(output, exist_ok=True)
+        original = None
+        if scenario.timeout_file and scenario.congestion_file:
+            timeout = TimeoutTraceFile(file_name=scenario.timeout_file).get_metrics()
+            timeout.timeout_value_type = "ms" if isinstance(agent, TcpRfc793Agent) else "s"
+            congestion = CongestionWindowTraceFile(file_name=scenario.congestion_file).get_metrics()
+            original = TcpMetrics(timeout_metrics=timeout, congestion_window_metrics=congestion)
+            comparison = compare_metrics(original=original, program=metrics, tolerance=args.compare_tolerance)
+            save_comparison(comparison, folder=output)
+            summary.update(timeout_max_error=comparison.timeout.max_absolute_error,
+                           cw_max_error=comparison.congestion_window.max_absolute_error,
+                           cw_disagreement=comparison.congestion_window.disagreement_fraction)
+        _save(metrics, original, output, args)
+        return BatchResult(name=scenario.name, status='ok', seconds=time.perf_counter() - start, summary=summary)
+    except Exception as e:
+        logging.error(f"Scenario {scenario.name} failed: {e}")
+        return BatchResult(name=scenario.name, status='failed', seconds=time.perf_counter() - start, summary={},
+                           error=f'{type(e).__name__}: {e}')
+
+
+class Batch:
+    """
+    Analyses many scenarios (see scenarios_from), at most jobs at the same time on worker processes. Each
+    scenario gets the command line arguments (args) with its own parameters on top, and a failing scenario
+    doesn't stop the others. If a worker process dies (e.g. killed for running out of memory), the scenarios
+    that didn't finish are analysed again one per process, so only the one that kills its process fails.
+    The jobs go to the scenarios, so the trace of each one is read as --jobs 1 would (see trace_from).
+    """
+
+    def __init__(self, args: Namespace, scenarios: List[Scenario], agent_factory: Callable[[Namespace], TcpAgent],
+                 folder: str, jobs: int = 1):
+        self.args = args
+        self.scenarios = scenarios
+        self.agent_factory = agent_factory
+        self.folder = folder
+        self.jobs = jobs
+
+    def run(self) -> List[BatchResult]:
+        logging.info(f"Analysing {len(self.scenarios)} scenarios on {self.jobs} processes")
+        if self.jobs <= 1:
+            return [_analyse(self.agent_factory, self.args, scenario, self.folder) for scenario in self.scenarios]
+        results: List[BatchResult | None] = [None] * len(self.scenarios)
+        with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+            futures = [executor.submit(_analyse, self.agent_factory, self.args, scenario, self.folder)
+                       for scenario in self.scenarios]
+            for position, future in enumerate(futures):
+                try:
+                    results[position] = future.result()
+                except BrokenProcessPool:
+                    pass
+                except Exception as e:
+                    logging.error(f"Scenario {self.scenarios[position].name} failed: {e}")
+                    results[position] = BatchResult(name=self.scenarios[position].name, status='failed', seconds=0.0,
+                                                    summary={}, error=f'{type(e).__name__}: {e}')
+        unfinished = [position for position, result in enumerate(results) if result is None]
+        if unfinished:
+            logging.warning(f"A worker process died, analysing the {len(unfinished)} unfinished scenarios again "
+                            f"one per process")
+        for position in unfinished:
+            results[position] = self.__isolated(self.scenarios[position])
+        return results
+
+    def __isolated(self, scenario: Scenario) -> BatchResult:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            try:
+                return executor.submit(_analyse, self.agent_factory, self.args, scenario, self.folder).result()
+            except BrokenProcessPool as e:
+                logging.error(f"Scenario {scenario.name} failed: its worker process died")
+                return BatchResult(name=scenario.name, status='failed', seconds=0.0, summary={},
+                                   error=f'{type(e).__name__}: {e}')
+
+
+def _summary_columns(results: List[BatchResult]) -> List[str]:
+    return list(dict.fromkeys(key for result in results for key in result.summary))
+
+
+def _cell(value: float | int | str) -> str:
+    return f'{value:.4f}' if isinstance(value, float) else str(value)
+
+
+def format_summary(results: List[BatchResult]) -> str:
+    columns = _summary_columns(results)
+    header = ['scenario', 'status', 'seconds', *columns]
+    rows = [[result.name, result.status, f'{result.seconds:.2f}',
+             *[_cell(result.summary[column]) if column in result.summary else '-' for column in columns]]
+            for result in results]
+    widths = [max(len(cell) for cell in column) for column in zip(header, *rows)]
+    failed = [result for result in results if result.status != 'ok']
+    lines = ['  '.join(cell.rjust(width) for cell, width in zip(row, widths)) for row in [header, *rows]]
+    lines.append(f'{len(results) - len(failed)} scenarios analysed, {len(failed)} failed')
+    lines.extend(f'  {result.name}: {result.error}' for result in failed)
+    return '\n'.join(lines)
+
+
+def save_summary(results: List[BatchResult], file: str) -> None:
+    columns = _summary_columns(results)
+    with open(file, 'w', newline='') as output:
+        writer = csv.writer(output)
+        writer.writerow(['scenario', 'status', 'seconds', *columns, 'error'])
+        writer.writerows([result.name, result.status, result.seconds,
+                          *[result.summary.get(column, '') for column in columns], result.error or '']
+                         for result in results)
+    logging.info(f"Saved batch summary. File path: {file}")
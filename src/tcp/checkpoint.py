@@ -0,0 +1,100 @@
+import hashlib
+import io
+import logging
+import os
+import pathlib
+import pickle
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict
+
+from src.tcp.agents.tcp_agent import TcpAgent
+from src.trace.trace_file import Time, FixedTime
+
+DIGEST_BYTES = 4096
+# Modules whose classes make up the state of a checkpoint, and the only ones it can name (see Checkpoint.load)
+STATE_MODULES = ('src.tcp.checkpoint', 'src.tcp.agents.', 'src.tcp.common.', 'src.tcp.congestion_window.',
+                 'src.tcp.timeout.', 'src.metrics.metrics', 'src.trace.trace_file')
+STATE_GLOBALS = {('decimal', 'Decimal'), ('numpy', 'dtype'), ('numpy', 'ndarray'),
+                 ('numpy.core.numeric', '_frombuffer'), ('numpy._core.numeric', '_frombuffer'),
+                 ('numpy.core.multiarray', '_reconstruct'), ('numpy._core.multiarray', '_reconstruct')}
+
+
+@dataclass
+class StreamState:
+    """
+    Running totals of the checks done while streaming the trace (see Tcp.stream_packages)
+    """
+    packets_enqueued: int = 0
+    packets_dequeued: int = 0
+    last_time: Time | FixedTime | None = None
+
+
+class _StateUnpickler(pickle.Unpickler):
+    """
+    Unpickler that can only build the classes of the simulation state, and none of the functions (os.system,
+    getattr...) a crafted file could call through a plain pickle
+    """
+
+    def find_class(self, module: str, name: str):
+        if (module, name) in STATE_GLOBALS:
+            return super().find_class(module, name)
+        if module.startswith(STATE_MODULES):
+            value = super().find_class(module, name)
+            if isinstance(value, type) and value.__module__ == module:
+                return value
+        raise pickle.UnpicklingError(f'Invalid checkpoint: it refers to {module}.{name}, which is not part of the '
+                                     f'simulation state')
+
+
+def prefix_digest(file_name: str, offset: int) -> str:
+    """
+    Hash of the length of the first offset bytes, and of the DIGEST_BYTES at their start and right before offset,
+    to detect that a trace was rewritten instead of appended to (a new simulation writes a new header, and
+    different packets right before the offset) without reading the whole prefix again
+    """
+    digest = hashlib.blake2b(str(offset).encode(), digest_size=16)
+    with open(file_name, 'rb') as file:
+        digest.update(file.read(min(offset, DIGEST_BYTES)))
+        file.seek(max(0, offset - DIGEST_BYTES))
+        digest.update(file.read(min(offset, DIGEST_BYTES)))
+    return digest.hexdigest()
+
+
+@dataclass
+class Checkpoint:
+    """
+    State of a simulation after reading the trace up to offset (in bytes): the agent with its timers, congestion
+    window and metrics so far, and the streaming checks. Simulating the rest of the trace from a checkpoint gives
+    the same result as simulating the whole trace again, with the same configuration (of the agent and the node,
+    see Tcp.resume_metrics).
+    Checkpoints are pickles, loaded only with the classes of the simulation state, but still meant to be written
+    and read back by this program: don't load checkpoints from sources you don't trust.
+    """
+    agent: TcpAgent
+    offset: int
+    digest: str
+    stream: StreamState = field(default_factory=StreamState)
+    configuration: Dict[str, object] = field(default_factory=dict)
+
+    @staticmethod
+    def load(file_name: str) -> 'Checkpoint | None':
+        if not pathlib.Path(file_name).is_file():
+            return None
+        with open(file_name, 'rb') as file:
+            checkpoint = _StateUnpickler(io.BytesIO(zlib.decompress(file.read()))).load()
+        if not isinstance(checkpoint, Checkpoint):
+            raise ValueError(f'Invalid checkpoint: {file_name}')
+        logging.info(f"Loaded checkpoint {file_name} at byte {checkpoint.offset} of the trace")
+        return checkpoint
+
+    def save(self, file_name: str) -> None:
+        temporary = f'{file_name}.tmp'
+        with open(temporary, 'wb') as file:
+            file.write(zlib.compress(pickle.dumps(self, protocol=pickle.HIGHEST_PROTOCOL)))
+        os.replace(temporary, file_name)
+        logging.info(f"Saved checkpoint {file_name} at byte {self.offset} of the trace")
+
+    def is_valid_for(self, file_name: str) -> bool:
+        return (pathlib.Path(file_name).stat().st_size >= self.offset
+                and prefix_digest(file_name, self.offset) == self.digest)
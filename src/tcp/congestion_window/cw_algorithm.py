@@ -1,9 +1,12 @@
 from abc import ABC, abstractmethod
+from typing import Dict
 
 from src.tcp.congestion_window.cw import CongestionWindow
 
 
 class CWAlgorithm(ABC):
+    # What the algorithm was created with (see TcpAgent.configuration)
+    parameters: Dict[str, object] = {}
 
     @abstractmethod
     def recv_ack(self):
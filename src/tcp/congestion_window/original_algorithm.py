@@ -5,6 +5,7 @@ from src.tcp.congestion_window.cw_algorithm import CWAlgorithm
 class Rfc793CongestionControl(CWAlgorithm):
 
     def __init__(self, initial_value: int = 1, max_congestion_window: int = 20, mss: int = 1000):
+        self.parameters = dict(initial_value=initial_value, max_congestion_window=max_congestion_window, mss=mss)
         self.initial_congestion_window: CongestionWindow = CongestionWindow(initial_value, mss=mss)
         self.congestion_window: CongestionWindow = CongestionWindow(initial_value, mss=mss)
         self.max_congestion_window: CongestionWindow = CongestionWindow(max_congestion_window, mss=mss)
@@ -13,6 +13,7 @@ class CWND_ACTION(Enum):
 class SlowStart(CWAlgorithm):
 
     def __init__(self, initial_value: int = 1, slow_start_threshold: int = 20, mss: int = 1000):
+        self.parameters = dict(initial_value=initial_value, slow_start_threshold=slow_start_threshold, mss=mss)
         self.initial_congestion_window: CongestionWindow = CongestionWindow(initial_value, mss=mss)
         self.congestion_window: CongestionWindow = CongestionWindow(initial_value, mss=mss)
         self.slow_start_threshold: CongestionWindow = CongestionWindow(slow_start_threshold, mss=mss)
@@ -0,0 +1,197 @@
+import logging
+from decimal import Decimal
+from typing import Iterable, List
+
+import numpy as np
+
+from src.metrics.metrics import TcpMetrics
+from src.tcp.agents.reno import TcpReno
+from src.tcp.agents.rfc_793 import TcpRfc793Agent
+from src.tcp.common.fast_retransmit import FastRetransmitState
+from src.tcp.common.tcp_state import TcpState
+from src.tcp.congestion_window.cw import CongestionWindow
+from src.tcp.congestion_window.original_algorithm import Rfc793CongestionControl
+from src.tcp.congestion_window.slow_start import SlowStart, CWND_ACTION
+from src.tcp.timeout.jacobson_karels import ALPHA, BETA
+from src.trace.columnar import PACKET_TYPE_CODES
+from src.trace.trace_file import FixedTime, Time, PacketEvent, PacketType, SequenceNumber, half_ticks
+
+SEND, RECEIVE, OTHER = 1, 0, -1
+DUPACK, EXITED = CWND_ACTION.CWND_ACTION_DUPACK, CWND_ACTION.CWND_ACTION_EXITED
+
+
+def simulate_columns(agent: TcpReno | TcpRfc793Agent, columns: np.ndarray) -> TcpMetrics:
+    """
+    Runs the agent over the rows of the TCP sender (as returned by Tcp.get_columns) without building any
+    PacketEvent
+    """
+    fixed = isinstance(agent.metrics_offset, FixedTime)
+    parse = (lambda value: FixedTime.from_str(value).ticks) if fixed else Decimal
+    kinds = np.where(columns['packet_type'] == PACKET_TYPE_CODES[PacketType.Tcp], SEND,
+                     np.where(columns['packet_type'] == PACKET_TYPE_CODES[PacketType.Ack], RECEIVE, OTHER))
+    # Same decimal values to_packet_events gives (see there)
+    times = [parse(repr(time)) for time in columns['time'].tolist()]
+    return simulate(agent, kinds.tolist(), times, columns['sequence_number'].tolist())
+
+
+def simulate_packets(agent: TcpReno | TcpRfc793Agent, packets: Iterable[PacketEvent]) -> TcpMetrics:
+    fixed = isinstance(agent.metrics_offset, FixedTime)
+    kinds, times, sequence_numbers = [], [], []
+    for packet in packets:
+        kinds.append(SEND if packet.packet_type == PacketType.Tcp else
+                     RECEIVE if packet.packet_type == PacketType.Ack else OTHER)
+        times.append(packet.time.ticks if fixed else packet.time.value)
+        sequence_numbers.append(packet.sequence_number.value)
+    return simulate(agent, kinds, times, sequence_numbers)
+
+
+def simulate(agent: TcpReno | TcpRfc793Agent, kinds: List[int], times: List[int | Decimal],
+             sequence_numbers: List[int]) -> TcpMetrics:
+    """
+    Same simulation as feeding the packets one by one to TcpReno or TcpRfc793Agent (with SlowStart or
+    Rfc793CongestionControl), giving bit-identical metrics several times faster: the state of the agent is
+    loaded into plain local variables (times as integer picoseconds with fixed point time, as decimals
+    otherwise), updated in place by a single loop, and written back to the agent at the end.
+    kinds are SEND (TCP segment), RECEIVE (ack) or OTHER (ignored).
+    """
+    reno = isinstance(agent, TcpReno)
+    if not reno and not isinstance(agent, TcpRfc793Agent):
+        raise ValueError(f"The simulation kernel doesn't support {type(agent).__name__}")
+    cw = agent.cw
+    slow_start = isinstance(cw, SlowStart)
+    if not slow_start and not isinstance(cw, Rfc793CongestionControl):
+        raise ValueError(f"The simulation kernel doesn't support {type(cw).__name__}")
+    fixed = isinstance(agent.metrics_offset, FixedTime)
+    raw = (lambda time: time.ticks) if fixed else (lambda time: time.value)
+    wrap = FixedTime if fixed else Time
+    to_float = FixedTime.TICKS_PER_SECOND.__rtruediv__ if fixed else float
+    alpha, beta = ALPHA.as_integer_ratio(), BETA.as_integer_ratio()
+
+    def times_gain(time, gain, ratio):
+        if fixed:
+            return (2 * time * ratio[0] + ratio[1]) // (2 * ratio[1])
+        return time * gain
+
+    def optional(value, convert):
+        return None if value is None else convert(value)
+
+    agent.reset_metrics()
+    add_timeout = agent.timeout_metric.append
+    add_congestion_window = agent.congestion_window_metric.append
+    timeout_scale = 1 if reno else 100
+    offset = raw(agent.metrics_offset)
+    last_ack = optional(agent.state.last_recv_ack, lambda sequence: sequence.value)
+    highest = optional(agent.state.highest_package_sent, lambda sequence: sequence.value)
+    if reno:
+        threshold = agent.fast_retransmit.start_fast_retransmit_threshold
+        duplicated_acks = agent.fast_retransmit.duplicated_ack
+        recover = optional(agent.fast_retransmit.recover, lambda sequence: sequence.value)
+    mss = cw.congestion_window.mss
+    window = cw.congestion_window.bytes
+    initial = cw.initial_congestion_window.bytes
+    if slow_start:
+        slow_start_threshold, maximum, cw_state = cw.slow_start_threshold.bytes, cw.CWMAX.bytes, cw.state
+    else:
+        maximum = cw.max_congestion_window.bytes
+    service = agent.timeout_service
+    estimator, scheduler = service.estimator, service.scheduler
+    rtt_sequence = optional(service.seq_number_to_timeout, lambda sequence: sequence.value)
+    rtt_sent, rtt_active = raw(service.time_seq_number_was_sent), service.is_active
+    estimated_rtt, deviation = optional(estimator.estimated_rtt, raw), optional(estimator.deviation, raw)
+    timeout = raw(estimator.timeout)
+    timer = optional(scheduler.time_to_execute_action, raw)
+    catch_up = scheduler.queue.catch_up
+    karn_rtt = reno or agent.karn_rtt
+
+    for kind, now, sequence in zip(kinds, times, sequence_numbers):
+        if kind == OTHER:
+            logging.error(f"Not recognized package on {now}")
+            continue
+        while timer is not None and timer <= now:
+            expired = timer
+            metric_time = to_float(expired + offset)
+            add_congestion_window(metric_time, window / mss)
+            if reno:
+                duplicated_acks = 0
+            window = initial
+            if slow_start:
+                half = slow_start_threshold // 2
+                assert half > 0, "Initial bytes should be at least 1"
+                slow_start_threshold = half if initial / mss < half / mss else initial
+            timer, rtt_active = expired + timeout, False
+            if reno:
+                timeout = timeout * 2
+            add_timeout(metric_time, to_float((timeout + offset) * timeout_scale))
+            add_congestion_window(metric_time, window / mss)
+            if not catch_up or timer <= expired:
+                break
+        if kind == SEND:
+            force_timer = last_ack == highest
+            if highest is None or sequence > highest:
+                highest = sequence
+                if not rtt_active:
+                    assert rtt_sequence is None or sequence > rtt_sequence, \
+                        "If we're doing a timeout, the new one should have a bigger #seq"
+                    rtt_active, rtt_sequence, rtt_sent = True, sequence, now
+            elif not karn_rtt:
+                rtt_active, rtt_sequence, rtt_sent = True, sequence, now
+            if timer is None or timer <= now or force_timer:
+                timer = now + timeout
+        elif last_ack is None or sequence > last_ack:
+            timer = now + timeout if sequence < highest else None
+            if not slow_start:
+                window = maximum
+            else:
+                if cw_state == DUPACK:
+                    cw_state = EXITED
+                if window / mss >= slow_start_threshold / mss:
+                    window = window + int((mss / window) * mss)
+                    slow_start_threshold = window if window / mss < maximum / mss else maximum
+                else:
+                    window = window + mss
+            if reno:
+                duplicated_acks = 0
+            last_ack = sequence
+            if rtt_active and (rtt_sequence is None or sequence >= rtt_sequence):
+                rtt_active = False
+                if rtt_sent > now:
+                    raise ValueError("Begin time must be less than end time")
+                rtt = now - rtt_sent
+                if estimated_rtt is None:
+                    estimated_rtt, deviation = rtt, half_ticks(rtt) if fixed else rtt / 2
+                else:
+                    difference = rtt - estimated_rtt
+                    estimated_rtt = estimated_rtt + times_gain(difference, ALPHA, alpha)
+                    deviation = deviation + times_gain(abs(difference) - deviation, BETA, beta)
+                timeout = estimated_rtt + deviation * 4
+        elif reno and sequence == last_ack:
+            duplicated_acks += 1
+            if duplicated_acks == threshold and (recover is None or last_ack > recover or cw_state == DUPACK):
+                recover, cw_state = highest, DUPACK
+                half, window_half, maximum_half = slow_start_threshold // 2, window // 2, maximum // 2
+                assert half > 0 and window_half > 0 and maximum_half > 0, "Initial bytes should be at least 1"
+                slow_start_threshold = half if initial / mss < half / mss else initial
+                window = maximum_half if maximum_half / mss < window_half / mss else window_half
+                timer, rtt_active = now + timeout, False
+        metric_time = to_float(now + offset)
+        add_timeout(metric_time, to_float((timeout + offset) * timeout_scale))
+        add_congestion_window(metric_time, window / mss)
+
+    agent.state = TcpState(last_recv_ack=optional(last_ack, SequenceNumber),
+                           highest_package_sent=optional(highest, SequenceNumber))
+    if reno:
+        agent.fast_retransmit = FastRetransmitState(start_fast_retransmit_threshold=threshold,
+                                                    duplicated_ack=duplicated_acks,
+                                                    recover=optional(recover, SequenceNumber))
+    cw.congestion_window = CongestionWindow(initial_bytes=window, mss=mss)
+    if slow_start:
+        cw.slow_start_threshold = CongestionWindow(initial_bytes=slow_start_threshold, mss=mss)
+        cw.state = cw_state
+    service.seq_number_to_timeout = optional(rtt_sequence, SequenceNumber)
+    service.time_seq_number_was_sent, service.is_active = wrap(rtt_sent), rtt_active
+    estimator.estimated_rtt, estimator.deviation = optional(estimated_rtt, wrap), optional(deviation, wrap)
+    estimator.timeout = wrap(timeout)
+    scheduler.inactivate()
+    if timer is not None:
+        scheduler.set_timer(wrap(timer))
+    return TcpMetrics(agent.timeout_metric, agent.congestion_window_metric)
@@ -0,0 +1,106 @@
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, Generator, Set
+
+import numpy as np
+
+from src.metrics.metrics import TcpMetrics
+from src.tcp.agents.tcp_agent import TcpAgent
+from src.tcp.timeout.scheduler import EventQueue
+from src.trace.columnar import ColumnarTraceFile, EVENT_TYPE_CODES, PACKET_TYPE_CODES, to_packet_events
+from src.trace.filters import pushdown
+from src.trace.trace_file import Node, TraceFile, PacketType, PacketEvent, EventType, FlowIdentifier, Address
+
+
+@dataclass(frozen=True)
+class FlowKey:
+    """
+    Identifies a TCP sender on the trace: the node where it lives, its flow id and its address
+    """
+    node: Node
+    flow_id: FlowIdentifier
+    address: Address
+
+    def __str__(self):
+        return f'node_{self.node.identifier}_flow_{self.flow_id.value}_port_{self.address.port.value}'
+
+
+def route(packet: PacketEvent) -> FlowKey | None:
+    """
+    Returns the sender a packet belongs to: TCP segments enqueued on the node that created them, and acks
+    received on the node they're addressed to. Everything else (forwarding, cross traffic...) is None.
+    """
+    if (packet.packet_type == PacketType.Tcp and packet.event_type == EventType.PutQueue
+            and packet.source == packet.source_addr.node):
+        return FlowKey(node=packet.source, flow_id=packet.flow_id, address=packet.source_addr)
+    if (packet.packet_type == PacketType.Ack and packet.event_type == EventType.Received
+            and packet.destination == packet.destination_addr.node):
+        return FlowKey(node=packet.destination, flow_id=packet.flow_id, address=packet.destination_addr)
+    return None
+
+
+def routed_line(line: str) -> bool:
+    """
+    Raw text version of route, checked before parsing the line: enqueued TCP segments and received acks
+    """
+    if line[0] == EventType.PutQueue.value:
+        return line.split(' ', 5)[4] == PacketType.Tcp.value
+    if line[0] == EventType.Received.value:
+        return line.split(' ', 5)[4] == PacketType.Ack.value
+    return False
+
+
+def routed_mask(columns: np.ndarray) -> np.ndarray:
+    """
+    Vectorized version of route: True on the rows that belong to some sender
+    """
+    sent = ((columns['packet_type'] == PACKET_TYPE_CODES[PacketType.Tcp])
+            & (columns['event_type'] == EVENT_TYPE_CODES[EventType.PutQueue])
+            & (columns['source'] == columns['source_node']))
+    acked = ((columns['packet_type'] == PACKET_TYPE_CODES[PacketType.Ack])
+             & (columns['event_type'] == EVENT_TYPE_CODES[EventType.Received])
+             & (columns['destination'] == columns['destination_node']))
+    return sent | acked
+
+
+class MultiFlowTcp:
+    """
+    Simulates every TCP sender of a trace while reading it only once: each event is routed to the agent
+    of its flow, which is created with agent_factory the first time the flow shows up.
+    Unlike Tcp, cross traffic (cbr/exp) is allowed, since it's never routed to an agent.
+    If queue is given, the timers of every agent are kept on it, and fire in time order whichever flow the
+    next packet belongs to.
+    """
+
+    def __init__(self, agent_factory: Callable[[], TcpAgent], nodes: Set[Node] | None = None,
+                 queue: EventQueue | None = None):
+        self.agent_factory = agent_factory
+        self.nodes = nodes
+        self.queue = queue
+
+    def get_metrics(self, trace: TraceFile | ColumnarTraceFile) -> Dict[FlowKey, TcpMetrics]:
+        agents: Dict[FlowKey, TcpAgent] = {}
+        for packet in self.__packets(trace):
+            key = route(packet)
+            if key is None or (self.nodes is not None and key.node not in self.nodes):
+                continue
+            agent = agents.get(key)
+            if agent is None:
+                logging.info(f"New TCP flow found: {key}")
+                agent = agents[key] = self.agent_factory()
+                agent.reset_metrics()
+                if self.queue is not None:
+                    agent.use_event_queue(self.queue)
+            if packet.packet_type == PacketType.Tcp:
+                agent.send_packet(packet)
+            else:
+                agent.recv_packet(packet)
+        return {key: TcpMetrics(agent.timeout_metric, agent.congestion_window_metric) for key, agent in agents.items()}
+
+    @staticmethod
+    def __packets(trace: TraceFile | ColumnarTraceFile) -> Generator[PacketEvent, None, None]:
+        if isinstance(trace, ColumnarTraceFile):
+            for batch in trace:
+                yield from to_packet_events(batch[routed_mask(batch)], trace.time_type)
+        else:
+            yield from pushdown(trace, routed_line)
@@ -0,0 +1,134 @@
+import csv
+import itertools
+import logging
+from argparse import Namespace
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from src.metrics.metrics import TcpMetrics
+from src.tcp.agents.tcp_agent import TcpAgent
+from src.tcp.tcp import Tcp
+from src.trace.columnar import ColumnarTraceFile
+from src.trace.trace_file import TraceFile, PacketEvent, Node
+
+SWEEP_PARAMETERS: Dict[str, Callable[[str], str | int]] = {
+    'implementation': str,
+    'initial_timeout': str,
+    'initial_cw': int,
+    'ssthreshold': int,
+    'frthreshold': int,
+    'max_cw': int,
+    'mss': int,
+}
+
+
+def parse_grid(values: List[str]) -> Dict[str, List[str | int]]:
+    """
+    Parses a grid given as PARAMETER=VALUE,VALUE... items, e.g. ['ssthreshold=10,20', 'implementation=reno,rfc793']
+    """
+    grid = {}
+    for item in values:
+        name, separator, options = item.partition('=')
+        name = name.strip().replace('-', '_')
+        if not separator or name not in SWEEP_PARAMETERS:
+            raise ValueError(f"Invalid sweep parameter: {item} (expected one of {', '.join(SWEEP_PARAMETERS)})")
+        grid[name] = [SWEEP_PARAMETERS[name](option) for option in options.split(',') if option]
+        if not grid[name]:
+            raise ValueError(f"Invalid sweep parameter: {item} (expected at least one value)")
+    return grid
+
+
+def summarize(metrics: TcpMetrics) -> Dict[str, float | int | str]:
+    """
+    Summary of a run: time-weighted mean, maximum and final value of the congestion window, number of times
+    it decreased (losses), and mean and maximum timeout, in timeout_unit (the one of the agent, see
+    TimeoutMetrics). Statistics of a series without points (e.g. no packet of the sender was found) are NaN.
+    """
+    time, window = metrics.congestion_window_metrics.time, metrics.congestion_window_metrics.value
+    timeout = metrics.timeout_metrics.value
+    span = time[-1] - time[0] if len(time) > 1 else 0
+    if len(window) == 0:
+        mean_cw = max_cw = final_cw = float('nan')
+    else:
+        mean_cw = float(np.sum(window[:-1] * np.diff(time)) / span) if span else float(np.mean(window))
+        max_cw, final_cw = float(np.max(window)), float(window[-1])
+    return {
+        'mean_cw': mean_cw,
+        'max_cw': max_cw,
+        'final_cw': final_cw,
+        'cw_decreases': int(np.count_nonzero(np.diff(window) < 0)),
+        'mean_timeout': float(np.mean(timeout)) if len(timeout) else float('nan'),
+        'max_timeout': float(np.max(timeout)) if len(timeout) else float('nan'),
+        'timeout_unit': metrics.timeout_metrics.timeout_value_type,
+    }
+
+
+@dataclass(frozen=True)
+class SweepResult:
+    parameters: Dict[str, str | int]
+    summary: Dict[str, float | int | str]
+
+
+_packets: List[PacketEvent] = []
+
+
+def _load_packets(packets: List[PacketEvent]):
+    global _packets
+    _packets = packets
+
+
+def _run(agent_factory: Callable[[Namespace], TcpAgent], args: Namespace,
+         parameters: Dict[str, str | int]) -> SweepResult:
+    agent = agent_factory(Namespace(**{**vars(args), **parameters}))
+    metrics = Tcp(agent=agent, node=Node(identifier=args.node), kernel=args.kernel).simulate(_packets)
+    return SweepResult(parameters=parameters, summary=summarize(metrics))
+
+
+class Sweep:
+    """
+    Runs one agent per combination of the grid values (the rest of the arguments are taken from args)
+    over the same packets, which are read, filtered and checked only once.
+    Configurations are spread over jobs worker processes, each receiving the packets once.
+    """
+
+    def __init__(self, args: Namespace, grid: Dict[str, List[str | int]],
+                 agent_factory: Callable[[Namespace], TcpAgent], jobs: int = 1):
+        self.args = args
+        self.grid = grid
+        self.agent_factory = agent_factory
+        self.jobs = jobs
+
+    def configurations(self) -> List[Dict[str, str | int]]:
+        return [dict(zip(self.grid, values)) for values in itertools.product(*self.grid.values())]
+
+    def run(self, tcp: Tcp, trace: TraceFile | ColumnarTraceFile) -> List[SweepResult]:
+        packets = list(tcp.select_packets(trace))
+        configurations = self.configurations()
+        logging.info(f"Sweeping {len(configurations)} configurations over {len(packets)} packets")
+        if self.jobs <= 1:
+            _load_packets(packets)
+            return [_run(self.agent_factory, self.args, parameters) for parameters in configurations]
+        with ProcessPoolExecutor(max_workers=self.jobs, initializer=_load_packets,
+                                 initargs=(packets,)) as executor:
+            futures = [executor.submit(_run, self.agent_factory, self.args, parameters)
+                       for parameters in configurations]
+            return [future.result() for future in futures]
+
+
+def format_table(results: List[SweepResult]) -> str:
+    header = [*results[0].parameters, *results[0].summary]
+    rows = [[str(value) if not isinstance(value, float) else f'{value:.4f}'
+             for value in [*result.parameters.values(), *result.summary.values()]] for result in results]
+    widths = [max(len(cell) for cell in column) for column in zip(header, *rows)]
+    return '\n'.join('  '.join(cell.rjust(width) for cell, width in zip(row, widths)) for row in [header, *rows])
+
+
+def save_csv(results: List[SweepResult], file: str) -> None:
+    with open(file, 'w', newline='') as output:
+        writer = csv.writer(output)
+        writer.writerow([*results[0].parameters, *results[0].summary])
+        writer.writerows([*result.parameters.values(), *result.summary.values()] for result in results)
+    logging.info(f"Saved sweep results. File path: {file}")
@@ -1,36 +1,140 @@
 import logging
-from typing import List
+from typing import List, Generator, Callable, Iterable, Tuple
 
+import numpy as np
+
+from src.config.profiler import stage, counted
 from src.metrics.metrics import TcpMetrics
 from src.tcp.agents.tcp_agent import TcpAgent
-from src.trace.filters import filter_packets_from_node, assert_tcp_packets, dequeue_packet_on
-from src.trace.trace_file import Node, TraceFile, PacketType, PacketEvent
+from src.tcp.checkpoint import Checkpoint, StreamState, prefix_digest
+from src.tcp.kernel import simulate_columns, simulate_packets
+from src.trace.columnar import ColumnarTraceFile, PACKET_TYPE_CODES, concatenate, to_packet_events
+from src.trace.filters import filter_packets_from_node, assert_tcp_packets, dequeue_packet_on, \
+    filter_columns_from_node, assert_tcp_columns, enqueue_packet_on, received, line_predicate, pushdown
+from src.trace.live import TraceTail
+from src.trace.trace_file import Node, TraceFile, PacketType, PacketEvent, Time
 
 
 class Tcp:
 
     def __init__(self, agent: TcpAgent, node: Node, assert_only_tcp: bool = True,
-                 assert_same_enqueue_as_dequeue: bool = True):
+                 assert_same_enqueue_as_dequeue: bool = True, streaming: bool = False, kernel: bool = False):
         self.agent = agent
         self.node = node
         self.assert_only_tcp = assert_only_tcp
         self.assert_same_enq_as_deq = assert_same_enqueue_as_dequeue
+        self.streaming = streaming
+        self.kernel = kernel
+
+    def get_metrics(self, trace: TraceFile | ColumnarTraceFile) -> TcpMetrics:
+        columnar = isinstance(trace, ColumnarTraceFile)
+        if self.streaming and not columnar:
+            with stage('stream and simulate'):
+                packets = counted(self.stream_packages(trace=trace), 'packets')
+                return self.simulate(packets)
+        with stage('select packets') as selecting:
+            packets = self.get_columns(trace=trace) if columnar else self.get_packages(trace=trace)
+            selecting.count(len(packets))
+        with stage('simulate') as simulating:
+            simulating.count(len(packets))
+            if self.kernel and columnar:
+                return simulate_columns(self.agent, packets)
+            return self.simulate(to_packet_events(packets, trace.time_type) if columnar else packets)
 
-    def get_metrics(self, trace: TraceFile) -> TcpMetrics:
+    def select_packets(self, trace: TraceFile | ColumnarTraceFile) -> Iterable[PacketEvent]:
+        """
+        Packets of the trace the agent is fed with, checked and filtered the way the kind of trace allows
+        """
+        if isinstance(trace, ColumnarTraceFile):
+            return to_packet_events(self.get_columns(trace=trace), trace.time_type)
+        if self.streaming:
+            return self.stream_packages(trace=trace)
+        return self.get_packages(trace=trace)
+
+    def simulate(self, packets: Iterable[PacketEvent]) -> TcpMetrics:
+        """
+        Runs the agent (on the simulation kernel, with kernel) over packets already selected from the trace
+        (see select_packets)
+        """
+        if self.kernel:
+            return simulate_packets(self.agent, packets)
         self.agent.reset_metrics()
-        packets_from_tcp_sender = self.get_packages(trace=trace)
-        for packet in packets_from_tcp_sender:
-            logging.debug(f'Packet: {packet}')
-            if packet.packet_type == PacketType.Tcp:
-                self.agent.send_packet(packet)
-            elif packet.packet_type == PacketType.Ack:
-                self.agent.recv_packet(packet)
-            else:
-                logging.error(f"Not recognized package: {packet.packet_type}")
+        for packet in packets:
+            self.__dispatch(packet)
         return TcpMetrics(self.agent.timeout_metric, self.agent.congestion_window_metric)
 
+    def follow_metrics(self, trace: TraceFile, flush_interval: Time,
+                       flush: Callable[[TcpMetrics], None]) -> TcpMetrics:
+        """
+        Feeds the agent while the trace is read (see stream_packages), and calls flush with the metrics so far
+        every flush_interval of simulated time, and once more at the end (or when interrupted with Ctrl+C).
+        A followed trace can end with packets still on the queue, so the enqueue/dequeue count is only warned about.
+        """
+        self.agent.reset_metrics()
+        metrics = TcpMetrics(self.agent.timeout_metric, self.agent.congestion_window_metric)
+        state, next_flush = StreamState(), None
+        try:
+            for packet in self.stream_packages(trace=trace, state=state, complete=False):
+                self.__dispatch(packet)
+                if next_flush is None:
+                    next_flush = packet.time + flush_interval
+                elif packet.time >= next_flush:
+                    flush(metrics)
+                    next_flush = packet.time + flush_interval
+        except KeyboardInterrupt:
+            logging.info("Interrupted, flushing the metrics computed so far")
+        self.__warn_pending(state)
+        flush(metrics)
+        return metrics
+
+    def resume_metrics(self, trace: TraceTail, checkpoint: Checkpoint | None) -> Tuple[TcpMetrics, Checkpoint]:
+        """
+        Simulates the trace from the checkpoint on (from the start if it's None, if the trace doesn't continue
+        the one it was taken from, or if it was taken with another agent configuration or node) with the agent it
+        holds, and returns the metrics and the checkpoint to resume from the next time
+        """
+        configuration = {**self.agent.configuration(), 'node': self.node.identifier}
+        if checkpoint is not None and checkpoint.configuration != configuration:
+            logging.warning(f"The agent or node changed since the checkpoint, simulating {trace.file_name} again")
+            checkpoint = None
+        elif checkpoint is not None and not checkpoint.is_valid_for(trace.file_name):
+            logging.warning(f"The trace {trace.file_name} changed since the checkpoint, simulating it again")
+            checkpoint = None
+        if checkpoint is not None:
+            self.agent, trace.offset, state = checkpoint.agent, checkpoint.offset, checkpoint.stream
+        else:
+            self.agent.reset_metrics()
+            trace.offset, state = 0, StreamState()
+        for packet in self.stream_packages(trace=trace, state=state, complete=False):
+            self.__dispatch(packet)
+        self.__warn_pending(state)
+        checkpoint = Checkpoint(agent=self.agent, offset=trace.offset,
+                                digest=prefix_digest(trace.file_name, trace.offset), stream=state,
+                                configuration=configuration)
+        return TcpMetrics(self.agent.timeout_metric, self.agent.congestion_window_metric), checkpoint
+
+    def __warn_pending(self, state: StreamState):
+        if self.assert_same_enq_as_deq and state.packets_enqueued != state.packets_dequeued:
+            logging.warning(f"{state.packets_enqueued - state.packets_dequeued} packets were enqueued but not "
+                            f"dequeued yet")
+
+    def __dispatch(self, packet: PacketEvent):
+        logging.debug(f'Packet: {packet}')
+        if packet.packet_type == PacketType.Tcp:
+            self.agent.send_packet(packet)
+        elif packet.packet_type == PacketType.Ack:
+            self.agent.recv_packet(packet)
+        else:
+            logging.error(f"Not recognized package: {packet.packet_type}")
+
     def get_packages(self, trace: TraceFile) -> List[PacketEvent]:
-        packets_enqueued_tcp_sender = list(filter_packets_from_node(node=self.node, trace=trace))
+        with stage('read and filter'):
+            packets_enqueued_tcp_sender = list(filter_packets_from_node(node=self.node, trace=trace))
+        with stage('validate'):
+            self.__validate_packages(packets_enqueued_tcp_sender, trace=trace)
+        return packets_enqueued_tcp_sender
+
+    def __validate_packages(self, packets_enqueued_tcp_sender: List[PacketEvent], trace: TraceFile):
         if self.assert_only_tcp:
             assert_tcp_packets(packets_enqueued_tcp_sender)
             received_packages = [packet for packet in packets_enqueued_tcp_sender if packet.destination == self.node]
@@ -45,4 +149,66 @@ class Tcp:
                                                                                "dequeued are not the same.")
         sorted_packets_enqueued_tcp_sender = sorted(packets_enqueued_tcp_sender, key=lambda packet: packet.time)
         assert sorted_packets_enqueued_tcp_sender == packets_enqueued_tcp_sender, "Packets are not sorted by time."
+
+    def stream_packages(self, trace: TraceFile, state: StreamState | None = None,
+                        complete: bool = True) -> Generator[PacketEvent, None, None]:
+        """
+        Same selection and checks as get_packages, but done incrementally while reading the trace once.
+        Packets are yielded as soon as they're read, so memory doesn't grow with the trace. The enqueue/dequeue
+        count can only be checked once the whole trace was read, so that error is raised at the end.
+        The totals of the checks are kept on state, to carry them on from a checkpoint, and the count is only
+        checked if the trace is complete (a trace still being written can have packets waiting on the queue).
+        """
+        state = state if state is not None else StreamState()
+        predicates = (enqueue_packet_on, received, dequeue_packet_on) if self.assert_same_enq_as_deq else (
+            enqueue_packet_on, received)
+        for packet in pushdown(trace, line_predicate(self.node, *predicates)):
+            is_received = received(self.node, packet)
+            if self.assert_same_enq_as_deq and (is_received or dequeue_packet_on(self.node, packet)):
+                state.packets_dequeued += 1
+            if not (is_received or enqueue_packet_on(self.node, packet)):
+                continue
+            if self.assert_only_tcp:
+                assert packet.packet_type is not PacketType.Udp, "Packets are not all TCP."
+                assert packet.destination != self.node or packet.packet_type == PacketType.Ack, \
+                    "There are non-Ack packets received by the TCP sender."
+                assert packet.source != self.node or packet.packet_type == PacketType.Tcp, \
+                    "There are non-TCP packets sent by the TCP sender."
+            assert state.last_time is None or state.last_time <= packet.time, "Packets are not sorted by time."
+            state.last_time = packet.time
+            state.packets_enqueued += 1
+            yield packet
+        if self.assert_same_enq_as_deq and complete:
+            assert state.packets_enqueued == state.packets_dequeued, ("Length of packets enqueued and dequeued "
+                                                                      "are not the same.")
+
+    def get_columns(self, trace: ColumnarTraceFile) -> np.ndarray:
+        """
+        Same selection and checks as get_packages, but done batch by batch over the columnar trace.
+        Only the rows of the TCP sender are kept in memory.
+        """
+        batches_enqueued_tcp_sender, packets_dequeued = [], 0
+        with stage('read and filter'):
+            for batch in counted(trace, 'batches'):
+                batches_enqueued_tcp_sender.append(filter_columns_from_node(node=self.node, columns=batch))
+                if self.assert_same_enq_as_deq:
+                    packets_dequeued += len(filter_columns_from_node(node=self.node, columns=batch,
+                                                                     send_func=dequeue_packet_on))
+            packets_enqueued_tcp_sender = concatenate(batches_enqueued_tcp_sender)
+        with stage('validate'):
+            self.__validate_columns(packets_enqueued_tcp_sender, packets_dequeued)
         return packets_enqueued_tcp_sender
+
+    def __validate_columns(self, packets_enqueued_tcp_sender: np.ndarray, packets_dequeued: int):
+        if self.assert_only_tcp:
+            assert_tcp_columns(packets_enqueued_tcp_sender)
+            received_packages = packets_enqueued_tcp_sender['destination'] == self.node.identifier
+            received_packages &= packets_enqueued_tcp_sender['packet_type'] != PACKET_TYPE_CODES[PacketType.Ack]
+            assert not np.any(received_packages), "There are non-Ack packets received by the TCP sender."
+            sent_packages = packets_enqueued_tcp_sender['source'] == self.node.identifier
+            sent_packages &= packets_enqueued_tcp_sender['packet_type'] != PACKET_TYPE_CODES[PacketType.Tcp]
+            assert not np.any(sent_packages), "There are non-TCP packets sent by the TCP sender."
+        if self.assert_same_enq_as_deq:
+            assert len(packets_enqueued_tcp_sender) == packets_dequeued, ("Length of packets enqueued and "
+                                                                          "dequeued are not the same.")
+        assert np.all(np.diff(packets_enqueued_tcp_sender['time']) >= 0), "Packets are not sorted by time."
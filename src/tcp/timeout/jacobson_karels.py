@@ -2,6 +2,9 @@ from decimal import Decimal
 
 from src.trace.trace_file import Time, TimeInterval
 
+ALPHA = Decimal("0.125")
+BETA = Decimal("0.25")
+
 
 class JacobsonKarelsTimeoutEstimator:
 
@@ -12,8 +15,6 @@ class JacobsonKarelsTimeoutEstimator:
 
     def recalculate_timeout(self, ack_recv_time: TimeInterval):
         rtt = ack_recv_time.end - ack_recv_time.begin
-        ALPHA = Decimal("0.125")
-        BETA = Decimal("0.25")
         if not self.estimated_rtt:
             self.estimated_rtt = rtt
             self.deviation = rtt.half()
@@ -21,4 +22,4 @@ class JacobsonKarelsTimeoutEstimator:
             diff = rtt - self.estimated_rtt
             self.estimated_rtt = self.estimated_rtt + diff * ALPHA
             self.deviation = self.deviation + (abs(diff) - self.deviation) * BETA
-        self.timeout = Time(self.estimated_rtt.value + 4 * self.deviation.value)
+        self.timeout = self.estimated_rtt + self.deviation * 4
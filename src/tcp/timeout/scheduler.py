@@ -1,25 +1,95 @@
-from typing import Callable
+import heapq
+from typing import Callable, Dict, List, Tuple
 
 from src.trace.trace_file import Time
 
 TimeoutFunc = Callable[[Time], None]
 
 
+class EventQueue:
+    """
+    Priority queue (binary heap) of timer expirations, shared by any number of timers of any number of agents.
+    Setting a timer is O(log n); re-setting or cancelling one is O(1), its previous expiration is left on the
+    heap and skipped when it comes out.
+    Without catch_up, each run only fires the expirations set before it started: a timer that expires again
+    while the agent handles its timeout fires on the next run (on the next packet), as ns-2 traces were
+    simulated so far. With catch_up, it fires right away, as many times as it's due, as long as each expiration
+    is later than the one that set it (a timer re-armed with a non-positive timeout would never catch up).
+    """
+
+    def __init__(self, catch_up: bool = False):
+        self.heap: List[Tuple[Time, int, 'Scheduler', int]] = []
+        self.pushed = 0
+        self.catch_up = catch_up
+
+    def push(self, time: Time, scheduler: 'Scheduler'):
+        heapq.heappush(self.heap, (time, self.pushed, scheduler, scheduler.generation))
+        self.pushed += 1
+
+    def run_until(self, time: Time):
+        """
+        Fires, in time order, every expiration up to time (with catch_up, also the ones set by the timers that
+        fired, e.g. the backoffs of repeated timeouts during a long idle period)
+        """
+        first_deferred, deferred = self.pushed, []
+        last_fired: Dict['Scheduler', Time] = {}
+        while self.heap and self.heap[0][0] <= time:
+            entry = heapq.heappop(self.heap)
+            expiration, order, scheduler, generation = entry
+            if generation != scheduler.generation:
+                continue
+            if order >= first_deferred and (not self.catch_up or (scheduler in last_fired and
+                                                                  expiration <= last_fired[scheduler])):
+                deferred.append(entry)
+                continue
+            scheduler.fire(expiration)
+            last_fired[scheduler] = expiration
+        for entry in deferred:
+            heapq.heappush(self.heap, entry)
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+
 class Scheduler:
+    """
+    Timer of an agent: runs timeout_action when it expires. Expirations are kept on queue, which can be shared
+    between timers so the ones of every agent are fired in time order.
+    """
 
-    def __init__(self, timeout_action: TimeoutFunc):
+    def __init__(self, timeout_action: TimeoutFunc, queue: EventQueue | None = None):
         self.action = timeout_action
+        self.queue = queue if queue is not None else EventQueue()
         self.time_to_execute_action: Time | None = None
+        self.generation = 0
+
+    def __getstate__(self):
+        # Pickled as the agent and the name of its method, so loading it doesn't need to call getattr (see
+        # Checkpoint.load)
+        state = self.__dict__.copy()
+        state['action'] = self.action.__self__, self.action.__name__
+        return state
+
+    def __setstate__(self, state: dict):
+        owner, name = state.pop('action')
+        self.__dict__.update(state)
+        self.action = getattr(owner, name)
 
     def inactivate(self):
+        self.generation += 1
         self.time_to_execute_action = None
 
     def set_timer(self, time: Time):
+        self.generation += 1
         self.time_to_execute_action = time
+        self.queue.push(time, self)
 
     def schedule(self, time: Time):
-        if self.time_to_execute_action and self.time_to_execute_action <= time:
-            self.action(self.time_to_execute_action)
+        self.queue.run_until(time)
+
+    def fire(self, time: Time):
+        self.generation += 1
+        self.action(time)
 
     def is_pending(self, current_time: Time):
         return self.time_to_execute_action and self.time_to_execute_action > current_time
@@ -10,7 +10,7 @@ from src.trace.trace_file import SequenceNumber, Time, PacketEvent, TimeInterval
 class Timeout:
     estimator: JacobsonKarelsTimeoutEstimator
     seq_number_to_timeout: SequenceNumber | None = None  # rtt_seq number of sequence being timed if rtt_active_ is 1
-    time_seq_number_was_sent: Time = Time.from_str("0")  # rtt_ts
+    time_seq_number_was_sent: Time | None = None  # rtt_ts, 0 (of the time type of the estimator) by default
     is_active: bool = False  # rtt_active
     timeout_func: InitVar[TimeoutFunc | None] = None
     scheduler: Scheduler = field(init=False)
@@ -18,6 +18,8 @@ class Timeout:
     def __post_init__(self, timeout_func: TimeoutFunc | None):
         if not timeout_func:
             raise ValueError("Specify a timeout function!")
+        if self.time_seq_number_was_sent is None:
+            self.time_seq_number_was_sent = type(self.estimator.timeout).from_str("0")
         self.scheduler = Scheduler(timeout_action=timeout_func)
 
     def received_ack(self, packet: PacketEvent):
@@ -0,0 +1,93 @@
+import hashlib
+import logging
+import os
+import pathlib
+import tempfile
+
+import numpy as np
+
+CACHE_SUFFIX = '.npy'
+DEFAULT_CACHE_BYTES = 2 * 1024 * 1024 * 1024
+HASH_BLOCK_BYTES = 1024 * 1024
+
+
+def content_hash(file_name: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_name, 'rb') as file:
+        while block := file.read(HASH_BLOCK_BYTES):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TraceCache:
+    """
+    Directory of parsed traces, stored as .npy files (the columnar rows) that are memory-mapped back
+    without any parsing.
+    Entries are keyed by the absolute path, size, modification time and content hash of the trace, so any change
+    to the trace misses the cache. Once the directory holds more than max_bytes, the least recently used entries
+    are removed.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_CACHE_BYTES):
+        assert max_bytes > 0, "The cache should be able to hold at least one byte"
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    def key(self, file_name: str) -> str:
+        stat = os.stat(file_name)
+        identity = f'{os.path.abspath(file_name)}:{stat.st_size}:{stat.st_mtime_ns}:{content_hash(file_name)}'
+        return hashlib.blake2b(identity.encode(), digest_size=16).hexdigest()
+
+    def path(self, key: str) -> pathlib.Path:
+        return self.directory / f'{key}{CACHE_SUFFIX}'
+
+    def get(self, key: str, dtype: np.dtype) -> np.ndarray | None:
+        path = self.path(key)
+        try:
+            columns = np.load(path, mmap_mode='r', allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+        if columns.dtype != dtype:
+            logging.warning(f"Ignoring cached trace {path}, it was written with another format")
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass  # Evicted by another run, the mapping is still valid
+        logging.info(f"Loaded {path} from the trace cache")
+        return columns
+
+    def put(self, key: str, columns: np.ndarray) -> None:
+        path = self.path(key)
+        temporary = None
+        try:
+            # A temporary file of its own, so concurrent runs caching the same trace don't write over each other
+            with tempfile.NamedTemporaryFile(dir=self.directory, prefix=f'{key}.', suffix='.tmp',
+                                             delete=False) as file:
+                temporary = pathlib.Path(file.name)
+                np.save(file, columns, allow_pickle=False)
+            os.replace(temporary, path)
+        except OSError as e:
+            logging.warning(f"Could not write {path} to the trace cache: {e}")
+            if temporary is not None:
+                temporary.unlink(missing_ok=True)
+            return
+        self.evict()
+
+    def evict(self) -> None:
+        # One snapshot of the entries, skipping the ones another run removes meanwhile
+        entries = []
+        for entry in self.directory.glob(f'*{CACHE_SUFFIX}'):
+            try:
+                entries.append((entry, entry.stat()))
+            except FileNotFoundError:
+                continue
+        entries.sort(key=lambda item: item[1].st_mtime_ns)
+        total = sum(stat.st_size for _, stat in entries)
+        for entry, stat in entries:
+            if total <= self.max_bytes:
+                break
+            total -= stat.st_size
+            entry.unlink(missing_ok=True)
+            logging.info(f"Evicted {entry} from the trace cache")
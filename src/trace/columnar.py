@@ -0,0 +1,289 @@
+import pathlib
+from decimal import Decimal
+from typing import Generator, Iterable
+
+import numpy as np
+
+from src.trace.cache import TraceCache
+from src.trace.compression import detect_compression, open_trace
+from src.trace.index import TraceIndex, DEFAULT_INDEX_INTERVAL
+from src.trace.trace_file import EventType, PacketType, PacketEvent, Time, Node, PacketSize, Flags, \
+    FlowIdentifier, Address, Port, SequenceNumber, PacketIdentifier, InternPool, TimeType
+
+PACKET_EVENT_DTYPE = np.dtype([
+    ('event_type', np.uint8),
+    ('time', np.float64),
+    ('source', np.int32),
+    ('destination', np.int32),
+    ('packet_type', np.uint8),
+    ('packet_size', np.int64),
+    ('flags', 'S7'),
+    ('flow_id', np.int32),
+    ('source_node', np.int32),
+    ('source_port', np.int32),
+    ('destination_node', np.int32),
+    ('destination_port', np.int32),
+    ('sequence_number', np.int64),
+    ('packet_identifier', np.int64),
+])
+
+# The codes stored in the 'event_type' and 'packet_type' columns are the positions on these tuples
+EVENT_TYPES = (EventType.PutQueue, EventType.DropQueue, EventType.Received, EventType.Dropped)
+PACKET_TYPES = (PacketType.Tcp, PacketType.Ack, PacketType.Udp)
+EVENT_TYPE_CODES = {event_type: code for code, event_type in enumerate(EVENT_TYPES)}
+PACKET_TYPE_CODES = {packet_type: code for code, packet_type in enumerate(PACKET_TYPES)}
+
+_EVENT_TOKENS = {event_type.value.encode(): EVENT_TYPE_CODES[event_type] for event_type in EVENT_TYPES}
+_PACKET_TOKENS = {b'tcp': PACKET_TYPE_CODES[PacketType.Tcp],
+                  b'ack': PACKET_TYPE_CODES[PacketType.Ack],
+                  b'cbr': PACKET_TYPE_CODES[PacketType.Udp],
+                  b'exp': PACKET_TYPE_CODES[PacketType.Udp]}
+_INVALID_CODE = 255
+FIELDS_PER_LINE = 12
+DEFAULT_BATCH_BYTES = 16 * 1024 * 1024
+CACHED_BATCH_ROWS = 1024 * 1024
+# Longest integer that is parsed exactly into an int64
+MAX_DIGITS = 18
+
+
+def _encode(tokens: np.ndarray, table: dict, name: str) -> np.ndarray:
+    codes = np.full(len(tokens), _INVALID_CODE, dtype=np.uint8)
+    for token, code in table.items():
+        codes[tokens == token] = code
+    if np.any(codes == _INVALID_CODE):
+        raise ValueError(f'Invalid {name}: {tokens[codes == _INVALID_CODE][0].decode()}')
+    return codes
+
+
+def _as_matrix(tokens: np.ndarray) -> np.ndarray:
+    """
+    Byte matrix (one row per token) of a column of fixed width tokens, shorter tokens are padded with zeros
+    """
+    tokens = np.ascontiguousarray(tokens)
+    return tokens.view(np.uint8).reshape(len(tokens), tokens.dtype.itemsize)
+
+
+def _parse_unsigned(matrix: np.ndarray, name: str, selected: np.ndarray | None = None) -> np.ndarray:
+    """
+    Parses the decimal digits of every row of a byte matrix (only the `selected` bytes, if given)
+    """
+    digits = matrix - np.uint8(ord('0'))
+    is_digit = digits < 10
+    if selected is None:
+        selected = matrix != 0
+    if not np.all(is_digit | ~selected) or not np.all(np.any(selected, axis=1)):
+        raise ValueError(f'Invalid {name}, expected a non-negative integer')
+    if np.any(np.count_nonzero(selected, axis=1) > MAX_DIGITS):
+        raise ValueError(f'Invalid {name}, more than {MAX_DIGITS} digits')
+    value = np.zeros(len(matrix), dtype=np.int64)
+    for column in range(matrix.shape[1]):
+        value = np.where(selected[:, column], value * 10 + digits[:, column], value)
+    return value
+
+
+def _parse_integers(tokens: np.ndarray, name: str) -> np.ndarray:
+    return _parse_unsigned(_as_matrix(tokens), name)
+
+
+def _split_addresses(tokens: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    matrix = _as_matrix(tokens)
+    is_dot = matrix == ord('.')
+    if not np.all(np.count_nonzero(is_dot, axis=1) == 1):
+        raise ValueError(f'Invalid address: {tokens[np.count_nonzero(is_dot, axis=1) != 1][0].decode()}, '
+                         f'not in the format "node.port"')
+    before_dot = np.cumsum(is_dot, axis=1) == 0
+    after_dot = ~before_dot & ~is_dot & (matrix != 0)
+    return _parse_unsigned(matrix, 'address node', before_dot), _parse_unsigned(matrix, 'address port', after_dot)
+
+
+def _store(columns: np.ndarray, column: str, values: np.ndarray, name: str) -> None:
+    """
+    Stores the values on a column, checking they fit its type instead of letting them wrap around
+    """
+    limits = np.iinfo(columns.dtype[column])
+    if len(values) and (values.min() < limits.min or values.max() > limits.max):
+        raise ValueError(f'Invalid {name}, {values.max()} does not fit in {columns.dtype[column]}')
+    columns[column] = values
+
+
+def _store_flags(columns: np.ndarray, tokens: np.ndarray) -> None:
+    """
+    Stores the flags, checking they fit the fixed width column instead of letting them be truncated
+    """
+    width = columns.dtype['flags'].itemsize
+    if tokens.dtype.itemsize > width:
+        too_long = np.char.str_len(tokens) > width
+        if np.any(too_long):
+            raise ValueError(f'Invalid flags: {tokens[too_long][0].decode()}, longer than {width} characters')
+    columns['flags'] = tokens
+
+
+def _parts_per_line(data: bytes) -> np.ndarray:
+    """
+    Number of parts on each line of a block (the last one may lack its newline) once split by single spaces, as
+    PacketEvent.from_str does
+    """
+    raw = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(raw == ord('\n'))
+    if data and not data.endswith(b'\n'):
+        ends = np.append(ends, len(data))
+    spaces = np.searchsorted(np.flatnonzero(raw == ord(' ')), ends)
+    return np.diff(spaces, prepend=0) + 1
+
+
+def parse_lines(data: bytes) -> np.ndarray:
+    """
+    Parses a block of complete ns-2 trace lines into a structured array with PACKET_EVENT_DTYPE.
+    Every column is converted at once, so the cost per line is a handful of vectorized operations
+    instead of the dozen objects that PacketEvent.from_str creates.
+    """
+    if b'\r' in data:
+        data = data.replace(b'\r\n', b'\n')
+    parts = _parts_per_line(data)
+    wrong = np.flatnonzero(parts != FIELDS_PER_LINE)
+    if len(wrong):
+        raise ValueError(f'Invalid trace block: expected {FIELDS_PER_LINE} parts on each line, got '
+                         f'{parts[wrong[0]]} on line {wrong[0] + 1} of the block')
+    lines = data[:-1] if data.endswith(b'\n') else data
+    tokens = np.array(lines.replace(b'\n', b' ').split(b' ') if data else [], dtype=np.bytes_)
+    tokens = tokens.reshape(-1, FIELDS_PER_LINE)
+    columns = np.empty(len(tokens), dtype=PACKET_EVENT_DTYPE)
+    try:
+        columns['event_type'] = _encode(tokens[:, 0], _EVENT_TOKENS, 'event type')
+        columns['time'] = tokens[:, 1].astype(np.float64)
+        _store(columns, 'source', _parse_integers(tokens[:, 2], 'node'), 'node')
+        _store(columns, 'destination', _parse_integers(tokens[:, 3], 'node'), 'node')
+        columns['packet_type'] = _encode(tokens[:, 4], _PACKET_TOKENS, 'packet type')
+        _store(columns, 'packet_size', _parse_integers(tokens[:, 5], 'packet size'), 'packet size')
+        _store_flags(columns, tokens[:, 6])
+        _store(columns, 'flow_id', _parse_integers(tokens[:, 7], 'flow identifier'), 'flow identifier')
+        for side, token in (('source', 8), ('destination', 9)):
+            node, port = _split_addresses(tokens[:, token])
+            _store(columns, f'{side}_node', node, 'address node')
+            _store(columns, f'{side}_port', port, 'address port')
+        _store(columns, 'sequence_number', _parse_integers(tokens[:, 10], 'sequence number'), 'sequence number')
+        _store(columns, 'packet_identifier', _parse_integers(tokens[:, 11], 'packet identifier'),
+               'packet identifier')
+    except ValueError as e:
+        raise ValueError(f'Invalid trace block: {e}')
+    return columns
+
+
+# Same pools as the object parser, but keyed by the already parsed values of the columns
+_NODES: InternPool[Node] = InternPool(Node)
+_ADDRESSES: InternPool[Address] = InternPool(lambda address: Address(_NODES.get(address[0]), Port(address[1])))
+_FLOW_IDENTIFIERS: InternPool[FlowIdentifier] = InternPool(FlowIdentifier)
+_FLAGS: InternPool[Flags] = InternPool(lambda flags: Flags(flags.decode()))
+_PACKET_SIZES: InternPool[PacketSize] = InternPool(PacketSize)
+
+
+def to_packet_events(columns: np.ndarray, time_type: TimeType = Time) -> Generator[PacketEvent, None, None]:
+    """
+    Builds the PacketEvent objects for the rows of a structured array. Meant to be called on the few rows
+    that survived the filters, not on the whole trace.
+    Times are rebuilt from the shortest representation of the float, so they are the same decimal values the
+    object parser produces for timestamps with up to 15 significant digits (which is what ns-2 writes), as
+    time_type.
+    """
+    for (event_type, time, source, destination, packet_type, packet_size, flags, flow_id, source_node, source_port,
+         destination_node, destination_port, sequence_number, packet_identifier) in columns.tolist():
+        yield PacketEvent(event_type=EVENT_TYPES[event_type],
+                          time=time_type.from_str(repr(time)),
+                          source=_NODES.get(source),
+                          destination=_NODES.get(destination),
+                          packet_type=PACKET_TYPES[packet_type],
+                          packet_size=_PACKET_SIZES.get(packet_size),
+                          flags=_FLAGS.get(flags),
+                          flow_id=_FLOW_IDENTIFIERS.get(flow_id),
+                          source_addr=_ADDRESSES.get((source_node, source_port)),
+                          destination_addr=_ADDRESSES.get((destination_node, destination_port)),
+                          sequence_number=SequenceNumber(sequence_number),
+                          packet_identifier=PacketIdentifier(packet_identifier))
+
+
+def concatenate(batches: Iterable[np.ndarray]) -> np.ndarray:
+    batches = list(batches)
+    if not batches:
+        return np.empty(0, dtype=PACKET_EVENT_DTYPE)
+    return np.concatenate(batches)
+
+
+class ColumnarTraceFile:
+    """
+    Reads an ns-2 trace into NumPy structured arrays (see PACKET_EVENT_DTYPE), batch_bytes at a time.
+    Iterating over it yields one array per batch, so the whole trace never has to be in memory.
+    With a cache, the whole trace is parsed once and later runs map the cached arrays instead.
+    """
+
+    def __init__(self, file_name: str, batch_bytes: int = DEFAULT_BATCH_BYTES, since: Time | None = None,
+                 until: Time | None = None, index_interval: Decimal = DEFAULT_INDEX_INTERVAL,
+                 cache: TraceCache | None = None, time_type: TimeType = Time):
+        if not pathlib.Path(file_name).is_file():
+            raise ValueError(f'Trace file not found: {file_name}')
+        if since is not None and until is not None and since > until:
+            raise ValueError("Since time must be less than until time")
+        assert batch_bytes > 0, "Batch size should be at least 1 byte"
+        self.file_name = file_name
+        self.batch_bytes = batch_bytes
+        self.since = since
+        self.until = until
+        self.index_interval = index_interval
+        self.cache = cache
+        self.time_type = time_type
+        self.compression = detect_compression(file_name)
+
+    def __iter__(self) -> Generator[np.ndarray, None, None]:
+        since = float(self.since.value) if self.since is not None else None
+        until = float(self.until.value) if self.until is not None else None
+        batches = self.cached_batches() if self.cache is not None else self.batches(self.start_offset())
+        for batch in batches:
+            if since is None and until is None:
+                yield batch
+                continue
+            times = batch['time']
+            inside = np.ones(len(batch), dtype=bool)
+            if since is not None:
+                inside &= times >= since
+            if until is not None:
+                inside &= times <= until
+            yield batch[inside]
+            if until is not None and len(times) and times[-1] > until:
+                return
+
+    def start_offset(self) -> int:
+        if self.since is None or self.compression is not None:
+            return 0
+        return TraceIndex.for_file(self.file_name, self.index_interval).offset_for(self.since.value)
+
+    def cached_batches(self) -> Generator[np.ndarray, None, None]:
+        key = self.cache.key(self.file_name)
+        columns = self.cache.get(key, PACKET_EVENT_DTYPE)
+        if columns is None:
+            columns = concatenate(self.batches(0))
+            self.cache.put(key, columns)
+        for begin in range(0, len(columns), CACHED_BATCH_ROWS):
+            yield columns[begin:begin + CACHED_BATCH_ROWS]
+
+    def batches(self, offset: int) -> Generator[np.ndarray, None, None]:
+        """
+        Parsed batches from the byte offset until the end of the file, before applying the time window
+        """
+        with open_trace(self.file_name, 'rb') as file:
+            if offset:
+                file.seek(offset)
+            remainder = b''
+            while chunk := file.read(self.batch_bytes):
+                chunk = remainder + chunk
+                end = chunk.rfind(b'\n') + 1
+                remainder = chunk[end:]
+                if end:
+                    yield parse_lines(chunk[:end])
+            if remainder.strip():
+                yield parse_lines(remainder)
+
+    def load(self) -> np.ndarray:
+        return concatenate(self)
+
+    def events(self) -> Generator[PacketEvent, None, None]:
+        for batch in self:
+            yield from to_packet_events(batch, self.time_type)
@@ -0,0 +1,115 @@
+import bz2
+import gzip
+import io
+import lzma
+import queue
+import threading
+from typing import BinaryIO, Callable, Dict
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CHUNK_BYTES = 1024 * 1024
+BUFFERED_CHUNKS = 8
+
+MAGIC_BYTES: Dict[bytes, str] = {
+    b'\x1f\x8b': 'gzip',
+    b'BZh': 'bz2',
+    b'\xfd7zXZ\x00': 'xz',
+    b'\x28\xb5\x2f\xfd': 'zstd',
+}
+
+
+def open_zstd(file_name: str) -> BinaryIO:
+    if zstandard is None:
+        raise ValueError(f'{file_name} is compressed with zstd, install the zstandard package to read it')
+    return zstandard.ZstdDecompressor().stream_reader(open(file_name, 'rb'), closefd=True)
+
+
+OPENERS: Dict[str, Callable[[str], BinaryIO]] = {
+    'gzip': lambda file_name: gzip.open(file_name, 'rb'),
+    'bz2': lambda file_name: bz2.open(file_name, 'rb'),
+    'xz': lambda file_name: lzma.open(file_name, 'rb'),
+    'zstd': open_zstd,
+}
+
+
+def detect_compression(file_name: str) -> str | None:
+    """
+    Compression format of the file from its magic bytes, None if it's plain text
+    """
+    with open(file_name, 'rb') as file:
+        head = file.read(max(len(magic) for magic in MAGIC_BYTES))
+    for magic, compression in MAGIC_BYTES.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+class BackgroundDecompressor(io.RawIOBase):
+    """
+    Binary stream of the decompressed content of a file. A background thread decompresses it into a bounded
+    queue of chunks while the caller parses the previous ones, and nothing is written to disk.
+    """
+
+    def __init__(self, source: BinaryIO):
+        super().__init__()
+        self.chunks = queue.Queue(maxsize=BUFFERED_CHUNKS)
+        self.stopped = threading.Event()
+        self.pending = memoryview(b'')
+        self.finished = False
+        self.thread = threading.Thread(target=self.__decompress, args=(source,), daemon=True)
+        self.thread.start()
+
+    def __decompress(self, source: BinaryIO):
+        try:
+            with source:
+                while not self.stopped.is_set():
+                    chunk = source.read(CHUNK_BYTES)
+                    self.__put(chunk)
+                    if not chunk:
+                        return
+        except Exception as e:
+            self.__put(e)
+
+    def __put(self, item):
+        while not self.stopped.is_set():
+            try:
+                self.chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self.pending and not self.finished:
+            chunk = self.chunks.get()
+            if isinstance(chunk, Exception):
+                raise chunk
+            self.finished = not chunk
+            self.pending = memoryview(chunk)
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+    def close(self):
+        self.stopped.set()
+        super().close()
+
+
+def open_trace(file_name: str, mode: str = 'r') -> BinaryIO | io.TextIOWrapper:
+    """
+    Opens a trace for reading ('r' for text, 'rb' for bytes), transparently decompressing gzip, bz2, xz and
+    (if the zstandard package is installed) zstd files
+    """
+    assert mode in ('r', 'rb'), "Traces can only be opened for reading"
+    compression = detect_compression(file_name)
+    if compression is None:
+        return open(file_name, mode)
+    stream = io.BufferedReader(BackgroundDecompressor(OPENERS[compression](file_name)), buffer_size=CHUNK_BYTES)
+    return stream if mode == 'rb' else io.TextIOWrapper(stream)
@@ -1,6 +1,8 @@
 from dataclasses import dataclass
 
 from src.metrics.metrics import CongestionWindowMetrics
+from src.trace.compression import open_trace
+from src.trace.reference import load_columns
 from src.trace.trace_file import Time
 
 
@@ -24,12 +26,15 @@ class CongestionWindowTraceFile:
         self.file_name = file_name
 
     def __iter__(self):
-        with open(self.file_name) as file:
+        with open_trace(self.file_name) as file:
             for line in file:
                 yield CongestionWindowEntity.from_str(line)
 
     def get_metrics(self) -> CongestionWindowMetrics:
+        """
+        Loads the whole file at once (see load_columns), without building any CongestionWindowEntity
+        """
+        columns = load_columns(self.file_name, layouts=(3,))
         metrics = CongestionWindowMetrics()
-        for x in self:
-            metrics.add_metric(x.time, x.congestion_window)
+        metrics.extend(time=columns[:, 0], value=columns[:, 1])
         return metrics
@@ -1,6 +1,9 @@
-from typing import List, Callable
+from typing import List, Callable, Dict, Tuple
 
-from src.trace.trace_file import Node, TraceFile, EventType, PacketEvent, PacketType
+import numpy as np
+
+from src.trace.columnar import EVENT_TYPE_CODES, PACKET_TYPE_CODES
+from src.trace.trace_file import Node, TraceFile, EventType, PacketEvent, PacketType, LinePredicate
 
 
 def dequeue_packet_on(node: Node, packet: PacketEvent):
@@ -15,14 +18,58 @@ def received(node: Node, packet: PacketEvent):
     return packet.destination == node and packet.event_type == EventType.Received
 
 
+# Raw text version of every packet predicate: the event character the line starts with, and the position of the
+# token (once split by spaces) that should be the node
+LINE_CHECKS: Dict[Callable[[Node, PacketEvent], bool], Tuple[str, int]] = {
+    dequeue_packet_on: (EventType.DropQueue.value, 2),
+    enqueue_packet_on: (EventType.PutQueue.value, 2),
+    received: (EventType.Received.value, 3),
+}
+
+
+def line_predicate(node: Node, *predicates: Callable[[Node, PacketEvent], bool]) -> LinePredicate | None:
+    """
+    Compiles the union of the packet predicates into a check on the raw trace line (event character and node
+    token), that can be run before parsing it. None if some predicate has no raw version, or if two of them check
+    different node tokens on the same event. Lines too short to check are let through, for the parser to reject.
+    """
+    if any(predicate not in LINE_CHECKS for predicate in predicates):
+        return None
+    checks = set(LINE_CHECKS[predicate] for predicate in predicates)
+    positions = dict(checks)
+    if len(positions) != len(checks):
+        return None
+    node_token = str(node.identifier)
+
+    def matches(line: str) -> bool:
+        parts = line.split(' ', 4)
+        if len(parts) < 5:
+            return True
+        position = positions.get(parts[0])
+        return position is not None and parts[position] == node_token
+
+    return matches
+
+
+def pushdown(trace, predicate: LinePredicate | None):
+    """
+    Iterates the trace skipping the lines rejected by the predicate before parsing them, when the trace can.
+    Skipped lines are never validated, so this is only done on lazy traces, whose fields already aren't until read.
+    """
+    if predicate is not None and isinstance(trace, TraceFile) and trace.lazy:
+        return trace.filtered(line_predicate=predicate)
+    return trace
+
+
 def filter_packets_from_node(node: Node, trace: TraceFile,
                              send_func: Callable[[Node, PacketEvent], bool] = enqueue_packet_on):
     """
     Filters the packets from a given node (sent and received) in the trace file
     What you consider as sent is defined by the send_func, which is enqueue_packet_on by default
     but can be changed to dequeue_packet_on if you want to consider the packet is sent when it is dequeued
+    On lazy traces, the known predicates are pushed down to the raw lines, so only the lines of the node are parsed
     """
-    for packet in trace:
+    for packet in pushdown(trace, line_predicate(node, send_func, received)):
         if send_func(node, packet) or received(node, packet):
             yield packet
 
@@ -33,3 +80,39 @@ def assert_tcp_packets(packets: List[PacketEvent]) -> None:
     """
     packets_not_tcp = [packet for packet in packets if packet.packet_type is PacketType.Udp]
     assert len(packets_not_tcp) == 0, "Packets are not all TCP."
+
+
+def dequeue_mask_on(node: Node, columns: np.ndarray) -> np.ndarray:
+    return (columns['source'] == node.identifier) & (columns['event_type'] == EVENT_TYPE_CODES[EventType.DropQueue])
+
+
+def enqueue_mask_on(node: Node, columns: np.ndarray) -> np.ndarray:
+    return (columns['source'] == node.identifier) & (columns['event_type'] == EVENT_TYPE_CODES[EventType.PutQueue])
+
+
+def received_mask(node: Node, columns: np.ndarray) -> np.ndarray:
+    return (columns['destination'] == node.identifier) & (columns['event_type'] == EVENT_TYPE_CODES[EventType.Received])
+
+
+# Vectorized version of every packet predicate, so callers can keep passing the same send_func
+COLUMN_PREDICATES = {
+    dequeue_packet_on: dequeue_mask_on,
+    enqueue_packet_on: enqueue_mask_on,
+    received: received_mask,
+}
+
+
+def filter_columns_from_node(node: Node, columns: np.ndarray,
+                             send_func: Callable[[Node, PacketEvent], bool] = enqueue_packet_on) -> np.ndarray:
+    """
+    Same as filter_packets_from_node, but over a structured array from the columnar loader
+    """
+    mask = COLUMN_PREDICATES[send_func](node, columns) | received_mask(node, columns)
+    return columns[mask]
+
+
+def assert_tcp_columns(columns: np.ndarray) -> None:
+    """
+    Asserts that the rows of a structured array are all TCP
+    """
+    assert not np.any(columns['packet_type'] == PACKET_TYPE_CODES[PacketType.Udp]), "Packets are not all TCP."
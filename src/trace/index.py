@@ -0,0 +1,104 @@
+import bisect
+import json
+import logging
+import os
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import List
+
+INDEX_SUFFIX = '.idx'
+DEFAULT_INDEX_INTERVAL = Decimal('1.0')
+
+
+def time_token(line: bytes) -> bytes:
+    """
+    Returns the time of a trace line without parsing the rest of it (the time is always the second field)
+    """
+    return line.split(b' ', 2)[1]
+
+
+@dataclass(frozen=True)
+class TraceIndex:
+    """
+    Byte offsets of a trace file sampled every `interval` seconds of simulated time.
+    Entry i says that every line before offsets[i] happened strictly before times[i].
+    It's persisted as a sidecar file next to the trace, together with the size and modification time of
+    the trace it was built from, so a rewritten trace invalidates it.
+    """
+    file_size: int
+    file_mtime_ns: int
+    interval: Decimal
+    times: List[Decimal]
+    offsets: List[int]
+
+    @staticmethod
+    def build(file_name: str, interval: Decimal = DEFAULT_INDEX_INTERVAL) -> 'TraceIndex':
+        assert interval > 0, "The index interval should be positive"
+        stat = os.stat(file_name)
+        times, offsets = [], []
+        next_sample, step = float('-inf'), float(interval)
+        offset = 0
+        with open(file_name, 'rb') as file:
+            for line in file:
+                token = time_token(line)
+                time = float(token)
+                if time >= next_sample:
+                    times.append(Decimal(token.decode()))
+                    offsets.append(offset)
+                    next_sample = (time // step + 1) * step
+                offset += len(line)
+        return TraceIndex(file_size=stat.st_size, file_mtime_ns=stat.st_mtime_ns, interval=interval, times=times,
+                          offsets=offsets)
+
+    @staticmethod
+    def sidecar(file_name: str) -> str:
+        return f'{file_name}{INDEX_SUFFIX}'
+
+    @staticmethod
+    def load(path: str) -> 'TraceIndex':
+        with open(path) as file:
+            content = json.load(file)
+        return TraceIndex(file_size=content['file_size'],
+                          file_mtime_ns=content['file_mtime_ns'],
+                          interval=Decimal(content['interval']),
+                          times=[Decimal(time) for time in content['times']],
+                          offsets=content['offsets'])
+
+    def save(self, path: str) -> None:
+        with open(path, 'w') as file:
+            json.dump({'file_size': self.file_size,
+                       'file_mtime_ns': self.file_mtime_ns,
+                       'interval': str(self.interval),
+                       'times': [str(time) for time in self.times],
+                       'offsets': self.offsets}, file)
+
+    def is_valid_for(self, file_name: str, interval: Decimal) -> bool:
+        stat = os.stat(file_name)
+        return (self.file_size, self.file_mtime_ns, self.interval) == (stat.st_size, stat.st_mtime_ns, interval)
+
+    @staticmethod
+    def for_file(file_name: str, interval: Decimal = DEFAULT_INDEX_INTERVAL) -> 'TraceIndex':
+        """
+        Loads the sidecar index of the trace, building (and saving) it again if it's missing or stale
+        """
+        path = TraceIndex.sidecar(file_name)
+        try:
+            index = TraceIndex.load(path)
+            if index.is_valid_for(file_name, interval):
+                return index
+            logging.info(f"Trace index {path} is outdated, rebuilding it")
+        except (OSError, ValueError, KeyError):
+            logging.info(f"Building trace index {path}")
+        index = TraceIndex.build(file_name, interval)
+        try:
+            index.save(path)
+        except OSError as e:
+            logging.warning(f"Could not save the trace index on {path}: {e}")
+        return index
+
+    def offset_for(self, time: Decimal) -> int:
+        """
+        Byte offset from where to start reading to get every line that happened at or after `time`
+        """
+        position = bisect.bisect_right(self.times, time) - 1
+        return self.offsets[position] if position >= 0 else 0
@@ -0,0 +1,79 @@
+import pathlib
+import sys
+import time
+from typing import Generator
+
+from src.trace.trace_file import TraceFile, LazyPacketEvent, PacketEvent, LinePredicate, Time, TimeType
+
+STDIN = '-'
+
+
+class LiveTraceFile(TraceFile):
+    """
+    Trace that is still being written: read from a pipe (file name '-' is stdin, named pipes work too), or
+    followed like `tail -f` while ns-2 appends to it. Following stops once nothing new was written for
+    idle_timeout seconds (never, if it's None). Incomplete lines are held back until ns-2 finishes them.
+    """
+
+    def __init__(self, file_name: str, follow: bool = False, poll_interval: float = 0.5,
+                 idle_timeout: float | None = None, lazy: bool = False, time_type: TimeType = Time):
+        super().__init__(file_name, lazy=lazy, time_type=time_type)
+        if self.compression is not None:
+            raise ValueError(f'Compressed traces can only be read whole, not live: {file_name}')
+        self.follow = follow
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+
+    @staticmethod
+    def is_readable(file_name: str) -> bool:
+        return file_name == STDIN or pathlib.Path(file_name).exists()
+
+    def filtered(self, line_predicate: LinePredicate | None) -> Generator[PacketEvent | LazyPacketEvent, None, None]:
+        for line in self.lines():
+            if line_predicate is None or line_predicate(line):
+                yield self.parse(line)
+
+    def lines(self) -> Generator[str, None, None]:
+        if self.file_name == STDIN:
+            yield from sys.stdin
+            return
+        with open(self.file_name, 'r') as file:
+            partial, idle_since = '', time.monotonic()
+            while True:
+                line = file.readline()
+                if line:
+                    partial += line
+                    if partial.endswith('\n'):
+                        yield partial
+                        partial, idle_since = '', time.monotonic()
+                    continue
+                idle = time.monotonic() - idle_since
+                if not self.follow or (self.idle_timeout is not None and idle >= self.idle_timeout):
+                    break
+                time.sleep(self.poll_interval)
+            if partial:
+                yield partial
+
+
+class TraceTail(TraceFile):
+    """
+    Plain text trace read from byte offset on, and only up to its last complete line. offset is moved past every
+    line read, so once ns-2 appends more lines, another TraceTail can carry on from there.
+    """
+
+    def __init__(self, file_name: str, offset: int = 0, lazy: bool = False, time_type: TimeType = Time):
+        super().__init__(file_name, lazy=lazy, time_type=time_type)
+        if self.compression is not None:
+            raise ValueError(f'Compressed traces can only be read from the start: {file_name}')
+        self.offset = offset
+
+    def filtered(self, line_predicate: LinePredicate | None) -> Generator[PacketEvent | LazyPacketEvent, None, None]:
+        with open(self.file_name, 'rb') as file:
+            file.seek(self.offset)
+            for line in file:
+                if not line.endswith(b'\n'):
+                    return
+                self.offset += len(line)
+                line = line.decode()
+                if line_predicate is None or line_predicate(line):
+                    yield self.parse(line)
@@ -0,0 +1,74 @@
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from typing import Generator, List, Tuple
+
+import numpy as np
+
+from src.trace.cache import TraceCache
+from src.trace.columnar import ColumnarTraceFile, DEFAULT_BATCH_BYTES, parse_lines
+from src.trace.index import DEFAULT_INDEX_INTERVAL
+from src.trace.trace_file import Time, TimeType
+
+
+def line_aligned_ranges(file_name: str, begin: int, range_bytes: int) -> List[Tuple[int, int]]:
+    """
+    Splits the file from `begin` until the end into [start, end) byte ranges of about range_bytes,
+    moving every cut to the start of the next line so no line is split between two ranges
+    """
+    size = os.path.getsize(file_name)
+    ranges = []
+    with open(file_name, 'rb') as file:
+        start = begin
+        while start < size:
+            file.seek(min(start + range_bytes, size))
+            if file.tell() < size:
+                file.readline()
+            end = file.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def parse_range(file_name: str, begin: int, end: int) -> np.ndarray:
+    with open(file_name, 'rb') as file:
+        file.seek(begin)
+        return parse_lines(file.read(end - begin))
+
+
+class ParallelTraceFile(ColumnarTraceFile):
+    """
+    Columnar trace whose batches are parsed on a pool of `jobs` worker processes.
+    Every batch is a line-aligned byte range of the file, and they're given back in file order (which is the
+    time order ns-2 writes them in), so it can be used anywhere a ColumnarTraceFile is.
+    At most two batches per worker are in flight, so memory doesn't depend on the size of the trace.
+    Compressed traces can't be split in byte ranges, so they're parsed sequentially.
+    """
+
+    def __init__(self, file_name: str, jobs: int | None = None, batch_bytes: int = DEFAULT_BATCH_BYTES,
+                 since: Time | None = None, until: Time | None = None,
+                 index_interval: Decimal = DEFAULT_INDEX_INTERVAL, cache: TraceCache | None = None,
+                 time_type: TimeType = Time):
+        super().__init__(file_name=file_name, batch_bytes=batch_bytes, since=since, until=until,
+                         index_interval=index_interval, cache=cache, time_type=time_type)
+        self.jobs = jobs or os.cpu_count()
+        assert self.jobs > 0, "At least one job is needed"
+
+    def batches(self, offset: int) -> Generator[np.ndarray, None, None]:
+        if self.compression is not None:
+            logging.warning(f"{self.file_name} is compressed ({self.compression}), it can't be split between jobs")
+            yield from super().batches(offset)
+            return
+        ranges = deque(line_aligned_ranges(self.file_name, offset, self.batch_bytes))
+        executor = ProcessPoolExecutor(max_workers=self.jobs)
+        in_flight = deque()
+        try:
+            while ranges or in_flight:
+                while ranges and len(in_flight) < 2 * self.jobs:
+                    begin, end = ranges.popleft()
+                    in_flight.append(executor.submit(parse_range, self.file_name, begin, end))
+                yield in_flight.popleft().result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,77 @@
+import warnings
+from typing import Tuple
+
+import numpy as np
+
+from src.trace.columnar import DEFAULT_BATCH_BYTES
+from src.trace.compression import open_trace
+
+
+def _tokens_per_line(data: bytes) -> np.ndarray:
+    """
+    Number of whitespace separated tokens on each line of a block (the last one may lack its newline)
+    """
+    raw = np.frombuffer(data, dtype=np.uint8)
+    newline = raw == ord('\n')
+    blank = newline | (raw == ord(' ')) | (raw == ord('\t')) | (raw == ord('\r'))
+    starts = ~blank
+    starts[1:] &= blank[:-1]
+    ends = np.flatnonzero(newline)
+    if data and not data.endswith(b'\n'):
+        ends = np.append(ends, len(data))
+    return np.diff(np.searchsorted(np.flatnonzero(starts), ends), prepend=0)
+
+
+def parse_columns(data: bytes, columns: int) -> np.ndarray:
+    """
+    Parses a block of complete lines of columns numbers each into a (lines, columns) float64 array, all at once
+    """
+    parts = _tokens_per_line(data)
+    wrong = np.flatnonzero(parts != columns)
+    if len(wrong):
+        raise ValueError(f'Invalid reference trace block: expected {columns} parts on each line, got '
+                         f'{parts[wrong[0]]} on line {wrong[0] + 1} of the block')
+    with warnings.catch_warnings():
+        # numpy stops parsing at the first token that isn't a number, and warns about it (DeprecationWarning) or,
+        # on the versions that finished the deprecation, raises ValueError. The warning is silenced because either
+        # way fewer values than tokens come out, which is what's checked.
+        warnings.simplefilter('ignore', DeprecationWarning)
+        try:
+            values = np.fromstring(data, dtype=np.float64, sep=' ')
+        except ValueError:
+            values = np.empty(0)
+    if values.size != len(parts) * columns:
+        raise ValueError('Invalid reference trace block: found something that is not a number')
+    return values.reshape(len(parts), columns)
+
+
+def load_columns(file_name: str, layouts: Tuple[int, ...], batch_bytes: int = DEFAULT_BATCH_BYTES) -> np.ndarray:
+    """
+    Loads a reference trace (one row of numbers per line, as ns-2 writes the timeout and congestion window
+    traces) into a float64 array, batch_bytes at a time. The number of columns, one of layouts, is taken from
+    the first line and every other line should have as many.
+    """
+    batches, columns = [], None
+    with open_trace(file_name, 'rb') as file:
+        remainder = b''
+        while chunk := file.read(batch_bytes):
+            chunk = remainder + chunk
+            end = chunk.rfind(b'\n') + 1
+            remainder = chunk[end:]
+            if end:
+                columns = columns or _layout(chunk, layouts)
+                batches.append(parse_columns(chunk[:end], columns))
+        if remainder.strip():
+            columns = columns or _layout(remainder, layouts)
+            batches.append(parse_columns(remainder, columns))
+    if not batches:
+        return np.empty((0, layouts[0]), dtype=np.float64)
+    return np.concatenate(batches)
+
+
+def _layout(data: bytes, layouts: Tuple[int, ...]) -> int:
+    columns = len(data.split(b'\n', 1)[0].split())
+    if columns not in layouts:
+        raise ValueError(f'Invalid reference trace: expected {" or ".join(map(str, layouts))} parts on each line, '
+                         f'got {columns}')
+    return columns
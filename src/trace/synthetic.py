@@ -0,0 +1,216 @@
+import bz2
+import gzip
+import logging
+import lzma
+import pathlib
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from typing import IO, Iterator
+
+import numpy as np
+
+MICROSECONDS = 1_000_000
+EVENTS = ('+', '-', 'r', 'd')
+PUT, TAKE, RECEIVE, DROP = range(len(EVENTS))
+TYPES = ('tcp', 'ack', 'cbr')
+TCP, ACK, CBR = range(len(TYPES))
+SIZES = (1040, 40, 1000)
+# Columns of the event rows: the first 12 are the fields of the trace line (sizes and flags are implied by the
+# type), the last one orders the events that happen at the same time the way they happen
+EVENT, TIME, FROM, TO, TYPE, FLOW, SOURCE_NODE, SOURCE_PORT, DESTINATION_NODE, DESTINATION_PORT, SEQUENCE, \
+    IDENTIFIER, ORDER = range(13)
+STEPS_PER_PACKET = 8
+WRITERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+
+@dataclass(frozen=True)
+class SyntheticTrace:
+    """
+    Generates ns-2 traces of flows TCP senders (nodes 1 to flows) sending through a router (node flows + 1) to a
+    sink (node flows + 2), with cbr cross traffic from node 0 every cbr_interval seconds (none if None).
+    Each segment is acked by the sink unless the router drops it (with probability loss); the sender then waits
+    a while (a few duplicated acks, or a retransmission timer) and sends it again. Times have microsecond
+    resolution and events are written in time order. The same configuration always gives the same trace.
+    """
+    flows: int = 1
+    loss: float = 0.01
+    send_interval: float = 0.02
+    cbr_interval: float | None = 0.03
+    access_delay: float = 0.011
+    bottleneck_delay: float = 0.039
+    max_queueing_delay: float = 0.005
+    seed: int = 0
+    segments_per_batch: int = 16384
+
+    def __post_init__(self):
+        assert self.flows >= 1, "There should be at least one flow"
+        assert 0 <= self.loss < 1, "Loss should be a probability below 1"
+        assert self.max_queueing_delay < self.send_interval / 2, "Segments of a flow should not be reordered"
+
+    @property
+    def router(self) -> int:
+        return self.flows + 1
+
+    @property
+    def sink(self) -> int:
+        return self.flows + 2
+
+    def write(self, file_name: str, lines: int) -> None:
+        """
+        Writes the first lines events of the trace (compressed if the file name ends in .gz, .bz2 or .xz), and the
+        few after them until no packet is waiting on a queue, so every enqueued packet is also dequeued or dropped
+        """
+        written, queued = 0, 0
+        with WRITERS.get(pathlib.Path(file_name).suffix, open)(file_name, 'wt') as file:
+            for batch in self.batches():
+                # Packets on the queues after each row
+                left = np.isin(batch[:, EVENT], (TAKE, DROP))
+                waiting = queued + np.cumsum((batch[:, EVENT] == PUT).astype(np.int64) - left)
+                last = max(0, lines - written - 1)
+                drained = np.flatnonzero(waiting[last:] == 0)
+                rows = batch[:last + drained[0] + 1] if len(drained) else batch
+                write_rows(file, rows)
+                written += len(rows)
+                if len(drained):
+                    break
+                queued = int(waiting[-1]) if len(waiting) else queued
+        logging.info(f"Wrote {written} events of {self.flows} flows to {file_name}")
+
+    def batches(self) -> Iterator[np.ndarray]:
+        """
+        Endless events of the trace in time order, in arrays of rows of the first 12 columns (see ORDER)
+        """
+        random = np.random.default_rng(self.seed)
+        next_send = np.full(self.flows, _us(0.1), dtype=np.int64)
+        next_sequence = np.zeros(self.flows, dtype=np.int64)
+        next_cbr, cbr_sequence, next_identifier = _us(0.1) + 3000, 0, 0
+        pending = np.empty((0, ORDER + 1), dtype=np.int64)
+        while True:
+            created = [self.__flow(random, flow, next_send, next_sequence) for flow in range(self.flows)]
+            # Whatever is created from now on happens after the next segment of any flow is sent
+            horizon = next_send.min()
+            if self.cbr_interval:
+                rows, next_cbr, cbr_sequence = self.__cross_traffic(next_cbr, horizon, cbr_sequence)
+                created.append(rows)
+            created = np.concatenate(created)
+            next_identifier = _identify(created, next_identifier)
+            events = np.concatenate((pending, created))
+            events = events[np.lexsort((events[:, ORDER], events[:, TIME]))]
+            ready = np.searchsorted(events[:, TIME], horizon)
+            pending = events[ready:]
+            yield events[:ready, :ORDER]
+
+    def __flow(self, random: np.random.Generator, flow: int, next_send: np.ndarray,
+               next_sequence: np.ndarray) -> np.ndarray:
+        count = self.segments_per_batch
+        lost = random.random(count) < self.loss
+        waits = random.choice(_us([self.send_interval / 2, 0.5, 3.5]), count)
+        intervals = np.where(lost, waits, _us(self.send_interval))
+        sent = next_send[flow] + np.concatenate(([0], np.cumsum(intervals[:-1])))
+        # A dropped segment is sent again next, so the sequence number only moves on once a segment goes through
+        sequence = next_sequence[flow] + np.concatenate(([0], np.cumsum(~lost[:-1])))
+        next_send[flow] = sent[-1] + intervals[-1]
+        next_sequence[flow] = sequence[-1] + (0 if lost[-1] else 1)
+
+        sender, router, sink = flow + 1, self.router, self.sink
+        access, bottleneck = _us(self.access_delay), _us(self.bottleneck_delay)
+        at_router = sent + access
+        forwarded = at_router + random.integers(0, _us(self.max_queueing_delay), count, endpoint=True)
+        at_sink = forwarded + bottleneck
+        back_at_router = at_sink + bottleneck
+        at_sender = back_at_router + access
+        segment = dict(type=TCP, flow=flow + 1, source=(sender, 0), destination=(sink, flow), sequence=sequence,
+                       created=sent, flows=self.flows)
+        ack = dict(segment, type=ACK, source=(sink, flow), destination=(sender, 0), created=at_sink)
+        arrived = ~lost
+        return np.concatenate((_events(segment, PUT, sent, sender, router, 0),
+                               _events(segment, TAKE, sent, sender, router, 1),
+                               _events(segment, RECEIVE, at_router, sender, router, 2),
+                               _events(segment, PUT, at_router, router, sink, 3),
+                               _events(segment, DROP, at_router, router, sink, 4, lost),
+                               _events(segment, TAKE, forwarded, router, sink, 4, arrived),
+                               _events(segment, RECEIVE, at_sink, router, sink, 5, arrived),
+                               _events(ack, PUT, at_sink, sink, router, 0, arrived),
+                               _events(ack, TAKE, at_sink, sink, router, 1, arrived),
+                               _events(ack, RECEIVE, back_at_router, sink, router, 2, arrived),
+                               _events(ack, PUT, back_at_router, router, sender, 3, arrived),
+                               _events(ack, TAKE, back_at_router, router, sender, 4, arrived),
+                               _events(ack, RECEIVE, at_sender, router, sender, 5, arrived)))
+
+    def __cross_traffic(self, start: int, until: int, first_sequence: int):
+        sent = np.arange(start, until, _us(self.cbr_interval), dtype=np.int64)
+        if len(sent) == 0:
+            return np.empty((0, ORDER + 1), dtype=np.int64), start, first_sequence
+        router, sink = self.router, self.sink
+        at_router = sent + _us(self.access_delay)
+        packet = dict(type=CBR, flow=self.flows + 1, source=(0, 0), destination=(sink, self.flows),
+                      sequence=first_sequence + np.arange(len(sent)), created=sent, flows=self.flows)
+        rows = np.concatenate((_events(packet, PUT, sent, 0, router, 0),
+                               _events(packet, TAKE, sent, 0, router, 1),
+                               _events(packet, RECEIVE, at_router, 0, router, 2),
+                               _events(packet, PUT, at_router, router, sink, 3),
+                               _events(packet, TAKE, at_router, router, sink, 4),
+                               _events(packet, RECEIVE, at_router + _us(self.bottleneck_delay), router, sink, 5)))
+        return rows, sent[-1] + _us(self.cbr_interval), first_sequence + len(sent)
+
+
+def _us(seconds) -> np.ndarray | int:
+    microseconds = np.round(np.asarray(seconds) * MICROSECONDS).astype(np.int64)
+    return int(microseconds) if microseconds.ndim == 0 else microseconds
+
+
+def _events(packet: dict, event: int, time: np.ndarray, from_node: int, to_node: int, step: int,
+            mask: np.ndarray | None = None) -> np.ndarray:
+    """
+    Rows of an event of every packet (the ones on mask, if given). Until the packets get their ids (see
+    _identify), the identifier column holds a key sorting them by creation time.
+    """
+    selected = slice(None) if mask is None else mask
+    time = time[selected]
+    rows = np.empty((len(time), ORDER + 1), dtype=np.int64)
+    rows[:, EVENT], rows[:, TIME], rows[:, FROM], rows[:, TO] = event, time, from_node, to_node
+    rows[:, TYPE], rows[:, FLOW] = packet['type'], packet['flow']
+    rows[:, SOURCE_NODE], rows[:, SOURCE_PORT] = packet['source']
+    rows[:, DESTINATION_NODE], rows[:, DESTINATION_PORT] = packet['destination']
+    rows[:, SEQUENCE] = packet['sequence'][selected]
+    rows[:, IDENTIFIER] = (packet['created'][selected] * len(TYPES) + packet['type']) * (packet['flows'] + 1) \
+        + packet['flow'] - 1
+    rows[:, ORDER] = step
+    return rows
+
+
+def _identify(rows: np.ndarray, first_identifier: int) -> int:
+    """
+    Numbers the packets of the rows in creation order from first_identifier, as ns-2 does. Returns the next id.
+    """
+    keys, identifiers = np.unique(rows[:, IDENTIFIER], return_inverse=True)
+    rows[:, IDENTIFIER] = first_identifier + identifiers
+    rows[:, ORDER] += rows[:, IDENTIFIER] * STEPS_PER_PACKET
+    return first_identifier + len(keys)
+
+
+def write_rows(file: IO[str], rows: np.ndarray) -> None:
+    file.writelines(f'{EVENTS[event]} {time // MICROSECONDS}.{time % MICROSECONDS:06d} {from_node} {to_node} '
+                    f'{TYPES[kind]} {SIZES[kind]} ------- {flow} {source_node}.{source_port} '
+                    f'{destination_node}.{destination_port} {sequence} {identifier}\n'
+                    for event, time, from_node, to_node, kind, flow, source_node, source_port, destination_node,
+                    destination_port, sequence, identifier in rows.tolist())
+
+
+def main():
+    parser = ArgumentParser(description='Writes a synthetic ns-2 trace')
+    parser.add_argument('file', help='Trace file name (compressed if it ends in .gz, .bz2 or .xz)')
+    parser.add_argument('-n', '--lines', default=10 ** 5, type=lambda value: int(float(value)),
+                        help='Number of events of the trace (a few more, to end between packets), e.g. 1e6. '
+                             'Default is 100000.')
+    parser.add_argument('--flows', default=1, type=int, help='Number of TCP senders. Default is 1.')
+    parser.add_argument('--loss', default=0.01, type=float, help='Probability of a segment being dropped.')
+    parser.add_argument('--no-cross-traffic', action='store_true', help='Do not add cbr traffic.')
+    parser.add_argument('--seed', default=0, type=int, help='Seed of the random generator. Default is 0.')
+    args = parser.parse_args()
+    SyntheticTrace(flows=args.flows, loss=args.loss, seed=args.seed,
+                   cbr_interval=None if args.no_cross_traffic else 0.03).write(args.file, lines=args.lines)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,13 @@
 from dataclasses import dataclass
 
 from src.metrics.metrics import TimeoutMetrics
+from src.trace.compression import open_trace
+from src.trace.reference import load_columns
 from src.trace.trace_file import Time
 
+# time rto [rtt srtt rttvar]
+TIMEOUT_LAYOUTS = (5, 2)
+
 
 @dataclass(frozen=True)
 class TimeoutTraceEntity:
@@ -36,12 +41,15 @@ class TimeoutTraceFile:
         self.file_name = file_name
 
     def __iter__(self) -> TimeoutTraceEntity:
-        with open(self.file_name) as file:
+        with open_trace(self.file_name) as file:
             for line in file:
                 yield TimeoutTraceEntity.from_str(line)
 
     def get_metrics(self) -> TimeoutMetrics:
+        """
+        Loads the whole file at once (see load_columns), without building any TimeoutTraceEntity
+        """
+        columns = load_columns(self.file_name, layouts=TIMEOUT_LAYOUTS)
         metrics = TimeoutMetrics()
-        for x in self:
-            metrics.add_metric(x.time, x.rto)
+        metrics.extend(time=columns[:, 0], value=columns[:, 1])
         return metrics
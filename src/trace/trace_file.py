@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+import functools
 import logging
+import mmap
 import pathlib
 from dataclasses import dataclass
 from decimal import Decimal, InvalidOperation
 from enum import Enum
-from typing import Generator
+from typing import Generator, Callable, Dict, Generic, Hashable, TypeVar
+
+from src.config.profiler import counted
+from src.trace.compression import detect_compression, open_trace
+from src.trace.index import TraceIndex, time_token, DEFAULT_INDEX_INTERVAL
 
 
 class EventType(Enum):
@@ -16,10 +22,38 @@ class EventType(Enum):
 
     @staticmethod
     def from_value(value: str) -> 'EventType':
-        for event_type in EventType:
-            if event_type.value == value:
-                return event_type
-        raise ValueError(f'Invalid event type: {value}')
+        try:
+            return _EVENT_TYPES[value]
+        except KeyError:
+            raise ValueError(f'Invalid event type: {value}')
+
+
+_EVENT_TYPES = {event_type.value: event_type for event_type in EventType}
+
+T = TypeVar('T')
+LinePredicate = Callable[[str], bool]
+
+
+class InternPool(Generic[T]):
+    """
+    Shares one instance per distinct raw value (e.g. the token read from the trace), so the value objects
+    that only take a handful of values on a trace are built once instead of once per line.
+    Lookups hash the raw value, never the frozen dataclass. Once max_size values are pooled, new ones are
+    built without being pooled, so a trace with unexpectedly many values can't grow it without bounds.
+    """
+
+    def __init__(self, factory: Callable[[Hashable], T], max_size: int = 4096):
+        self.factory = factory
+        self.max_size = max_size
+        self.instances: Dict[Hashable, T] = {}
+
+    def get(self, value: Hashable) -> T:
+        instance = self.instances.get(value)
+        if instance is None:
+            instance = self.factory(value)
+            if len(self.instances) < self.max_size:
+                self.instances[value] = instance
+        return instance
 
 
 @dataclass(frozen=True, order=True)
@@ -54,18 +88,115 @@ class Time:
     def half(self) -> 'Time':
         return Time(self.value / 2)
 
+    def __float__(self) -> float:
+        return float(self.value)
+
+
+class FixedTime:
+    """
+    Drop-in replacement of Time backed by an integer number of picoseconds, so the arithmetic of the agents
+    is integer arithmetic instead of Decimal arithmetic.
+    Exact for timestamps with up to 12 decimals (ns-2 writes far less). Multiplying by a fraction
+    (e.g. the Jacobson/Karels gains) rounds to the nearest picosecond.
+    """
+    __slots__ = ('ticks',)
+    TICKS_PER_SECOND = 10 ** 12
+    DECIMALS = 12
+
+    def __init__(self, ticks: int):
+        self.ticks = ticks
+
+    @staticmethod
+    def from_str(value: str) -> 'FixedTime':
+        whole, _, fraction = value.strip().partition('.')
+        if whole.isdigit() and (fraction.isdigit() or not fraction) and len(fraction) <= FixedTime.DECIMALS:
+            return FixedTime(int(whole) * FixedTime.TICKS_PER_SECOND + int(fraction.ljust(FixedTime.DECIMALS, '0')))
+        try:
+            return FixedTime(int((Decimal(value) * FixedTime.TICKS_PER_SECOND).to_integral_value()))
+        except (ValueError, InvalidOperation):
+            raise ValueError(f'Invalid decimal time: {value}')
+
+    @property
+    def value(self) -> Decimal:
+        return Decimal(self.ticks).scaleb(-FixedTime.DECIMALS)
+
+    def __sub__(self, value: 'FixedTime') -> 'FixedTime':
+        return FixedTime(self.ticks - value.ticks)
+
+    def __add__(self, other: 'FixedTime') -> 'FixedTime':
+        return FixedTime(self.ticks + other.ticks)
+
+    def __mul__(self, other: int | Decimal | FixedTime) -> 'FixedTime':
+        if isinstance(other, int):
+            return FixedTime(self.ticks * other)
+        if isinstance(other, FixedTime):
+            return FixedTime(self.ticks * other.ticks // FixedTime.TICKS_PER_SECOND)
+        numerator, denominator = other.as_integer_ratio()
+        return FixedTime((2 * self.ticks * numerator + denominator) // (2 * denominator))
+
+    def __abs__(self):
+        return FixedTime(abs(self.ticks))
+
+    def half(self) -> 'FixedTime':
+        """
+        Half of the time, rounded to the nearest picosecond (ties to the even one, like Decimal rounds)
+        """
+        return FixedTime(half_ticks(self.ticks))
+
+    def __float__(self) -> float:
+        return self.ticks / FixedTime.TICKS_PER_SECOND
+
+    def __eq__(self, other):
+        return isinstance(other, FixedTime) and self.ticks == other.ticks
+
+    def __lt__(self, other: 'FixedTime') -> bool:
+        return self.ticks < other.ticks
+
+    def __le__(self, other: 'FixedTime') -> bool:
+        return self.ticks <= other.ticks
+
+    def __gt__(self, other: 'FixedTime') -> bool:
+        return self.ticks > other.ticks
+
+    def __ge__(self, other: 'FixedTime') -> bool:
+        return self.ticks >= other.ticks
+
+    def __hash__(self):
+        return hash(self.ticks)
+
+    def __repr__(self):
+        return f'FixedTime(value={self.value!r})'
+
+
+def half_ticks(ticks: int) -> int:
+    """
+    ticks / 2 rounded half to even
+    """
+    return (ticks + (ticks >> 1 & 1)) >> 1
+
+
+TimeType = type[Time] | type[FixedTime]
+
+
+def time_type(fixed_point_time: bool) -> TimeType:
+    """
+    Class of the times of a simulation: FixedTime with fixed point time (--fixed-point-time), Time otherwise.
+    The trace and the agent of a simulation should use the same one, times of both kinds can't be compared.
+    """
+    return FixedTime if fixed_point_time else Time
+
 
 @dataclass(frozen=True, order=True)
 class TimeInterval:
-    begin: Time
-    end: Time
+    begin: Time | FixedTime
+    end: Time | FixedTime
 
     def __post_init__(self):
         if self.begin > self.end:
             raise ValueError("Begin time must be less than end time")
 
-    def __contains__(self, time: Time) -> bool:
-        assert isinstance(time, Time)
+    def __contains__(self, time: Time | FixedTime) -> bool:
+        assert isinstance(time, (Time, FixedTime))
         return self.begin <= time <= self.end
 
 
@@ -92,12 +223,14 @@ class PacketType(Enum):
 
     @staticmethod
     def from_value(value: str) -> 'PacketType':
-        if value not in ['tcp', 'ack', 'cbr', 'exp']:
+        try:
+            return _PACKET_TYPES[value]
+        except KeyError:
             raise ValueError(f'Invalid packet type: {value}')
-        if value in ['cbr', 'exp']:
-            return PacketType.Udp
-        # TODO: is this correct?
-        return PacketType(value)
+
+
+# TODO: is this correct? (cbr and exp are considered udp)
+_PACKET_TYPES = {'tcp': PacketType.Tcp, 'ack': PacketType.Ack, 'cbr': PacketType.Udp, 'exp': PacketType.Udp}
 
 
 @dataclass(frozen=True, order=True)
@@ -164,8 +297,8 @@ class Address:
             node, port = value.split(".")
         except ValueError:
             raise ValueError(f'Invalid address: {value}, not in the format "node.port"')
-        node = Node.from_str(node)
-        port = Port.from_str(port)
+        node = NODES.get(node)
+        port = PORTS.get(port)
         return Address(node, port)
 
 
@@ -208,10 +341,18 @@ class PacketIdentifier:
             raise ValueError(f'Invalid packet identifier: {value}, error: {e}')
 
 
+NODES: InternPool[Node] = InternPool(Node.from_str)
+PORTS: InternPool[Port] = InternPool(Port.from_str)
+ADDRESSES: InternPool[Address] = InternPool(Address.from_str)
+FLOW_IDENTIFIERS: InternPool[FlowIdentifier] = InternPool(FlowIdentifier.from_str)
+FLAGS: InternPool[Flags] = InternPool(Flags.from_str)
+PACKET_SIZES: InternPool[PacketSize] = InternPool(PacketSize.from_str)
+
+
 @dataclass(frozen=True, unsafe_hash=True)
 class PacketEvent:
     event_type: EventType
-    time: Time
+    time: Time | FixedTime
     source: Node
     destination: Node
     packet_type: PacketType
@@ -224,20 +365,20 @@ class PacketEvent:
     packet_identifier: PacketIdentifier
 
     @staticmethod
-    def from_str(value: str) -> 'PacketEvent':
+    def from_str(value: str, time_type: TimeType = Time) -> 'PacketEvent':
         parts = value.split(" ")
         if len(parts) != 12:
             raise ValueError(f'Invalid packet event: {value}, expected 12 parts, got {len(parts)}')
         event_type = EventType.from_value(parts[0])
-        time = Time.from_str(parts[1])
-        source = Node.from_str(parts[2])
-        destination = Node.from_str(parts[3])
+        time = time_type.from_str(parts[1])
+        source = NODES.get(parts[2])
+        destination = NODES.get(parts[3])
         packet_type = PacketType.from_value(parts[4])
-        packet_size = PacketSize.from_str(parts[5])
-        flags = Flags.from_str(parts[6])
-        flow_id = FlowIdentifier.from_str(parts[7])
-        source_addr = Address.from_str(parts[8])
-        destination_addr = Address.from_str(parts[9])
+        packet_size = PACKET_SIZES.get(parts[5])
+        flags = FLAGS.get(parts[6])
+        flow_id = FLOW_IDENTIFIERS.get(parts[7])
+        source_addr = ADDRESSES.get(parts[8])
+        destination_addr = ADDRESSES.get(parts[9])
         sequence_number = SequenceNumber.from_str(parts[10])
         packet_identifier = PacketIdentifier.from_str(parts[11])
         return PacketEvent(
@@ -261,14 +402,179 @@ class PacketEvent:
         return self.__str__()
 
 
-class TraceFile:
+class LazyField:
+    """
+    Field of a LazyPacketEvent: decodes its token the first time it's read and keeps the result
+    """
+
+    def __init__(self, index: int, decode: Callable[[str], object]):
+        self.index = index
+        self.decode = decode
+
+    def __set_name__(self, owner, name: str):
+        self.cache = f'_{name}'
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        try:
+            return getattr(instance, self.cache)
+        except AttributeError:
+            value = self.decoder(instance)(instance.parts[self.index])
+            setattr(instance, self.cache, value)
+            return value
+
+    def decoder(self, instance) -> Callable[[str], object]:
+        return self.decode
+
+
+class LazyTime(LazyField):
+    """
+    Time field of a LazyPacketEvent, decoded as the time type the event was read with
+    """
+
+    def __init__(self, index: int):
+        super().__init__(index, Time.from_str)
+
+    def decoder(self, instance) -> Callable[[str], object]:
+        return instance.time_type.from_str
+
+
+class LazyPacketEvent:
+    """
+    PacketEvent that only splits its line when created, and decodes (and validates) each field the first time
+    it's accessed. Filters only look at the event type, source and destination, so discarded events never pay
+    for the rest. Compares equal to the PacketEvent of the same line.
+    """
+    FIELDS = ('event_type', 'time', 'source', 'destination', 'packet_type', 'packet_size', 'flags', 'flow_id',
+              'source_addr', 'destination_addr', 'sequence_number', 'packet_identifier')
+    __slots__ = ('parts', 'time_type') + tuple(f'_{name}' for name in FIELDS)
+
+    event_type = LazyField(0, EventType.from_value)
+    time = LazyTime(1)
+    source = LazyField(2, NODES.get)
+    destination = LazyField(3, NODES.get)
+    packet_type = LazyField(4, PacketType.from_value)
+    packet_size = LazyField(5, PACKET_SIZES.get)
+    flags = LazyField(6, FLAGS.get)
+    flow_id = LazyField(7, FLOW_IDENTIFIERS.get)
+    source_addr = LazyField(8, ADDRESSES.get)
+    destination_addr = LazyField(9, ADDRESSES.get)
+    sequence_number = LazyField(10, SequenceNumber.from_str)
+    packet_identifier = LazyField(11, PacketIdentifier.from_str)
+
+    def __init__(self, parts: list[str], time_type: TimeType = Time):
+        self.parts = parts
+        self.time_type = time_type
+
+    @staticmethod
+    def from_str(value: str, time_type: TimeType = Time) -> 'LazyPacketEvent':
+        parts = value.split(" ")
+        if len(parts) != 12:
+            raise ValueError(f'Invalid packet event: {value}, expected 12 parts, got {len(parts)}')
+        return LazyPacketEvent(parts, time_type)
+
+    def fields(self) -> tuple:
+        return tuple(getattr(self, name) for name in LazyPacketEvent.FIELDS)
+
+    def to_event(self) -> PacketEvent:
+        return PacketEvent(*self.fields())
+
+    def __eq__(self, other):
+        if isinstance(other, LazyPacketEvent):
+            return self.fields() == other.fields()
+        if isinstance(other, PacketEvent):
+            return self.to_event() == other
+        return NotImplemented
 
-    def __init__(self, file_name: str):
-        if not pathlib.Path(file_name).is_file():
+    def __hash__(self):
+        return hash(self.to_event())
+
+    def __getstate__(self):
+        return self.parts, self.time_type
+
+    def __setstate__(self, state: tuple[list[str], TimeType]):
+        self.parts, self.time_type = state
+
+    def __str__(self):
+        return f'Packet: {self.packet_type} ({self.source} to {self.destination}. Time: {self.time}. Seq: {self.sequence_number}\n'
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class TraceFile:
+    """
+    ns-2 trace read line by line, optionally only inside the [since, until] window. Event times are parsed as
+    time_type (see time_type()).
+    """
+
+    def __init__(self, file_name: str, since: Time | None = None, until: Time | None = None,
+                 index_interval: Decimal = DEFAULT_INDEX_INTERVAL, lazy: bool = False, time_type: TimeType = Time):
+        if not self.is_readable(file_name):
             raise ValueError(f'Trace file not found: {file_name}')
+        if since is not None and until is not None and since > until:
+            raise ValueError("Since time must be less than until time")
         self.file_name = file_name
+        self.since = since
+        self.until = until
+        self.index_interval = index_interval
+        self.time_type = time_type
+        self.lazy = lazy
+        self.parse = functools.partial(LazyPacketEvent.from_str if lazy else PacketEvent.from_str, time_type=time_type)
+        self.compression = detect_compression(file_name) if pathlib.Path(file_name).is_file() else None
 
-    def __iter__(self) -> Generator[PacketEvent, None, None]:
-        with open(self.file_name, 'r') as file:
-            for line in file:
-                yield PacketEvent.from_str(line)
+    @staticmethod
+    def is_readable(file_name: str) -> bool:
+        return pathlib.Path(file_name).is_file()
+
+    def __iter__(self) -> Generator[PacketEvent | LazyPacketEvent, None, None]:
+        return self.filtered(line_predicate=None)
+
+    def filtered(self, line_predicate: LinePredicate | None) -> Generator[PacketEvent | LazyPacketEvent, None, None]:
+        """
+        Iterates over the events whose raw line passes line_predicate, lines that don't are never parsed
+        """
+        if self.since is None and self.until is None:
+            with open_trace(self.file_name, 'r') as file:
+                for line in counted(file, 'lines'):
+                    if line_predicate is None or line_predicate(line):
+                        yield self.parse(line)
+        else:
+            yield from self.__iter_window(line_predicate)
+
+    def start_offset(self) -> int:
+        """
+        Byte offset of the first line that can be inside the [since, until] window, taken from the sidecar index
+        (compressed traces can't be indexed, they're always read from the start)
+        """
+        if self.since is None or self.compression is not None:
+            return 0
+        return TraceIndex.for_file(self.file_name, self.index_interval).offset_for(self.since.value)
+
+    def __window_lines(self) -> Generator[bytes, None, None]:
+        if self.compression is not None:
+            with open_trace(self.file_name, 'rb') as file:
+                yield from file
+            return
+        offset = self.start_offset()
+        with open(self.file_name, 'rb') as file:
+            if pathlib.Path(self.file_name).stat().st_size == 0:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                mapped.seek(offset)
+                yield from iter(mapped.readline, b'')
+
+    def __iter_window(self,
+                      line_predicate: LinePredicate | None) -> Generator[PacketEvent | LazyPacketEvent, None, None]:
+        since = self.since.value if self.since is not None else None
+        until = self.until.value if self.until is not None else None
+        for line in counted(self.__window_lines(), 'lines'):
+            time = Decimal(time_token(line).decode())
+            if until is not None and time > until:
+                return
+            if since is not None and time < since:
+                continue
+            line = line.decode()
+            if line_predicate is None or line_predicate(line):
+                yield self.parse(line)
@@ -0,0 +1,25 @@
+import pathlib
+
+import pytest
+
+# Node 1 sends two segments, the first one is acked, and node 0 sends some cross traffic
+TRACE = """+ 0.1 1 2 tcp 40 ------- 1 1.0 3.0 0 0
+- 0.1 1 2 tcp 40 ------- 1 1.0 3.0 0 0
++ 0.103 0 2 cbr 1000 ------- 2 0.0 3.1 0 1
+r 0.2215 2 1 ack 40 ------- 1 3.0 1.0 0 2
++ 0.2215 1 2 tcp 1040 ------- 1 1.0 3.0 1 3
+- 0.2215 1 2 tcp 1040 ------- 1 1.0 3.0 1 3
+r 3.5 2 1 ack 40 ------- 1 3.0 1.0 1 5
+"""
+
+
+@pytest.fixture
+def trace_text() -> str:
+    return TRACE
+
+
+@pytest.fixture
+def trace_file(tmp_path) -> pathlib.Path:
+    file_name = tmp_path / "trace.res"
+    file_name.write_text(TRACE)
+    return file_name
@@ -0,0 +1,13 @@
+from argparse import ArgumentTypeError
+from decimal import Decimal
+
+import pytest
+
+from src.config.args import positive_decimal
+
+
+def test_index_intervals_should_be_positive_numbers():
+    assert positive_decimal("0.5") == Decimal("0.5")
+    for value in ("abc", "0", "-1", "nan", "inf"):
+        with pytest.raises(ArgumentTypeError):
+            positive_decimal(value)
@@ -0,0 +1,67 @@
+import os
+from argparse import Namespace
+from decimal import Decimal
+
+import pytest
+
+from src.tcp.agents.reno import TcpReno
+from src.tcp.batch import Batch, Scenario, find_scenarios, scenarios_from
+from src.tcp.sweep import summarize
+from src.tcp.tcp import Tcp
+from src.trace.trace_file import TraceFile, Node
+
+
+def reno(args: Namespace) -> TcpReno:
+    return TcpReno(slow_start_threshold=args.ssthreshold)
+
+
+def reno_or_die(args: Namespace) -> TcpReno:
+    if args.ssthreshold == 13:
+        os._exit(1)
+    return reno(args)
+
+
+def batch_args() -> Namespace:
+    return Namespace(node=1, ssthreshold=20, fixed_point_time=False, columnar=False, kernel=False, streaming=False,
+                     lazy=False, since=None, until=None, index_interval=Decimal("1.0"), cache_dir=None, cache_size=1,
+                     export='npz', decimate=False, compare_tolerance=1e-6)
+
+
+def test_a_failing_scenario_does_not_stop_the_batch(tmp_path, trace_text):
+    for scenario, trace in (("good", trace_text), ("bad", "+ 0.1 1 2 tcp 40 ------- 1 1.0 3.0 0 0\n")):
+        (tmp_path / scenario).mkdir()
+        (tmp_path / scenario / "trace_file_reno.res").write_text(trace)
+    scenarios = find_scenarios(str(tmp_path / "*"))
+    assert [scenario.name for scenario in scenarios] == ["bad_reno", "good_reno"]
+    assert all(scenario.parameters == {'implementation': 'reno'} for scenario in scenarios)
+    bad, good = Batch(args=batch_args(), scenarios=scenarios, agent_factory=reno, folder=str(tmp_path)).run()
+    assert bad.status == 'failed' and 'enqueued and dequeued' in bad.error
+    assert good.status == 'ok'
+    expected = Tcp(agent=TcpReno(), node=Node(1)).get_metrics(TraceFile(str(tmp_path / "good" / "trace_file_reno.res")))
+    assert good.summary == summarize(expected)
+    assert (tmp_path / "good_reno" / "program_metrics.npz").is_file()
+
+
+def test_a_dying_worker_only_fails_its_scenario(tmp_path, trace_file):
+    scenarios = [Scenario(name=f"ssthreshold_{threshold}", trace=str(trace_file),
+                          parameters={'ssthreshold': threshold}) for threshold in (10, 13, 20)]
+    results = Batch(args=batch_args(), scenarios=scenarios, agent_factory=reno_or_die, folder=str(tmp_path),
+                    jobs=2).run()
+    assert [result.name for result in results] == ["ssthreshold_10", "ssthreshold_13", "ssthreshold_20"]
+    assert [result.status for result in results] == ['ok', 'failed', 'ok']
+    assert 'BrokenProcessPool' in results[1].error
+
+
+def test_scenario_names_should_be_unique(tmp_path, trace_text):
+    for folder in ("first", "second"):
+        (tmp_path / folder).mkdir()
+        (tmp_path / folder / "trace.res").write_text(trace_text)
+    with pytest.raises(ValueError, match="more than one scenario named trace"):
+        scenarios_from(str(tmp_path / "*" / "trace.res"))
+
+
+def test_references_and_indexes_are_not_taken_as_traces(tmp_path, trace_text):
+    for name in ("trace_file_reno.res", "trace_file_reno.res.idx", "timeout_reno.res", "congestion_window_reno.res"):
+        (tmp_path / name).write_text(trace_text)
+    assert [scenario.name for scenario in find_scenarios(str(tmp_path / "*.res*"))] == ["trace_file_reno"]
+    assert [scenario.trace for scenario in find_scenarios(str(tmp_path))] == [str(tmp_path / "trace_file_reno.res")]
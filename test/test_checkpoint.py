@@ -0,0 +1,57 @@
+import os
+import pickle
+import zlib
+
+import numpy as np
+import pytest
+
+from src.tcp.agents.reno import TcpReno
+from src.tcp.checkpoint import Checkpoint, prefix_digest, DIGEST_BYTES
+from src.tcp.tcp import Tcp
+from src.trace.live import TraceTail
+from src.trace.trace_file import TraceFile, Node, FixedTime
+
+
+def test_resuming_from_a_checkpoint_is_the_same_as_a_full_run(tmp_path, trace_text):
+    file_name = tmp_path / "trace.res"
+    lines = trace_text.splitlines(keepends=True)
+    file_name.write_text(''.join(lines[:4]) + lines[4][:10])
+    _, checkpoint = Tcp(agent=TcpReno(), node=Node(1)).resume_metrics(TraceTail(str(file_name)), checkpoint=None)
+    assert checkpoint.offset == len(''.join(lines[:4]))
+    checkpoint.save(str(tmp_path / "checkpoint"))
+    file_name.write_text(trace_text)
+    resumed, _ = Tcp(agent=TcpReno(), node=Node(1)).resume_metrics(TraceTail(str(file_name)),
+                                                                    Checkpoint.load(str(tmp_path / "checkpoint")))
+    expected = Tcp(agent=TcpReno(), node=Node(1)).get_metrics(TraceFile(str(file_name)))
+    assert np.array_equal(resumed.timeout_metrics.metrics, expected.timeout_metrics.metrics)
+    assert np.array_equal(resumed.congestion_window_metrics.metrics, expected.congestion_window_metrics.metrics)
+
+
+def test_a_checkpoint_of_another_agent_configuration_is_simulated_again(trace_file, caplog):
+    _, checkpoint = Tcp(agent=TcpReno(), node=Node(1)).resume_metrics(TraceTail(str(trace_file)), checkpoint=None)
+    agent = TcpReno(slow_start_threshold=2, time_type=FixedTime)
+    resumed, _ = Tcp(agent=agent, node=Node(1)).resume_metrics(TraceTail(str(trace_file), time_type=FixedTime),
+                                                               checkpoint)
+    assert "agent or node changed" in caplog.text
+    expected = Tcp(agent=TcpReno(slow_start_threshold=2), node=Node(1)).get_metrics(TraceFile(str(trace_file)))
+    assert np.array_equal(resumed.congestion_window_metrics.metrics, expected.congestion_window_metrics.metrics)
+
+
+def test_prefix_digest_covers_the_start_of_the_trace(tmp_path):
+    file_name = tmp_path / "trace.res"
+    file_name.write_bytes(b"a" * DIGEST_BYTES * 3)
+    digest = prefix_digest(str(file_name), DIGEST_BYTES * 3)
+    file_name.write_bytes(b"b" + b"a" * (DIGEST_BYTES * 3 - 1))
+    assert prefix_digest(str(file_name), DIGEST_BYTES * 3) != digest
+
+
+class Payload:
+    def __reduce__(self):
+        return os.system, ("echo pwned",)
+
+
+def test_checkpoints_can_only_refer_to_the_simulation_state(tmp_path):
+    file_name = tmp_path / "checkpoint"
+    file_name.write_bytes(zlib.compress(pickle.dumps(Payload())))
+    with pytest.raises(pickle.UnpicklingError, match="not part of the simulation state"):
+        Checkpoint.load(str(file_name))
@@ -0,0 +1,114 @@
+import pathlib
+
+import numpy as np
+import pytest
+
+from src.tcp.agents.reno import TcpReno
+from src.tcp.tcp import Tcp
+from src.trace.cache import TraceCache
+from src.trace.columnar import ColumnarTraceFile, parse_lines
+from src.trace.parallel import ParallelTraceFile
+from src.trace.trace_file import TraceFile, Node, PacketEvent
+
+TRACE = """+ 0.1 1 2 tcp 40 ------- 1 1.0 3.0 0 0
+- 0.1 1 2 tcp 40 ------- 1 1.0 3.0 0 0
++ 0.103 0 2 cbr 1000 ------- 2 0.0 3.1 0 1
+r 0.111 1 2 tcp 40 ------- 1 1.0 3.0 0 0
++ 0.111 2 3 tcp 40 ------- 1 1.0 3.0 0 0
+d 0.111 2 3 cbr 1000 ------- 2 0.0 3.1 0 1
+r 0.2215 2 1 ack 40 ------- 1 3.0 1.0 0 2
++ 0.2215 1 2 tcp 1040 ------- 1 1.0 3.0 1 3
+- 0.2215 1 2 tcp 1040 ------- 1 1.0 3.0 1 3
++ 0.2215 1 2 tcp 1040 ------- 1 1.0 3.0 2 4
+- 0.23 1 2 tcp 1040 ------- 1 1.0 3.0 2 4
+r 3.5 2 1 ack 40 ------- 1 3.0 1.0 1 5
+"""
+
+
+def write_trace(tmp_path) -> str:
+    file_name = tmp_path / "trace.res"
+    file_name.write_text(TRACE)
+    return str(file_name)
+
+
+def test_columnar_events_are_the_same_as_the_object_parser(tmp_path):
+    file_name = write_trace(tmp_path)
+    # A tiny batch size forces lines to be split between reads
+    columnar = ColumnarTraceFile(file_name, batch_bytes=50)
+    assert list(columnar.events()) == list(TraceFile(file_name))
+    assert len(columnar.load()) == len(TRACE.splitlines())
+
+
+def test_columnar_metrics_are_the_same_as_the_object_metrics(tmp_path):
+    file_name = write_trace(tmp_path)
+    program = Tcp(agent=TcpReno(), node=Node(1)).get_metrics(TraceFile(file_name))
+    columnar = Tcp(agent=TcpReno(), node=Node(1)).get_metrics(ColumnarTraceFile(file_name))
+    assert np.array_equal(columnar.timeout_metrics.metrics, program.timeout_metrics.metrics)
+    assert np.array_equal(columnar.congestion_window_metrics.metrics, program.congestion_window_metrics.metrics)
+
+
+def test_parallel_batches_are_the_same_as_the_sequential_ones(tmp_path):
+    file_name = write_trace(tmp_path)
+    sequential = ColumnarTraceFile(file_name).load()
+    assert (ParallelTraceFile(file_name, jobs=2, batch_bytes=100).load() == sequential).all()
+
+
+def test_cached_trace_is_the_same_as_the_parsed_one(tmp_path):
+    file_name = write_trace(tmp_path)
+    cache = TraceCache(directory=str(tmp_path / "cache"))
+    parsed = ColumnarTraceFile(file_name, cache=cache).load()
+    assert len(list((tmp_path / "cache").glob("*.npy"))) == 1
+    cached = ColumnarTraceFile(file_name, cache=cache).load()
+    assert (cached == parsed).all()
+    assert (cached == ColumnarTraceFile(file_name).load()).all()
+
+
+def test_cache_eviction_skips_entries_removed_meanwhile(tmp_path, monkeypatch):
+    cache = TraceCache(directory=str(tmp_path / "cache"), max_bytes=1)
+    for key in ("first", "second"):
+        cache.put(key, np.zeros(4))
+    assert not list((tmp_path / "cache").glob("*.tmp"))
+    stat = pathlib.Path.stat
+
+    def removed_meanwhile(path, *args, **kwargs):
+        if path.name.startswith("first"):
+            raise FileNotFoundError(path)
+        return stat(path, *args, **kwargs)
+    cache.put("first", np.zeros(4))
+    monkeypatch.setattr(pathlib.Path, "stat", removed_meanwhile)
+    cache.evict()
+
+
+def test_parse_lines_rejects_values_that_do_not_fit_their_column():
+    line = b"+ 0.1 1 2 tcp 40 ------- 1 1.0 3.0 %s 0\n"
+    assert parse_lines(line % b"4294967296")['sequence_number'][0] == 2 ** 32
+    with pytest.raises(ValueError, match="more than 18 digits"):
+        parse_lines(line % b"99999999999999999999")
+    with pytest.raises(ValueError, match="does not fit in int32"):
+        parse_lines(b"+ 0.1 4294967296 2 tcp 40 ------- 1 1.0 3.0 0 0\n")
+
+
+@pytest.mark.parametrize("data, error", [
+    (b"+ 0.1 1 2 tcp 40 ------- 1 1.0 3.0 0\n+ 0.1 1 2 tcp 40 ------- 1 1.0 3.0 0 0 0\n",
+     "expected 12 parts on each line, got 11 on line 1"),
+    (b"+ 0.1 1 2 tcp 40 ------- 1 1.0 3.0 0 0\n+ 0.1 1 2 tcp 40 -------  1 1.0 3.0 0 0\n",
+     "got 13 on line 2"),
+    (b"+ 0.1 1 2 tcp 40 ------- 1\t1.0 3.0 0 0\n", "got 11 on line 1"),
+    (b"+ 0.1 1 2 tcp 40 ------- 1\t1.0 3.0 0 0 0\n", "Invalid flow identifier"),
+])
+def test_parse_lines_rejects_what_the_object_parser_rejects(data, error):
+    with pytest.raises(ValueError, match=error):
+        parse_lines(data)
+    with pytest.raises(ValueError):
+        for line in data.decode().splitlines(keepends=True):
+            PacketEvent.from_str(line)
+
+
+def test_parse_lines_rejects_flags_longer_than_their_column():
+    with pytest.raises(ValueError, match="Invalid flags: ---------, longer than 7 characters"):
+        parse_lines(b"+ 0.1 1 2 tcp 40 --------- 1 1.0 3.0 0 0\n")
+
+
+def test_parse_lines_accepts_windows_line_endings():
+    line = b"+ 0.1 1 2 tcp 40 ------- 1 1.0 3.0 0 0"
+    assert (parse_lines(line + b"\r\n" + line) == parse_lines(line + b"\n" + line)).all()
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from src.metrics.comparison import as_of, compare_series
+from src.metrics.metrics import CongestionWindowMetrics
+
+
+def series(*points) -> CongestionWindowMetrics:
+    metrics = CongestionWindowMetrics()
+    for time, value in points:
+        metrics.append(time, value)
+    return metrics
+
+
+def test_as_of_takes_the_last_point_at_or_before_each_time():
+    time, value = np.array([1.0, 2.0, 2.0, 4.0]), np.array([10.0, 20.0, 21.0, 40.0])
+    assert np.array_equal(as_of(time, value, np.array([0.5, 1.0, 2.0, 3.0, 5.0])),
+                          np.array([np.nan, 10.0, 21.0, 21.0, 40.0]), equal_nan=True)
+
+
+def test_compare_series_weights_the_errors_by_time():
+    original = series((0.0, 1.0), (1.0, 2.0), (4.0, 2.0))
+    program = series((0.0, 1.0), (2.0, 2.0), (3.0, 5.0), (4.0, 2.0))
+    comparison = compare_series(original, program)
+    assert comparison.first_divergence == 1.0
+    assert comparison.max_absolute_error == 3.0
+    assert comparison.mean_absolute_error == pytest.approx((1 * 1 + 1 * 3) / 4)
+    assert comparison.disagreement_fraction == pytest.approx(2 / 4)
+
+
+def test_identical_series_agree():
+    original = series((0.0, 1.0), (1.0, 2.0))
+    comparison = compare_series(original, series((0.0, 1.0), (1.0, 2.0)))
+    assert comparison.agrees and comparison.max_absolute_error == 0.0
+    assert compare_series(original, series()).agrees
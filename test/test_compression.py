@@ -0,0 +1,34 @@
+import bz2
+import gzip
+import lzma
+
+import pytest
+
+from src.trace.columnar import ColumnarTraceFile
+from src.trace.compression import detect_compression
+from src.trace.live import LiveTraceFile
+from src.trace.trace_file import TraceFile, Time
+
+LINE = "{event} {time} 1 2 tcp 1040 ------- 1 1.0 3.0 {seq} {seq}\n"
+TRACE = "".join(LINE.format(event=event, time=f"{seq * 0.05:.2f}", seq=seq) for seq in range(5000) for event in '+-')
+
+
+@pytest.mark.parametrize("compression, compress", [('gzip', gzip.compress), ('bz2', bz2.compress),
+                                                    ('xz', lzma.compress)])
+def test_compressed_trace_is_the_same_as_the_plain_one(tmp_path, compression, compress):
+    plain, compressed = tmp_path / "trace.res", tmp_path / "trace.res.compressed"
+    plain.write_text(TRACE)
+    compressed.write_bytes(compress(TRACE.encode()))
+    assert detect_compression(str(plain)) is None
+    assert detect_compression(str(compressed)) == compression
+    assert list(TraceFile(str(compressed))) == list(TraceFile(str(plain)))
+    assert (ColumnarTraceFile(str(compressed), batch_bytes=4096).load() == ColumnarTraceFile(str(plain)).load()).all()
+    window = TraceFile(str(compressed), since=Time.from_str("10"), until=Time.from_str("12"))
+    assert len(list(window)) == 2 * 41
+
+
+def test_compressed_traces_cannot_be_followed(tmp_path):
+    compressed = tmp_path / "trace.res.gz"
+    compressed.write_bytes(gzip.compress(TRACE.encode()))
+    with pytest.raises(ValueError, match="not live"):
+        LiveTraceFile(str(compressed), follow=True)
@@ -0,0 +1,28 @@
+import json
+
+import numpy as np
+
+from src.metrics.export import export_metrics
+from src.metrics.metrics import TcpMetrics, TimeoutMetrics, CongestionWindowMetrics
+from src.trace.trace_file import Time
+
+
+def metrics() -> TcpMetrics:
+    tcp_metrics = TcpMetrics(timeout_metrics=TimeoutMetrics(), congestion_window_metrics=CongestionWindowMetrics())
+    for time in ("0.1", "0.25", "1.5"):
+        tcp_metrics.timeout_metrics.add_metric(Time.from_str(time), Time.from_str("3.0"))
+        tcp_metrics.congestion_window_metrics.add_metric(Time.from_str(time), 2.5)
+    return tcp_metrics
+
+
+def test_every_format_has_the_same_points(tmp_path):
+    for format in ("csv", "json", "npz"):
+        export_metrics(metrics(), folder=str(tmp_path), type="program", format=format)
+    npz = np.load(tmp_path / "program_metrics.npz")
+    with open(tmp_path / "program_metrics.json") as file:
+        exported = json.load(file)
+    with open(tmp_path / "program_metrics.csv") as file:
+        rows = [line.strip().split(',') for line in file.readlines()[1:]]
+    assert npz['timeout_time'].tolist() == exported['timeout']['time'] == [0.1, 0.25, 1.5]
+    assert npz['congestion_window_value'].tolist() == exported['congestion_window']['value'] == [2.5] * 3
+    assert [float(time) for series, time, _ in rows if series == 'timeout'] == [0.1, 0.25, 1.5]
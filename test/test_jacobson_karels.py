@@ -1,5 +1,5 @@
 from src.tcp.timeout.jacobson_karels import JacobsonKarelsTimeoutEstimator
-from src.trace.trace_file import TimeInterval, Time
+from src.trace.trace_file import TimeInterval, Time, FixedTime
 
 
 # |-------------------------------------------------|
@@ -20,3 +20,15 @@ def test_jacobson_karels():
     assert estimator.timeout == Time.from_str("0.31609375")
     estimator.recalculate_timeout(TimeInterval(Time.from_str("0.44"), Time.from_str("0.59")))  # 15
     assert estimator.timeout == Time.from_str("0.28126953125")
+
+
+def test_jacobson_karels_with_fixed_point_time():
+    estimator = JacobsonKarelsTimeoutEstimator(initial_timeout=FixedTime.from_str("3.0"))
+    estimator.recalculate_timeout(TimeInterval(FixedTime.from_str("0"), FixedTime.from_str("0.14")))  # 14
+    assert estimator.timeout == FixedTime.from_str("0.42")
+    estimator.recalculate_timeout(TimeInterval(FixedTime.from_str("0.14"), FixedTime.from_str("0.29")))  # 15
+    assert estimator.timeout == FixedTime.from_str("0.36125")
+    estimator.recalculate_timeout(TimeInterval(FixedTime.from_str("0.29"), FixedTime.from_str("0.44")))  # 15
+    assert estimator.timeout == FixedTime.from_str("0.31609375")
+    estimator.recalculate_timeout(TimeInterval(FixedTime.from_str("0.44"), FixedTime.from_str("0.59")))  # 15
+    assert estimator.timeout == FixedTime.from_str("0.28126953125")
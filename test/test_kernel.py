@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from src.tcp.agents.reno import TcpReno
+from src.tcp.agents.rfc_793 import TcpRfc793Agent
+from src.tcp.congestion_window.slow_start import SlowStart
+from src.tcp.tcp import Tcp
+from src.tcp.timeout.scheduler import EventQueue
+from src.trace.columnar import ColumnarTraceFile
+from src.trace.trace_file import TraceFile, Node
+
+
+@pytest.mark.parametrize("make_agent", [lambda: TcpReno(slow_start_threshold=2, fast_retransmit_threshold=1),
+                                        lambda: TcpRfc793Agent(cw_algorithm=SlowStart(slow_start_threshold=2),
+                                                               karn_rtt=False)])
+def test_kernel_metrics_are_the_same_as_the_agent_ones(tmp_path, trace_text, make_agent):
+    file_name = tmp_path / "trace.res"
+    file_name.write_text(trace_text + "r 3.6 2 1 ack 40 ------- 1 3.0 1.0 1 7\n"
+                                      "r 3.7 2 1 ack 40 ------- 1 3.0 1.0 1 8\n")
+    expected = Tcp(agent=make_agent(), node=Node(1)).get_metrics(TraceFile(str(file_name)))
+    for trace in (TraceFile(str(file_name)), ColumnarTraceFile(str(file_name))):
+        metrics = Tcp(agent=make_agent(), node=Node(1), kernel=True).get_metrics(trace)
+        assert np.array_equal(metrics.timeout_metrics.metrics, expected.timeout_metrics.metrics)
+        assert np.array_equal(metrics.congestion_window_metrics.metrics, expected.congestion_window_metrics.metrics)
+
+
+def test_catching_up_zero_timeouts_ends_the_same_with_and_without_the_kernel(trace_file):
+    metrics = []
+    for kernel in (False, True):
+        agent = TcpRfc793Agent(cw_algorithm=SlowStart(), initial_timeout="0")
+        agent.use_event_queue(EventQueue(catch_up=True))
+        metrics.append(Tcp(agent=agent, node=Node(1), kernel=kernel).get_metrics(TraceFile(str(trace_file))))
+    assert np.array_equal(metrics[0].timeout_metrics.metrics, metrics[1].timeout_metrics.metrics)
+    assert np.array_equal(metrics[0].congestion_window_metrics.metrics, metrics[1].congestion_window_metrics.metrics)
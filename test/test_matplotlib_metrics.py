@@ -0,0 +1,28 @@
+import numpy as np
+
+from src.metrics.matplotlib_metrics import min_max_decimation, render, metric_figures
+from src.metrics.metrics import TcpMetrics, TimeoutMetrics, CongestionWindowMetrics
+
+
+def test_min_max_decimation_keeps_the_extremes_of_each_column():
+    time = np.linspace(0, 10, 100_000)
+    value = np.sin(time * 50) + (time > 5) * 3
+    decimated_time, decimated_value = min_max_decimation(time, value, columns=100)
+    assert len(decimated_time) <= 400
+    assert decimated_time[0] == time[0] and decimated_time[-1] == time[-1]
+    assert np.all(np.diff(decimated_time) > 0)
+    assert decimated_value.min() == value.min() and decimated_value.max() == value.max()
+
+
+def test_min_max_decimation_leaves_short_series_alone():
+    time, value = np.arange(10.0), np.arange(10.0)
+    assert min_max_decimation(time, value, columns=100)[0] is time
+
+
+def test_render_draws_every_figure_on_the_pool(tmp_path):
+    metrics = TcpMetrics(timeout_metrics=TimeoutMetrics(), congestion_window_metrics=CongestionWindowMetrics())
+    metrics.timeout_metrics.extend(time=np.arange(3.0), value=np.array([3.0, 1.0, 2.0]))
+    metrics.congestion_window_metrics.extend(time=np.arange(3.0), value=np.array([1.0, 2.0, 1.0]))
+    render(metric_figures(metrics, folder=str(tmp_path), type="program", decimate=False), jobs=2)
+    for name in ("congestion_window_program_plot.png", "timeout_program_plot.png"):
+        assert (tmp_path / name).read_bytes().startswith(b'\x89PNG')
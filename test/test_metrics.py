@@ -0,0 +1,21 @@
+from src.metrics.metrics import CongestionWindowMetrics, INITIAL_CAPACITY
+from src.trace.trace_file import Time
+
+
+def test_metric_series_grows_past_its_capacity():
+    series = CongestionWindowMetrics()
+    for i in range(INITIAL_CAPACITY + 1):
+        series.add_metric(Time.from_str(str(i)), i / 2)
+    assert len(series) == INITIAL_CAPACITY + 1
+    assert series.time[-1] == INITIAL_CAPACITY and series.value[-1] == INITIAL_CAPACITY / 2
+    series.reset()
+    assert len(series.time) == 0
+
+
+def test_change_points_keep_the_ends_of_each_run():
+    series = CongestionWindowMetrics()
+    series.change_points = True
+    for time, value in [("0", 1), ("1", 1), ("2", 1), ("3", 2), ("4", 2), ("5", 2), ("6", 1)]:
+        series.add_metric(Time.from_str(time), value)
+    assert series.time.tolist() == [0, 2, 3, 5, 6]
+    assert series.value.tolist() == [1, 1, 2, 2, 1]
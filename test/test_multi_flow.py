@@ -0,0 +1,35 @@
+import numpy as np
+
+from src.tcp.agents.reno import TcpReno
+from src.tcp.multi_flow import MultiFlowTcp
+from src.tcp.tcp import Tcp
+from src.trace.columnar import ColumnarTraceFile
+from src.trace.trace_file import TraceFile, Node
+
+TRACE = """+ 0.1 1 2 tcp 40 ------- 1 1.0 3.0 0 0
+- 0.1 1 2 tcp 40 ------- 1 1.0 3.0 0 0
++ 0.102 4 2 tcp 40 ------- 7 4.1 3.2 0 1
+- 0.102 4 2 tcp 40 ------- 7 4.1 3.2 0 1
++ 0.103 0 2 cbr 1000 ------- 2 0.0 3.1 0 2
+r 0.111 1 2 tcp 40 ------- 1 1.0 3.0 0 0
++ 0.111 2 3 tcp 40 ------- 1 1.0 3.0 0 0
+r 0.2215 2 1 ack 40 ------- 1 3.0 1.0 0 3
++ 0.2215 1 2 tcp 1040 ------- 1 1.0 3.0 1 4
+- 0.2215 1 2 tcp 1040 ------- 1 1.0 3.0 1 4
+r 0.25 2 4 ack 40 ------- 7 3.2 4.1 0 5
++ 0.25 4 2 tcp 1040 ------- 7 4.1 3.2 1 6
+- 0.25 4 2 tcp 1040 ------- 7 4.1 3.2 1 6
+r 3.5 2 1 ack 40 ------- 1 3.0 1.0 1 7
+"""
+
+
+def test_every_flow_gets_the_metrics_of_a_single_flow_run(tmp_path):
+    file_name = tmp_path / "trace.res"
+    file_name.write_text(TRACE)
+    for trace in (TraceFile(str(file_name)), ColumnarTraceFile(str(file_name))):
+        flows = MultiFlowTcp(agent_factory=TcpReno).get_metrics(trace)
+        assert sorted(str(flow) for flow in flows) == ['node_1_flow_1_port_0', 'node_4_flow_7_port_1']
+        for flow, metrics in flows.items():
+            expected = Tcp(agent=TcpReno(), node=flow.node).get_metrics(TraceFile(str(file_name)))
+            assert np.array_equal(metrics.timeout_metrics.metrics, expected.timeout_metrics.metrics)
+            assert np.array_equal(metrics.congestion_window_metrics.metrics, expected.congestion_window_metrics.metrics)
@@ -0,0 +1,28 @@
+import json
+
+from src.config import profiler
+from src.config.profiler import Profiler, counted, stage
+
+
+def test_stages_are_not_measured_when_profiling_is_off():
+    items = [1, 2, 3]
+    assert counted(items, 'items') is items
+    with stage('anything') as measured:
+        measured.count(3)
+
+
+def test_stages_report_events_and_counters(monkeypatch):
+    enabled = Profiler()
+    monkeypatch.setattr(profiler, '_profiler', enabled)
+    with stage('outer') as outer:
+        with stage('inner') as inner:
+            assert sum(counted(range(5), 'lines')) == 10
+            inner.count(5)
+        outer.count(2)
+    assert [(report.name, report.depth, report.events) for report in enabled.reports] == [('outer', 0, 2),
+                                                                                           ('inner', 1, 5)]
+    assert enabled.reports[1].counters == {'lines': 5}
+    assert enabled.reports[0].wall_seconds >= enabled.reports[1].wall_seconds
+    assert [report['name'] for report in json.loads(enabled.json())] == ['outer', 'inner']
+    assert all('net_live_blocks' in report for report in json.loads(enabled.json()))
+    assert 'inner' in enabled.text() and 'net live blocks' in enabled.text()
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from src.trace.congestion_window_file import CongestionWindowTraceFile
+from src.trace.reference import load_columns
+from src.trace.timeout_file import TimeoutTraceFile
+
+
+@pytest.mark.parametrize("lines", ["0.12 3.02\n0.14 3.5\n", "0.12 3.02 0.1 0.2 0.3\n0.14 3.5 0.1 0.2 0.3"])
+def test_timeout_metrics_are_the_same_as_parsing_each_line(tmp_path, lines):
+    file_name = tmp_path / "timeout.res"
+    file_name.write_text(lines)
+    metrics = TimeoutTraceFile(str(file_name)).get_metrics()
+    entities = list(TimeoutTraceFile(str(file_name)))
+    assert metrics.time.tolist() == [float(entity.time) for entity in entities]
+    assert metrics.value.tolist() == [float(entity.rto) for entity in entities]
+
+
+def test_congestion_window_metrics_are_loaded_in_batches(tmp_path):
+    file_name = tmp_path / "congestion_window.res"
+    file_name.write_text("".join(f"{time / 10} {time % 7}.5 20\n" for time in range(100)))
+    columns = load_columns(str(file_name), layouts=(3,), batch_bytes=64)
+    assert columns.shape == (100, 3)
+    metrics = CongestionWindowTraceFile(str(file_name)).get_metrics()
+    assert np.array_equal(metrics.value, columns[:, 1])
+
+
+def test_reference_traces_should_have_the_same_layout_on_every_line(tmp_path):
+    file_name = tmp_path / "timeout.res"
+    file_name.write_text("0.12 3.02\n0.14 3.5 0.1 0.2 0.3\n")
+    with pytest.raises(ValueError, match="expected 2 parts"):
+        TimeoutTraceFile(str(file_name)).get_metrics()
+    file_name.write_text("0.12 3.02 1\n")
+    with pytest.raises(ValueError, match="expected 5 or 2 parts"):
+        TimeoutTraceFile(str(file_name)).get_metrics()
+    file_name.write_text("0.12 3.02\n0.14 3.5 0.1\n0.16\n")
+    with pytest.raises(ValueError, match="expected 2 parts on each line, got 3"):
+        TimeoutTraceFile(str(file_name)).get_metrics()
+    file_name.write_text("0.12 x\n")
+    with pytest.raises(ValueError, match="not a number"):
+        TimeoutTraceFile(str(file_name)).get_metrics()
@@ -0,0 +1,52 @@
+from src.tcp.timeout.scheduler import EventQueue, Scheduler
+from src.trace.trace_file import Time
+
+
+def backoff_timer(queue: EventQueue, fired: list, name: str) -> Scheduler:
+    def timeout(time):
+        fired.append((name, time.value))
+        scheduler.set_timer(time + Time.from_str("1"))
+    scheduler = Scheduler(timeout_action=timeout, queue=queue)
+    return scheduler
+
+
+def test_catch_up_fires_every_due_expiration_in_time_order():
+    fired = []
+    queue = EventQueue(catch_up=True)
+    backoff_timer(queue, fired, "a").set_timer(Time.from_str("1"))
+    backoff_timer(queue, fired, "b").set_timer(Time.from_str("1.5"))
+    queue.run_until(Time.from_str("3.2"))
+    assert [(name, str(time)) for name, time in fired] == [("a", "1"), ("b", "1.5"), ("a", "2"), ("b", "2.5"),
+                                                           ("a", "3")]
+
+
+def test_without_catch_up_timers_fire_once_per_run():
+    fired = []
+    scheduler = backoff_timer(EventQueue(), fired, "a")
+    scheduler.set_timer(Time.from_str("1"))
+    scheduler.schedule(Time.from_str("3.2"))
+    scheduler.schedule(Time.from_str("3.2"))
+    assert [str(time) for _, time in fired] == ["1", "2"]
+
+
+def test_inactive_timers_do_not_fire():
+    fired = []
+    scheduler = backoff_timer(EventQueue(catch_up=True), fired, "a")
+    scheduler.set_timer(Time.from_str("1"))
+    scheduler.inactivate()
+    scheduler.schedule(Time.from_str("10"))
+    assert fired == [] and not scheduler.is_pending(Time.from_str("10"))
+
+
+def test_catch_up_stops_at_timers_that_do_not_move_forward():
+    fired = []
+    queue = EventQueue(catch_up=True)
+
+    def timeout(time):
+        fired.append(time)
+        scheduler.set_timer(time)
+    scheduler = Scheduler(timeout_action=timeout, queue=queue)
+    scheduler.set_timer(Time.from_str("1"))
+    queue.run_until(Time.from_str("3"))
+    queue.run_until(Time.from_str("3"))
+    assert [str(time.value) for time in fired] == ["1", "1"]
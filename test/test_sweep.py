@@ -0,0 +1,66 @@
+import math
+from argparse import Namespace
+
+import pytest
+
+from src.metrics.metrics import TcpMetrics, TimeoutMetrics, CongestionWindowMetrics
+from src.tcp.agents.reno import TcpReno
+from src.tcp.sweep import Sweep, parse_grid, summarize
+from src.tcp import tcp
+from src.tcp.kernel import simulate_packets
+from src.tcp.tcp import Tcp
+from src.tcp.timeout.scheduler import EventQueue
+from src.trace.trace_file import TraceFile, Node
+
+
+def reno(args: Namespace) -> TcpReno:
+    agent = TcpReno(initial_timeout=args.initial_timeout, slow_start_threshold=args.ssthreshold)
+    if args.catch_up_timeouts:
+        agent.use_event_queue(EventQueue(catch_up=True))
+    return agent
+
+
+def test_sweep_results_are_the_same_as_running_each_configuration(trace_file):
+    args = Namespace(node=1, initial_timeout="3.0", ssthreshold=20, fixed_point_time=False, kernel=False,
+                     catch_up_timeouts=False)
+    sweep = Sweep(args=args, grid=parse_grid(["initial-timeout=1.0,3.0", "ssthreshold=2,20"]), agent_factory=reno)
+    results = sweep.run(tcp=Tcp(agent=TcpReno(), node=Node(1)), trace=TraceFile(str(trace_file)))
+    assert [result.parameters for result in results] == sweep.configurations()
+    assert len(results) == 4
+    for result in results:
+        agent = TcpReno(initial_timeout=result.parameters['initial_timeout'],
+                        slow_start_threshold=result.parameters['ssthreshold'])
+        assert result.summary == summarize(Tcp(agent=agent, node=Node(1)).get_metrics(TraceFile(str(trace_file))))
+
+
+@pytest.mark.parametrize("catch_up_timeouts", [False, True])
+def test_kernel_and_agent_sweeps_agree(trace_file, catch_up_timeouts, monkeypatch):
+    kernel_runs = []
+    monkeypatch.setattr(tcp, 'simulate_packets', lambda agent, packets: kernel_runs.append(agent) or
+                        simulate_packets(agent, packets))
+    summaries = []
+    for kernel in (False, True):
+        args = Namespace(node=1, initial_timeout="3.0", ssthreshold=20, fixed_point_time=False, kernel=kernel,
+                         catch_up_timeouts=catch_up_timeouts)
+        sweep = Sweep(args=args, grid=parse_grid(["initial-timeout=0,0.1,3.0", "ssthreshold=2,20"]),
+                      agent_factory=reno)
+        summaries.append([result.summary for result in sweep.run(tcp=Tcp(agent=TcpReno(), node=Node(1)),
+                                                                 trace=TraceFile(str(trace_file)))])
+    assert summaries[0] == summaries[1]
+    assert len(kernel_runs) == 6
+    assert all(agent.timeout_service.scheduler.queue.catch_up == catch_up_timeouts for agent in kernel_runs)
+
+
+def test_parse_grid_rejects_unknown_parameters():
+    assert parse_grid(["mss=500,1000"]) == {'mss': [500, 1000]}
+    with pytest.raises(ValueError, match="Invalid sweep parameter"):
+        parse_grid(["node=1,2"])
+    with pytest.raises(ValueError, match="at least one value"):
+        parse_grid(["ssthreshold="])
+
+
+def test_summary_of_empty_metrics_is_nan():
+    summary = summarize(TcpMetrics(timeout_metrics=TimeoutMetrics(),
+                                   congestion_window_metrics=CongestionWindowMetrics()))
+    assert all(math.isnan(summary[key]) for key in ('mean_cw', 'max_cw', 'final_cw', 'mean_timeout', 'max_timeout'))
+    assert summary['cw_decreases'] == 0 and summary['timeout_unit'] == 'ms'
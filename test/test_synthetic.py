@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from src.tcp.agents.reno import TcpReno
+from src.tcp.multi_flow import MultiFlowTcp
+from src.tcp.tcp import Tcp
+from src.trace.synthetic import SyntheticTrace
+from src.trace.trace_file import TraceFile, Node, EventType
+
+
+def test_synthetic_traces_are_sorted_and_simulated(tmp_path):
+    file_name = str(tmp_path / "trace.res")
+    SyntheticTrace(loss=0.05, segments_per_batch=256).write(file_name, lines=5000)
+    packets = list(TraceFile(file_name))
+    assert 5000 <= len(packets) < 5000 + 12
+    assert [packet.time for packet in packets] == sorted(packet.time for packet in packets)
+    assert any(packet.event_type == EventType.Dropped for packet in packets)
+    metrics = Tcp(agent=TcpReno(), node=Node(1)).get_metrics(TraceFile(file_name))
+    assert len(metrics.congestion_window_metrics) > 0
+
+
+def test_synthetic_traces_are_deterministic(tmp_path):
+    trace = SyntheticTrace(flows=3, segments_per_batch=128)
+    trace.write(str(tmp_path / "first.res"), lines=3000)
+    trace.write(str(tmp_path / "second.res"), lines=3000)
+    assert (tmp_path / "first.res").read_text() == (tmp_path / "second.res").read_text()
+    flows = MultiFlowTcp(agent_factory=TcpReno).get_metrics(TraceFile(str(tmp_path / "first.res")))
+    assert sorted(key.node.identifier for key in flows) == [1, 2, 3]
+    identifiers = [packet.packet_identifier.value for packet in TraceFile(str(tmp_path / "first.res"))
+                   if packet.event_type == EventType.PutQueue and packet.source == packet.source_addr.node]
+    assert len(np.unique(identifiers)) == len(identifiers)
+
+
+@pytest.mark.parametrize("lines", [1, 170, 233, 401, 5000])
+def test_synthetic_traces_stop_between_packets(tmp_path, lines):
+    file_name = str(tmp_path / "trace.res")
+    SyntheticTrace(seed=3, loss=0.1, segments_per_batch=256).write(file_name, lines=lines)
+    packets = Tcp(agent=TcpReno(), node=Node(1)).get_packages(TraceFile(file_name))
+    assert len(packets) > 0
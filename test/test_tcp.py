@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from src.tcp.agents.reno import TcpReno
+from src.tcp.tcp import Tcp
+from src.trace.filters import line_predicate, enqueue_packet_on, received, filter_packets_from_node
+from src.trace.live import LiveTraceFile
+from src.trace.trace_file import TraceFile, Node, PacketEvent, Time
+
+
+def test_streaming_packets_are_the_same_as_get_packages(trace_file):
+    tcp = Tcp(agent=TcpReno(), node=Node(1), streaming=True)
+    assert list(tcp.stream_packages(TraceFile(str(trace_file)))) == tcp.get_packages(TraceFile(str(trace_file)))
+
+
+def test_streaming_checks_the_dequeue_count(tmp_path, trace_text):
+    file_name = tmp_path / "trace.res"
+    file_name.write_text(trace_text + "+ 3.6 1 2 tcp 1040 ------- 1 1.0 3.0 2 6\n")
+    tcp = Tcp(agent=TcpReno(), node=Node(1), streaming=True)
+    with pytest.raises(AssertionError, match="enqueued and dequeued"):
+        tcp.get_metrics(TraceFile(str(file_name)))
+
+
+def test_line_predicate_is_the_same_as_the_packet_predicates(trace_text):
+    predicate = line_predicate(Node(1), enqueue_packet_on, received)
+    for line in trace_text.splitlines(keepends=True):
+        packet = PacketEvent.from_str(line)
+        assert predicate(line) == (enqueue_packet_on(Node(1), packet) or received(Node(1), packet))
+
+
+def test_filtering_with_the_same_predicate_twice(trace_file):
+    packets = list(filter_packets_from_node(Node(1), TraceFile(str(trace_file), lazy=True), send_func=received))
+    assert packets == [packet for packet in TraceFile(str(trace_file)) if received(Node(1), packet)]
+
+
+@pytest.mark.parametrize("line, error", [("+ 0.5\n", "Invalid packet event"), ("\n", "Invalid packet event"),
+                                         ("r 0.5 2 x tcp 1040 ------- 1 1.0 3.0 2 6\n", "Invalid node: x")])
+@pytest.mark.parametrize("streaming", [False, True])
+def test_malformed_lines_of_other_nodes_are_rejected(tmp_path, trace_text, line, error, streaming):
+    file_name = tmp_path / "trace.res"
+    file_name.write_text(trace_text + line)
+    with pytest.raises(ValueError, match=error):
+        Tcp(agent=TcpReno(), node=Node(1), streaming=streaming).get_metrics(TraceFile(str(file_name)))
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_short_lines_are_rejected_by_the_parser(tmp_path, trace_text, lazy):
+    file_name = tmp_path / "trace.res"
+    file_name.write_text(trace_text + "+ 0.5\n")
+    with pytest.raises(ValueError, match="Invalid packet event"):
+        list(filter_packets_from_node(Node(1), TraceFile(str(file_name), lazy=lazy)))
+
+
+def test_follow_metrics_flushes_every_interval(tmp_path, trace_text):
+    file_name = tmp_path / "trace.res"
+    file_name.write_text(trace_text + "+ 3.6 1 2 tcp 1040 ------- 1 1.0 3.0 2 6\n"
+                                      "- 3.6 1 2 tcp 1040 ------- 1 1.0 3.0 2 6\n")
+    flushed = []
+    tcp = Tcp(agent=TcpReno(), node=Node(1))
+    metrics = tcp.follow_metrics(LiveTraceFile(str(file_name)), flush_interval=Time.from_str("1"),
+                                 flush=lambda m: flushed.append(len(m.congestion_window_metrics.metrics)))
+    expected = Tcp(agent=TcpReno(), node=Node(1)).get_metrics(TraceFile(str(file_name)))
+    assert np.array_equal(metrics.congestion_window_metrics.metrics, expected.congestion_window_metrics.metrics)
+    assert len(flushed) == 2
+
+
+def test_follow_metrics_flushes_a_trace_ending_with_queued_packets(tmp_path, trace_text, caplog):
+    file_name = tmp_path / "trace.res"
+    file_name.write_text(trace_text + "+ 3.6 1 2 tcp 1040 ------- 1 1.0 3.0 2 6\n")
+    flushed = []
+    Tcp(agent=TcpReno(), node=Node(1)).follow_metrics(LiveTraceFile(str(file_name)), flush_interval=Time.from_str("10"),
+                                                      flush=flushed.append)
+    assert len(flushed) == 1
+    assert "1 packets were enqueued but not dequeued yet" in caplog.text
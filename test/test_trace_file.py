@@ -0,0 +1,55 @@
+import pickle
+
+import pytest
+
+from src.trace.trace_file import PacketEvent, EventType, PacketType, InternPool, Node, LazyPacketEvent, TraceFile, \
+    FixedTime, Time
+
+
+def test_values_are_shared_between_events():
+    first = PacketEvent.from_str("+ 0.1 1 2 tcp 1040 ------- 1 1.0 3.0 0 0\n")
+    second = PacketEvent.from_str("r 0.2 2 1 ack 40 ------- 1 3.0 1.0 0 1\n")
+    assert first.source is second.destination
+    assert first.source_addr is second.destination_addr
+    assert first.flags is second.flags
+    assert first.flow_id is second.flow_id
+
+
+def test_enum_lookups():
+    assert EventType.from_value('d') == EventType.Dropped
+    assert PacketType.from_value('exp') == PacketType.Udp
+    with pytest.raises(ValueError):
+        PacketType.from_value('rtProtoDV')
+
+
+def test_pool_stops_growing_when_full():
+    pool = InternPool(Node.from_str, max_size=1)
+    assert pool.get('1') is pool.get('1')
+    assert pool.get('2') == pool.get('2')
+    assert pool.get('2') is not pool.get('2')
+
+
+def test_lazy_event_decodes_fields_on_demand():
+    line = "+ 0.1 1 2 tcp 1040 ------- 1 1.0 3.0 0 0\n"
+    lazy = LazyPacketEvent.from_str(line)
+    assert lazy.event_type == EventType.PutQueue
+    assert not hasattr(lazy, '_time')
+    assert lazy == PacketEvent.from_str(line)
+    broken = LazyPacketEvent.from_str("+ 0.1 1 2 tcp 1040 ------- 1 1.0 3.0 -1 0\n")
+    assert broken.source == Node(1)
+    with pytest.raises(ValueError):
+        _ = broken.sequence_number
+
+
+def test_trace_times_are_read_as_the_given_time_type(tmp_path):
+    file_name = tmp_path / "trace.res"
+    file_name.write_text("+ 0.1 1 2 tcp 1040 ------- 1 1.0 3.0 0 0\n")
+    fixed = next(iter(TraceFile(str(file_name), time_type=FixedTime)))
+    assert fixed.time == FixedTime.from_str("0.1")
+    assert next(iter(TraceFile(str(file_name)))).time == Time.from_str("0.1")
+    lazy = pickle.loads(pickle.dumps(next(iter(TraceFile(str(file_name), lazy=True, time_type=FixedTime)))))
+    assert lazy == fixed
+
+
+def test_fixed_point_half_rounds_ties_to_even():
+    assert [FixedTime(ticks).half().ticks for ticks in (4, 5, 7, -5)] == [2, 2, 4, -2]
@@ -0,0 +1,35 @@
+import os
+from decimal import Decimal
+
+from src.trace.columnar import ColumnarTraceFile
+from src.trace.index import TraceIndex
+from src.trace.trace_file import TraceFile, Time
+
+LINE = "{event} {time} 1 2 tcp 1040 ------- 1 1.0 3.0 {seq} {seq}\n"
+
+
+def write_trace(tmp_path, packets: int = 200) -> str:
+    file_name = tmp_path / "trace.res"
+    file_name.write_text("".join(LINE.format(event=event, time=f"{seq * 0.05:.2f}", seq=seq)
+                                 for seq in range(packets) for event in ('+', '-')))
+    return str(file_name)
+
+
+def test_window_is_the_same_as_filtering_the_whole_trace(tmp_path):
+    file_name = write_trace(tmp_path)
+    since, until = Time.from_str("2.5"), Time.from_str("4.05")
+    expected = [packet for packet in TraceFile(file_name) if since <= packet.time <= until]
+    window = TraceFile(file_name, since=since, until=until, index_interval=Decimal("0.3"))
+    assert list(window) == expected
+    assert len(ColumnarTraceFile(file_name, since=since, until=until).load()) == len(expected)
+    assert os.path.exists(TraceIndex.sidecar(file_name))
+
+
+def test_index_is_rebuilt_when_the_trace_changes(tmp_path):
+    file_name = write_trace(tmp_path)
+    index = TraceIndex.for_file(file_name)
+    assert index.offset_for(Decimal("5")) > 0
+    file_name_changed = write_trace(tmp_path, packets=50)
+    os.utime(file_name_changed, ns=(index.file_mtime_ns + 1, index.file_mtime_ns + 1))
+    assert not index.is_valid_for(file_name, index.interval)
+    assert TraceIndex.for_file(file_name).file_size != index.file_size